@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Any
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.future import select
+
+from app.database import (
+    ArchivedItemOrder,
+    ArchivedOrder,
+    IdempotencyKey,
+    ItemOrder,
+    Order,
+)
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("OF", "OR", "OC")
+ARCHIVED_ORDER_FIELDS = (
+    "id",
+    "user",
+    "price",
+    "status",
+    "requisition_date",
+    "finished",
+    "price_version",
+)
+ARCHIVED_ITEM_FIELDS = ("id", "order", "product", "quantity", "price")
+
+
+async def archive_orders(session_maker: Any, older_than: date, limit: int = 500) -> int:
+    """
+    Moves up to `limit` orders in a terminal status requested before
+    `older_than`, with their items, to the archive tables in one transaction.
+    Idempotency keys of those orders expired long ago and are dropped.
+    Rows locked by another worker's archiver are skipped.
+    """
+    async with session_maker() as session:
+        async with session.begin():
+            ids_select = await session.execute(
+                select(Order.id)
+                .where(
+                    Order.status.in_(TERMINAL_STATUSES),
+                    Order.requisition_date < older_than,
+                )
+                .order_by(Order.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            ids = ids_select.scalars().all()
+
+            if not ids:
+                return 0
+
+            await session.execute(
+                insert(ArchivedOrder).from_select(
+                    ARCHIVED_ORDER_FIELDS,
+                    select(
+                        *[getattr(Order, name) for name in ARCHIVED_ORDER_FIELDS]
+                    ).where(Order.id.in_(ids)),
+                )
+            )
+            await session.execute(
+                insert(ArchivedItemOrder).from_select(
+                    ARCHIVED_ITEM_FIELDS,
+                    select(
+                        *[getattr(ItemOrder, name) for name in ARCHIVED_ITEM_FIELDS]
+                    ).where(ItemOrder.order.in_(ids)),
+                )
+            )
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.order.in_(ids))
+            )
+            await session.execute(delete(ItemOrder).where(ItemOrder.order.in_(ids)))
+            await session.execute(delete(Order).where(Order.id.in_(ids)))
+
+    return len(ids)
+
+
+async def run_archiver(session_maker: Any, settings: Settings) -> None:
+    """
+    Archives old orders in batches every `order_archive_interval_seconds`
+    until cancelled.
+    """
+    while True:
+        older_than = date.today() - timedelta(days=settings.order_archive_after_days)
+        try:
+            archived = settings.order_archive_batch_size
+            while archived == settings.order_archive_batch_size:
+                archived = await archive_orders(
+                    session_maker, older_than, settings.order_archive_batch_size
+                )
+                logger.info("archived %s orders", archived)
+        except SQLAlchemyError as exc:
+            logger.warning("order archiver failed: %r", exc)
+
+        await asyncio.sleep(settings.order_archive_interval_seconds)
@@ -1,11 +1,22 @@
 import datetime
+import secrets
+import time
+from typing import Any, Awaitable, Callable, Sequence
 
 import jwt
-from fastapi import Header, HTTPException
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.future import select
 
-from app.models import UserToken
+from app.database import Employee
+from app.models import Error, RefreshTokenInput, RefreshTokenOutput, UserToken
+from app.revocation import get_revocations
 
 KEY_TOKEN = "Apolo@ana@catrofe"
+ACCESS_TOKEN_LIFETIME = datetime.timedelta(minutes=15)
+REFRESH_TOKEN_LIFETIME = datetime.timedelta(days=30)
+LEEWAY = datetime.timedelta(seconds=30)
+# How long revoking access tokens only has to be kept.
+ACCESS_REVOCATION_SECONDS = (ACCESS_TOKEN_LIFETIME + LEEWAY).total_seconds()
 
 
 async def decode_token_jwt(authorization: str = Header()) -> UserToken:
@@ -13,10 +24,19 @@ async def decode_token_jwt(authorization: str = Header()) -> UserToken:
         token = jwt.decode(
             authorization,
             KEY_TOKEN,
-            leeway=datetime.timedelta(hours=+2),
+            leeway=LEEWAY,
             algorithms=["HS256"],
         )
-        return UserToken(id=token["id"], type=token["type"])
+        # Tokens issued before refresh tokens existed have no "use" claim.
+        if token.get("use", "access") != "access":
+            raise HTTPException(401, "TOKEN_INVALID")
+
+        if await get_revocations().is_revoked(token):
+            raise HTTPException(401, "TOKEN_REVOKED")
+
+        return UserToken(
+            id=token["id"], type=token["type"], roles=token.get("roles", [])
+        )
 
     except jwt.exceptions.InvalidSignatureError:
         raise HTTPException(401, "INVALID_SIGNATURE")
@@ -28,13 +48,101 @@ async def decode_token_jwt(authorization: str = Header()) -> UserToken:
         raise HTTPException(401, "TOKEN_INVALID")
 
 
-async def encode_token_jwt(id: int, type: str) -> str:
+def has_role(user: UserToken, *roles: str) -> bool:
+    return user.type == "employee" and any(role in user.roles for role in roles)
+
+
+def require_role(*roles: str) -> Callable[..., Awaitable[UserToken]]:
+    """
+    Dependency letting in employees holding any of `roles`, checked against
+    the token claims only.
+    """
+
+    async def check_role(user: UserToken = Depends(decode_token_jwt)) -> UserToken:
+        if not has_role(user, *roles):
+            raise HTTPException(403, "ACCESS_DENIED")
+        return user
+
+    return check_role
+
+
+def employee_roles(manager: Any, attendant: Any) -> list[str]:
+    return [
+        role for role, held in (("manager", manager), ("attendant", attendant)) if held
+    ]
+
+
+async def encode_token_jwt(id: int, type: str, roles: Sequence[str] = ()) -> str:
     return jwt.encode(
         {
             "id": id,
             "type": type,
-            "exp": datetime.datetime.now() + datetime.timedelta(hours=+2),
+            "roles": list(roles),
+            "use": "access",
+            "jti": secrets.token_hex(16),
+            "iat": time.time(),
+            "exp": datetime.datetime.now(datetime.timezone.utc) + ACCESS_TOKEN_LIFETIME,
         },
         KEY_TOKEN,
         algorithm="HS256",
     )
+
+
+async def encode_refresh_token_jwt(id: int, type: str) -> str:
+    return jwt.encode(
+        {
+            "id": id,
+            "type": type,
+            "use": "refresh",
+            "jti": secrets.token_hex(16),
+            "iat": time.time(),
+            "exp": datetime.datetime.now(datetime.timezone.utc)
+            + REFRESH_TOKEN_LIFETIME,
+        },
+        KEY_TOKEN,
+        algorithm="HS256",
+    )
+
+
+async def refresh_access_token(
+    request: RefreshTokenInput, session_maker: Any
+) -> RefreshTokenOutput | Error:
+    """
+    Trades a refresh token for a new access token. The signature and expiry
+    are all that is checked, plus a primary key lookup of the roles of
+    employees, so role changes reach the next access token. Staying logged in
+    never costs a bcrypt check.
+    """
+    try:
+        token = jwt.decode(
+            request.refresh_token, KEY_TOKEN, leeway=LEEWAY, algorithms=["HS256"]
+        )
+    except jwt.exceptions.ExpiredSignatureError:
+        return Error(reason="BAD_REQUEST", message="TOKEN_HAS_EXPIRED", status_code=401)
+    except jwt.exceptions.InvalidTokenError:
+        return Error(reason="BAD_REQUEST", message="TOKEN_INVALID", status_code=401)
+
+    if token.get("use") != "refresh":
+        return Error(reason="BAD_REQUEST", message="TOKEN_INVALID", status_code=401)
+
+    if await get_revocations().is_revoked(token):
+        return Error(reason="BAD_REQUEST", message="TOKEN_REVOKED", status_code=401)
+
+    roles: list[str] = []
+    if token["type"] == "employee":
+        async with session_maker() as session:
+            employee_select = await session.execute(
+                select(Employee.manager, Employee.attendant).where(
+                    Employee.id == token["id"]
+                )
+            )
+            employee = employee_select.first()
+
+        if not employee:
+            return Error(reason="BAD_REQUEST", message="TOKEN_INVALID", status_code=401)
+        roles = employee_roles(employee.manager, employee.attendant)
+
+    return RefreshTokenOutput(
+        token=await encode_token_jwt(token["id"], token["type"], roles),
+        message="TOKEN_REFRESHED",
+    )
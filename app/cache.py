@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Optional, Protocol
+from urllib.parse import urlparse
+
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_PRODUCTS_KEY = "products:actives"
+ALL_PRODUCTS_KEY = "products:all"
+INVALIDATION_CHANNEL = "iceberg:invalidate"
+
+
+def product_key(id: int) -> str:
+    return f"product:{id}"
+
+
+def order_key(id: int) -> str:
+    return f"order:{id}"
+
+
+def profile_key(type: str, id: int) -> str:
+    return f"profile:{type}:{id}"
+
+
+def compressed_key(encoding: str, digest: str) -> str:
+    return f"compressed:{encoding}:{digest}"
+
+
+def sticky_key(type: str, id: int) -> str:
+    return f"sticky:{type}:{id}"
+
+
+class CacheError(Exception):
+    pass
+
+
+class CacheUnavailable(CacheError):
+    pass
+
+
+# Failures of the shared backend, handled as a cache miss.
+CACHE_ERRORS = (OSError, CacheError, asyncio.IncompleteReadError, asyncio.TimeoutError)
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    async def delete(self, *keys: str) -> None:
+        ...
+
+
+class SharedCacheBackend(CacheBackend, Protocol):
+    async def publish(self, channel: str, message: bytes) -> None:
+        ...
+
+    def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        ...
+
+
+@dataclass
+class MemoryCache:
+    """
+    LRU cache local to the process. Entries expire after their ttl and the
+    least recently used one is evicted once `max_entries` is reached.
+    """
+
+    max_entries: int = 1024
+    entries: OrderedDict[str, tuple[float, bytes]] = field(default_factory=OrderedDict)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class RedisCache:
+    """
+    Small client for the Redis protocol (RESP2), enough for GET, SET, DEL and
+    PUBLISH/SUBSCRIBE. Commands share one connection and run one at a time,
+    each given `timeout` seconds, waiting for the connection included. After
+    a connection failure or timeout, commands fail at once with
+    CacheUnavailable for `retry_seconds`, instead of each waiting out its
+    timeout.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 6379,
+        db: int = 0,
+        password: str | None = None,
+        timeout: float = 0.5,
+        retry_seconds: float = 5,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.down_until = 0.0
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def from_url(
+        cls, url: str, timeout: float = 0.5, retry_seconds: float = 5
+    ) -> RedisCache:
+        parsed = urlparse(url)
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.strip("/") or 0),
+            password=parsed.password,
+            timeout=timeout,
+            retry_seconds=retry_seconds,
+        )
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.execute("GET", key)
+        return value if isinstance(value, bytes) else None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute("SET", key, value, "PX", int(ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.execute("DEL", *keys)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        await self.execute("PUBLISH", channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        reader, writer = await self.open_connection()
+        try:
+            writer.write(encode_command("SUBSCRIBE", channel))
+            await writer.drain()
+
+            while True:
+                reply = await read_reply(reader)
+                if isinstance(reply, list) and reply[0] == b"message":
+                    yield reply[2]
+        finally:
+            writer.close()
+
+    async def execute(self, *args: Any) -> Any:
+        if time.monotonic() < self.down_until:
+            raise CacheUnavailable(f"{self.host}:{self.port}")
+
+        try:
+            return await asyncio.wait_for(self.round_trip(*args), self.timeout)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+            logger.warning(
+                "redis %s:%s down for %ss: %r",
+                self.host,
+                self.port,
+                self.retry_seconds,
+                exc,
+            )
+            self.down_until = time.monotonic() + self.retry_seconds
+            raise
+
+    async def round_trip(self, *args: Any) -> Any:
+        async with self.lock:
+            try:
+                if not self.writer or not self.reader:
+                    self.reader, self.writer = await self.open_connection()
+
+                self.writer.write(encode_command(*args))
+                await self.writer.drain()
+                return await read_reply(self.reader)
+            except BaseException:
+                # A reply may still be on its way, the next command would read it.
+                await self.close()
+                raise
+
+    async def open_connection(
+        self,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+
+        for command in self.handshake():
+            writer.write(encode_command(*command))
+            await writer.drain()
+            await read_reply(reader)
+
+        return reader, writer
+
+    def handshake(self) -> list[tuple[Any, ...]]:
+        commands: list[tuple[Any, ...]] = []
+        if self.password:
+            commands.append(("AUTH", self.password))
+        if self.db:
+            commands.append(("SELECT", self.db))
+        return commands
+
+    async def close(self) -> None:
+        if self.writer:
+            self.writer.close()
+        self.reader, self.writer = None, None
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode("utf8")
+        parts.append(f"${len(value)}\r\n".encode() + value + b"\r\n")
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readuntil(b"\r\n")
+    prefix, body = line[:1], line[1:-2]
+
+    if prefix == b"+":
+        return body.decode()
+    if prefix == b"-":
+        raise CacheError(body.decode())
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        if int(body) < 0:
+            return None
+        return (await reader.readexactly(int(body) + 2))[:-2]
+    if prefix == b"*":
+        if int(body) < 0:
+            return None
+        return [await read_reply(reader) for _ in range(int(body))]
+
+    raise CacheError(f"UNEXPECTED_REPLY {line!r}")
+
+
+@dataclass
+class Cache:
+    """
+    Local LRU in front of an optional shared backend. Invalidations delete the
+    keys from both and are published so every other worker drops its local
+    copy too. Errors from the shared backend only cost a cache miss.
+
+    `generation` counts the invalidations this worker has seen. A value read
+    from the database before an invalidation must not be cached after it, so
+    loaders take the generation before reading and pass it to `set`, which
+    then skips the write if anything was invalidated in between. Across
+    workers this only holds once the invalidation message has arrived.
+    """
+
+    local: MemoryCache = field(default_factory=MemoryCache)
+    shared: Optional[SharedCacheBackend] = None
+    ttl: float = 60
+    generation: int = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.local.get(key)
+        if value is not None or not self.shared:
+            return value
+
+        try:
+            value = await self.shared.get(key)
+        except CACHE_ERRORS as exc:
+            logger.warning("cache get %s failed: %r", key, exc)
+            return None
+
+        if value is not None:
+            await self.local.set(key, value, self.ttl)
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        if generation is not None and generation != self.generation:
+            return
+
+        ttl = ttl or self.ttl
+        await self.local.set(key, value, ttl)
+
+        if self.shared:
+            try:
+                await self.shared.set(key, value, ttl)
+            except CACHE_ERRORS as exc:
+                logger.warning("cache set %s failed: %r", key, exc)
+
+    async def invalidate(self, *keys: str) -> None:
+        if not keys:
+            return
+
+        self.generation += 1
+        await self.local.delete(*keys)
+
+        if self.shared:
+            try:
+                await self.shared.delete(*keys)
+                await self.shared.publish(
+                    INVALIDATION_CHANNEL, "\n".join(keys).encode("utf8")
+                )
+            except CACHE_ERRORS as exc:
+                logger.warning("cache invalidate %s failed: %r", keys, exc)
+
+    async def listen(self, retry_delay: float = 1) -> None:
+        """
+        Drops local entries invalidated by other workers. Runs until
+        cancelled; while disconnected nothing is known about other workers,
+        so the local cache is cleared on every reconnection.
+        """
+        if not self.shared:
+            return
+
+        while True:
+            try:
+                async for message in self.shared.subscribe(INVALIDATION_CHANNEL):
+                    self.generation += 1
+                    await self.local.delete(*message.decode("utf8").split("\n"))
+            except CACHE_ERRORS as exc:
+                logger.warning("cache invalidation listener failed: %r", exc)
+
+            self.generation += 1
+            self.local.clear()
+            await asyncio.sleep(retry_delay)
+
+
+cache = Cache()
+
+
+def get_cache() -> Cache:
+    return cache
+
+
+def setup_cache(settings: Settings) -> Cache:
+    global cache
+    cache = Cache(
+        local=MemoryCache(max_entries=settings.cache_max_entries),
+        shared=RedisCache.from_url(
+            settings.cache_url,
+            settings.cache_timeout_seconds,
+            settings.cache_retry_seconds,
+        )
+        if settings.cache_url
+        else None,
+        ttl=settings.cache_ttl_seconds,
+    )
+    return cache
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database import CatalogVersion, Product
+
+CATALOG_VERSION = (
+    select(CatalogVersion.version).where(CatalogVersion.id == 1).scalar_subquery()
+)
+
+
+async def bump_catalog_version(session: AsyncSession) -> None:
+    """
+    Call in the same transaction as any write that changes or removes a
+    product price, so checkouts never mix prices of two versions.
+    """
+    await session.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+    )
+
+
+@dataclass
+class PriceCache:
+    """
+    Product prices of the latest catalog version seen by this worker, filled
+    by checkouts. Only products missing from it are read from the database.
+    """
+
+    version: int = -1
+    prices: dict[int, float] = field(default_factory=dict)
+
+    async def resolve(
+        self, session: AsyncSession, ids: set[int]
+    ) -> tuple[int, dict[int, float]]:
+        """
+        Returns the current catalog version and the prices of `ids` in it.
+        Unknown products are left out. Reads again if the version changes
+        between the version check and the price read.
+        """
+        while True:
+            version = (await session.execute(select(CATALOG_VERSION))).scalar_one()
+            if version != self.version:
+                self.version, self.prices = version, {}
+
+            cached = self.prices if self.version == version else {}
+            prices = {id: cached[id] for id in ids if id in cached}
+            missing = ids - prices.keys()
+            if not missing:
+                return version, prices
+
+            rows_select = await session.execute(
+                select(
+                    Product.id, Product.price, CATALOG_VERSION.label("version")
+                ).where(Product.id.in_(missing))
+            )
+            rows = rows_select.all()
+            if any(row.version != version for row in rows):
+                continue
+
+            fetched = {row.id: row.price for row in rows}
+            if self.version == version:
+                self.prices.update(fetched)
+            return version, {**prices, **fetched}
+
+
+price_cache = PriceCache()
+
+
+def get_price_cache() -> PriceCache:
+    return price_cache
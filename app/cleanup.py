@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import and_, delete, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.future import select
+
+from app.database import ForgotPassword, OutboxJob, affected_rows
+from app.metrics import counter, gauge
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+purged_rows = counter(
+    "forgot_password_purged_rows_total", "Used or expired reset tokens deleted."
+)
+last_purged_rows = gauge(
+    "forgot_password_last_purge_rows", "Reset tokens deleted by the last run."
+)
+purged_jobs = counter(
+    "outbox_job_purged_rows_total", "Done or long failed outbox jobs deleted."
+)
+
+
+async def purge_forgot_passwords(
+    session_maker: Any, ttl_seconds: int, limit: int = 1000
+) -> int:
+    """
+    Deletes up to `limit` reset tokens already used or older than
+    `ttl_seconds`, which change_password would reject anyway.
+    """
+    oldest = datetime.datetime.now() - datetime.timedelta(seconds=ttl_seconds)
+
+    async with session_maker() as session:
+        ids_select = await session.execute(
+            select(ForgotPassword.id)
+            .where(
+                or_(
+                    ForgotPassword.utilized.is_(True),
+                    ForgotPassword.requisition_date < oldest,
+                )
+            )
+            .limit(limit)
+        )
+        ids = ids_select.scalars().all()
+
+        if not ids:
+            return 0
+
+        deleted = await session.execute(
+            delete(ForgotPassword).where(ForgotPassword.id.in_(ids))
+        )
+        await session.commit()
+
+    return affected_rows(deleted)
+
+
+async def purge_outbox_jobs(
+    session_maker: Any, failed_ttl_seconds: int, limit: int = 1000
+) -> int:
+    """
+    Deletes up to `limit` outbox jobs done, or failed and created over
+    `failed_ttl_seconds` ago, kept that long to be looked into.
+    """
+    oldest = datetime.datetime.now() - datetime.timedelta(seconds=failed_ttl_seconds)
+
+    async with session_maker() as session:
+        ids_select = await session.execute(
+            select(OutboxJob.id)
+            .where(
+                or_(
+                    OutboxJob.status == "done",
+                    and_(OutboxJob.status == "failed", OutboxJob.created_at < oldest),
+                )
+            )
+            .limit(limit)
+        )
+        ids = ids_select.scalars().all()
+
+        if not ids:
+            return 0
+
+        deleted = await session.execute(delete(OutboxJob).where(OutboxJob.id.in_(ids)))
+        await session.commit()
+
+    return affected_rows(deleted)
+
+
+async def purge_in_batches(purge: Callable[[int], Awaitable[int]], size: int) -> int:
+    total = 0
+    purged = size
+    while purged == size:
+        purged = await purge(size)
+        total += purged
+    return total
+
+
+async def run_cleanup(session_maker: Any, settings: Settings) -> None:
+    """
+    Purges reset tokens and outbox jobs in batches every
+    `cleanup_interval_seconds` until cancelled.
+    """
+    while True:
+        try:
+            total = await purge_in_batches(
+                partial(
+                    purge_forgot_passwords,
+                    session_maker,
+                    settings.forgot_password_ttl_seconds,
+                ),
+                settings.cleanup_batch_size,
+            )
+            purged_rows.inc(total)
+            last_purged_rows.set(total)
+            logger.info("purged %s reset tokens", total)
+
+            total = await purge_in_batches(
+                partial(
+                    purge_outbox_jobs, session_maker, settings.jobs_failed_ttl_seconds
+                ),
+                settings.cleanup_batch_size,
+            )
+            purged_jobs.inc(total)
+            logger.info("purged %s outbox jobs", total)
+        except SQLAlchemyError as exc:
+            logger.warning("cleanup failed: %r", exc)
+
+        await asyncio.sleep(settings.cleanup_interval_seconds)
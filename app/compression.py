@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+from typing import Any, Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import compressed_key, get_cache
+from app.settings import Settings
+
+try:
+    import brotli
+except ImportError:  # optional extra: poetry install -E brotli
+    brotli = None
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """
+    Parses an Accept-Encoding header into {encoding: q}.
+    """
+    encodings = {}
+    for part in header.lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if name.strip():
+            encodings[name.strip()] = quality
+    return encodings
+
+
+def choose_encoding(header: str, supported: tuple[str, ...]) -> Optional[str]:
+    """
+    First of `supported`, in our order of preference, the client accepts.
+    """
+    accepted = accepted_encodings(header)
+    for encoding in supported:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses whole responses with brotli or gzip when the client accepts it,
+    the content type is allowed and the body has at least
+    `compression_minimum_size` bytes. Streamed responses pass through.
+
+    Bodies of `compression_cache_paths` are compressed once: the compressed
+    bytes are kept in the app cache, keyed by a digest of the raw body.
+    """
+
+    def __init__(self, app: ASGIApp, settings: Settings) -> None:
+        self.app = app
+        self.settings = settings
+        self.compressors: dict[str, Callable[[bytes], bytes]] = {
+            "gzip": lambda body: gzip.compress(
+                body, compresslevel=settings.compression_gzip_level, mtime=0
+            )
+        }
+        if brotli is not None:
+            self.compressors["br"] = lambda body: bytes(
+                brotli.compress(body, quality=settings.compression_brotli_quality)
+            )
+        self.supported = tuple(
+            encoding for encoding in ("br", "gzip") if encoding in self.compressors
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope["type"] == "http" and self.settings.compression_enabled:
+            encoding = choose_encoding(
+                Headers(scope=scope).get("accept-encoding", ""), self.supported
+            )
+
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, encoding, scope["path"], send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(
+        self, middleware: CompressionMiddleware, encoding: str, path: str, send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.path = path
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self.downstream(message)
+        elif message["type"] == "http.response.start":
+            self.start = message
+        elif message.get("more_body", False):
+            self.passthrough = True
+            await self.downstream(self.start or {})
+            await self.downstream(message)
+        else:
+            await self.send_whole(message)
+
+    async def send_whole(self, message: Message) -> None:
+        start: Any = self.start
+        headers = MutableHeaders(raw=start["headers"])
+        body: bytes = message.get("body", b"")
+
+        if self.compressible(headers, body):
+            body = await self.compress(body, start["status"])
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            message = {**message, "body": body}
+
+        await self.downstream(start)
+        await self.downstream(message)
+
+    def compressible(self, headers: MutableHeaders, body: bytes) -> bool:
+        settings = self.middleware.settings
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        return (
+            "content-encoding" not in headers
+            and len(body) >= settings.compression_minimum_size
+            and content_type in settings.compression_content_types
+        )
+
+    async def compress(self, body: bytes, status: int) -> bytes:
+        compressor = self.middleware.compressors[self.encoding]
+        if (
+            status != 200
+            or self.path not in self.middleware.settings.compression_cache_paths
+        ):
+            return compressor(body)
+
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        key = compressed_key(self.encoding, digest)
+        compressed = await get_cache().get(key)
+        if compressed is None:
+            compressed = compressor(body)
+            await get_cache().set(key, compressed)
+        return compressed
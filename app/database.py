@@ -1,17 +1,27 @@
-from typing import Any
+import asyncio
+from typing import Any, Optional, cast
 
 from sqlalchemy import (
+    DDL,
     Boolean,
     Column,
     Date,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
+    Text,
+    UniqueConstraint,
+    event,
 )
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.engine import CursorResult, Result, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.settings import Settings
 
 Base = declarative_base()
 
@@ -26,14 +36,43 @@ async def setup_db_tests(url_db: str) -> Any:
     return async_session
 
 
-async def setup_db_main(url_db: str) -> Any:
-    engine = create_async_engine(url_db, echo=False)
-    async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+def create_engine_main(settings: Settings, url: Optional[str] = None) -> AsyncEngine:
+    url = url or settings.db_url
+    pool_options: dict[str, Any] = {}
+    if make_url(url).get_backend_name() != "sqlite":
+        pool_options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_recycle": settings.db_pool_recycle_seconds,
+        }
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    return create_async_engine(url, echo=False, **pool_options)
 
-    return async_session
+
+def setup_db_main(engine: AsyncEngine) -> Any:
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Opens up to `connections` pooled connections at once and hands them back
+    to the pool, so the first requests of a worker skip the handshakes.
+    """
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+
+    size: int = pool.size()  # type: ignore[no-untyped-call]
+    connections = min(connections, size)
+    opened = await asyncio.gather(
+        *[engine.connect().start() for _ in range(connections)]
+    )
+    for connection in opened:
+        await connection.close()
+
+
+def affected_rows(result: Result) -> int:
+    return int(cast(CursorResult, result).rowcount)
 
 
 class User(Base):
@@ -60,7 +99,7 @@ class Employee(Base):
 class ForgotPassword(Base):
     __tablename__ = "forgot_password"
     id = Column(Integer, primary_key=True)
-    token = Column(String, nullable=False)
+    token = Column(String, nullable=False, index=True)
     user = Column(Integer, ForeignKey("user.id"), nullable=False)
     requisition_date = Column(DateTime, nullable=False)
     utilized = Column(Boolean, default=False)
@@ -87,18 +126,114 @@ class Order(Base):
     """
 
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_finished", "user", "finished"),
+        Index("ix_orders_status", "status"),
+    )
     id = Column(Integer, primary_key=True)
     user = Column(Integer, ForeignKey("user.id"), nullable=False)
     price = Column(Float, nullable=True)
     status = Column(String, nullable=False)
     requisition_date = Column(Date, nullable=False)
     finished = Column(Boolean, default=False)
+    price_version = Column(Integer, nullable=True)
 
 
 class ItemOrder(Base):
     __tablename__ = "items_orders"
+    __table_args__ = (Index("ix_items_orders_order", "order"),)
     id = Column(Integer, primary_key=True)
     order = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product = Column(Integer, ForeignKey("product.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
+
+
+class CatalogVersion(Base):
+    """
+    Single row bumped by every write that changes product prices. Orders
+    record the version their prices were taken from.
+    """
+
+    __tablename__ = "catalog_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+event.listen(
+    CatalogVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO catalog_version (id, version) VALUES (1, 1)"),
+)
+
+
+class ArchivedOrder(Base):
+    """
+    Orders in a terminal status (OF, OR, OC) moved out of `orders` by the
+    archiver, keeping their ids.
+    """
+
+    __tablename__ = "orders_archive"
+    __table_args__ = (Index("ix_orders_archive_user", "user"),)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user = Column(Integer, ForeignKey("user.id"), nullable=False)
+    price = Column(Float, nullable=True)
+    status = Column(String, nullable=False)
+    requisition_date = Column(Date, nullable=False)
+    finished = Column(Boolean, default=False)
+    price_version = Column(Integer, nullable=True)
+
+
+class ArchivedItemOrder(Base):
+    __tablename__ = "items_orders_archive"
+    __table_args__ = (Index("ix_items_orders_archive_order", "order"),)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order = Column(Integer, ForeignKey("orders_archive.id"), nullable=False)
+    product = Column(Integer, ForeignKey("product.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+    __table_args__ = (UniqueConstraint("user", "key"),)
+    id = Column(Integer, primary_key=True)
+    key = Column(String, nullable=False)
+    user = Column(Integer, ForeignKey("user.id"), nullable=False)
+    order = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    fingerprint = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+class OutboxJob(Base):
+    """
+    status ->:
+    pending - waiting for `run_after`, also pushed forward while running
+    done - handled
+    failed - gave up after the last attempt
+    """
+
+    __tablename__ = "outbox_job"
+    __table_args__ = (Index("ix_outbox_job_status_run_after", "status", "run_after"),)
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+
+class RevokedToken(Base):
+    """
+    Tokens of `key` ("sub:<type>:<id>", "access:<type>:<id>" or "jti:<id>")
+    issued up to `revoked_at` are rejected until `expires_at`, when they have
+    expired anyway. Times are epoch seconds, as in the tokens.
+    """
+
+    __tablename__ = "revoked_token"
+    id = Column(Integer, primary_key=True)
+    key = Column(String, nullable=False, index=True)
+    revoked_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False)
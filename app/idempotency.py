@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import IdempotencyKey
+from app.models import Error, OrderInput, OrderOutput, UserToken
+from app.order import order_create
+
+
+@dataclass
+class SavedResponse:
+    fingerprint: str
+    response: OrderOutput
+    expires_at: float
+
+
+@dataclass
+class IdempotencyStore:
+    """
+    Keeps the response of every order created with an Idempotency-Key for
+    `ttl` seconds. Entries live in memory and, when a session maker is given,
+    in the idempotency_key table, written with the order, so replays survive
+    restarts and workers.
+    """
+
+    ttl: float = 86400
+    session_maker: Optional[sessionmaker[AsyncSession]] = None
+    entries: dict[tuple[int, str], SavedResponse] = field(default_factory=dict)
+    locks: dict[tuple[int, str], tuple[asyncio.Lock, int]] = field(default_factory=dict)
+
+    @asynccontextmanager
+    async def guard(self, user: int, key: str) -> AsyncIterator[None]:
+        lock, waiting = self.locks.get((user, key), (asyncio.Lock(), 0))
+        self.locks[(user, key)] = (lock, waiting + 1)
+
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, waiting = self.locks[(user, key)]
+            if waiting == 1:
+                del self.locks[(user, key)]
+            else:
+                self.locks[(user, key)] = (lock, waiting - 1)
+
+    async def get(self, user: int, key: str) -> Optional[SavedResponse]:
+        self.purge_expired()
+
+        saved = self.entries.get((user, key))
+        if saved or not self.session_maker:
+            return saved
+
+        oldest = datetime.datetime.now() - datetime.timedelta(seconds=self.ttl)
+        async with self.session_maker() as session:
+            key_select = await session.execute(
+                select(IdempotencyKey.order, IdempotencyKey.fingerprint).where(
+                    IdempotencyKey.user == user,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at >= oldest,
+                )
+            )
+            row = key_select.first()
+
+        if not row:
+            return None
+
+        saved = SavedResponse(
+            fingerprint=row.fingerprint,
+            response=OrderOutput(id=row.order, message="ORDER_CREATED_WITH_SUCCESS"),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self.entries[(user, key)] = saved
+        return saved
+
+    def remember(
+        self, user: int, key: str, fingerprint: str, response: OrderOutput
+    ) -> None:
+        self.entries[(user, key)] = SavedResponse(
+            fingerprint=fingerprint,
+            response=response,
+            expires_at=time.monotonic() + self.ttl,
+        )
+
+    async def reserve(
+        self, user: int, key: str, fingerprint: str
+    ) -> Optional[IdempotencyKey]:
+        """
+        Row to insert with the order. An expired row of the same key is
+        deleted first, so the key can be used again.
+        """
+        if not self.session_maker:
+            return None
+
+        oldest = datetime.datetime.now() - datetime.timedelta(seconds=self.ttl)
+        async with self.session_maker() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user == user,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at < oldest,
+                )
+            )
+            await session.commit()
+
+        return IdempotencyKey(
+            key=key,
+            user=user,
+            fingerprint=fingerprint,
+            created_at=datetime.datetime.now(),
+        )
+
+    async def order_create_once(
+        self,
+        request: OrderInput,
+        user: UserToken,
+        idempotency_key: str,
+        session_maker: sessionmaker[AsyncSession],
+    ) -> OrderOutput | Error:
+        """
+        The lock only serializes retries reaching this worker. Across workers
+        and restarts the unique (user, key) row, inserted with the order,
+        lets one order through and the others replay it.
+        """
+        fingerprint = hashlib.sha256(request.json().encode("utf8")).hexdigest()
+
+        async with self.guard(user.id, idempotency_key):
+            saved = await self.get(user.id, idempotency_key)
+
+            if not saved:
+                reservation = await self.reserve(user.id, idempotency_key, fingerprint)
+                try:
+                    response = await order_create(
+                        request, user, session_maker, reservation
+                    )
+                except IntegrityError:
+                    saved = await self.get(user.id, idempotency_key)
+                else:
+                    if isinstance(response, OrderOutput):
+                        self.remember(user.id, idempotency_key, fingerprint, response)
+                    return response
+
+            if not saved:
+                return Error(
+                    reason="CONFLICT", message="IDEMPOTENCY_KEY_IN_USE", status_code=409
+                )
+
+            if saved.fingerprint != fingerprint:
+                return Error(
+                    reason="BAD_REQUEST",
+                    message="IDEMPOTENCY_KEY_REUSED",
+                    status_code=422,
+                )
+            return saved.response
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        # Every entry has the same ttl, so insertion order is expiry order.
+        for user_key in list(self.entries):
+            if self.entries[user_key].expires_at > now:
+                break
+            del self.entries[user_key]
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database import OutboxJob, affected_rows
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    payload: str
+    attempt: int
+
+
+def add_job(session: AsyncSession, kind: str, payload: dict[str, Any]) -> None:
+    """
+    Adds the job to the caller's transaction, so it is only persisted if the
+    rest of the write commits. Call `get_jobs().wake()` after the commit.
+    """
+    now = datetime.datetime.now()
+    session.add(
+        OutboxJob(
+            kind=kind,
+            payload=json.dumps(payload),
+            status="pending",
+            attempts=0,
+            run_after=now,
+            created_at=now,
+        )
+    )
+
+
+@dataclass
+class JobQueue:
+    """
+    Runs the jobs of the outbox table, at most `concurrency` at a time.
+    Claiming a job pushes its `run_after` `lease_seconds` ahead, so a worker
+    dying mid-job only delays it and other workers never run it twice. Failed
+    jobs are retried with exponential backoff until `max_attempts`.
+    """
+
+    session_maker: Any = None
+    handlers: dict[str, JobHandler] = field(default_factory=dict)
+    concurrency: int = 4
+    max_attempts: int = 5
+    retry_seconds: float = 30
+    lease_seconds: float = 300
+    poll_seconds: float = 5
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def wake(self) -> None:
+        self.wakeup.set()
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            try:
+                await self.run_pending()
+            except SQLAlchemyError as exc:
+                logger.warning("job runner failed: %r", exc)
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_pending(self) -> int:
+        handled = 0
+        while jobs := await self.claim(self.concurrency):
+            await asyncio.gather(*[self.process(job) for job in jobs])
+            handled += len(jobs)
+        return handled
+
+    async def claim(self, limit: int) -> list[Job]:
+        now = datetime.datetime.now()
+        leased_until = now + datetime.timedelta(seconds=self.lease_seconds)
+        jobs = []
+
+        async with self.session_maker() as session:
+            due_select = await session.execute(
+                select(
+                    OutboxJob.id,
+                    OutboxJob.kind,
+                    OutboxJob.payload,
+                    OutboxJob.attempts,
+                    OutboxJob.run_after,
+                )
+                .where(OutboxJob.status == "pending", OutboxJob.run_after <= now)
+                .order_by(OutboxJob.run_after)
+                .limit(limit)
+            )
+
+            for due in due_select.all():
+                claimed = await session.execute(
+                    update(OutboxJob)
+                    .where(OutboxJob.id == due.id, OutboxJob.run_after == due.run_after)
+                    .values(run_after=leased_until, attempts=OutboxJob.attempts + 1)
+                )
+                if affected_rows(claimed):
+                    jobs.append(Job(due.id, due.kind, due.payload, due.attempts + 1))
+
+            await session.commit()
+
+        return jobs
+
+    async def process(self, job: Job) -> None:
+        # Payloads may hold secrets, such as reset tokens, not needed once done.
+        values: dict[str, Any] = {"status": "done", "payload": "{}", "last_error": None}
+        try:
+            handler = self.handlers.get(job.kind)
+            if not handler:
+                raise LookupError(f"NO_HANDLER_FOR_JOB {job.kind}")
+            await handler(json.loads(job.payload))
+
+        except Exception as exc:
+            logger.warning("job %s %s failed: %r", job.id, job.kind, exc)
+            values = {"status": "pending", "last_error": repr(exc)}
+            if job.attempt >= self.max_attempts:
+                values["status"] = "failed"
+            else:
+                values["run_after"] = datetime.datetime.now() + datetime.timedelta(
+                    seconds=self.retry_seconds * 2 ** (job.attempt - 1)
+                )
+
+        async with self.session_maker() as session:
+            await session.execute(
+                update(OutboxJob).where(OutboxJob.id == job.id).values(**values)
+            )
+            await session.commit()
+
+
+jobs = JobQueue()
+
+
+def get_jobs() -> JobQueue:
+    return jobs
+
+
+def setup_jobs(
+    session_maker: Any, settings: Settings, handlers: dict[str, JobHandler]
+) -> JobQueue:
+    global jobs
+    jobs = JobQueue(
+        session_maker=session_maker,
+        handlers=handlers,
+        concurrency=settings.jobs_concurrency,
+        max_attempts=settings.jobs_max_attempts,
+        retry_seconds=settings.jobs_retry_seconds,
+    )
+    return jobs
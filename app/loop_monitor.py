@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Optional
+
+from app.metrics import counter, gauge
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+loop_lag = gauge(
+    "event_loop_lag_seconds", "Delay of the last monitor tick past its schedule."
+)
+loop_lag_max = gauge(
+    "event_loop_lag_max_seconds", "Longest tick delay since the worker started."
+)
+loop_blocked = counter(
+    "event_loop_blocked_total",
+    "Times the loop was blocked over the threshold, by blocking function.",
+)
+
+
+def blocking_function(frame: Optional[FrameType]) -> str:
+    """
+    Innermost app function in the stack, or the innermost function at all.
+    """
+    innermost = None
+    while frame is not None:
+        module = str(frame.f_globals.get("__name__", ""))
+        name = f"{module}.{frame.f_code.co_name}"
+        if module.startswith("app.") and module != __name__:
+            return name
+        innermost = innermost or name
+        frame = frame.f_back
+    return innermost or "unknown"
+
+
+@dataclass
+class Blocked:
+    function: str
+    seconds: float
+    stack: str
+
+
+@dataclass
+class LoopMonitor:
+    """
+    Measures how late the event loop runs a tick scheduled every
+    `tick_seconds`. In debug mode a watchdog thread also takes the loop
+    thread's stack whenever a tick is more than `threshold_seconds` late, so
+    the blocking call is named in the log and in `event_loop_blocked_total`.
+    """
+
+    interval_seconds: float = 0.5
+    threshold_seconds: float = 0.1
+    debug: bool = False
+    heartbeat: float = field(default_factory=time.monotonic)
+    blocked: deque[Blocked] = field(default_factory=lambda: deque(maxlen=20))
+
+    @property
+    def tick_seconds(self) -> float:
+        """
+        In debug mode ticks are frequent enough for any block over the
+        threshold to delay one of them.
+        """
+        if self.debug:
+            return min(self.interval_seconds, self.threshold_seconds / 2)
+        return self.interval_seconds
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        if self.debug:
+            threading.Thread(
+                target=self.watch,
+                args=(threading.get_ident(), stop),
+                name="loop-watchdog",
+                daemon=True,
+            ).start()
+
+        try:
+            while True:
+                self.heartbeat = time.monotonic()
+                scheduled = loop.time() + self.tick_seconds
+                await asyncio.sleep(self.tick_seconds)
+                self.record(loop.time() - scheduled)
+        finally:
+            stop.set()
+
+    def record(self, lag: float) -> None:
+        lag = max(lag, 0)
+        loop_lag.set(lag)
+        loop_lag_max.set(max(lag, loop_lag_max.get()))
+
+    def watch(self, thread_id: int, stop: threading.Event) -> None:
+        """
+        Runs in the watchdog thread; reports each blocking episode once.
+        """
+        reported = 0.0
+        while not stop.wait(self.threshold_seconds / 2):
+            heartbeat = self.heartbeat
+            late = time.monotonic() - heartbeat - self.tick_seconds
+            if late < self.threshold_seconds or heartbeat == reported:
+                continue
+
+            reported = heartbeat
+            self.report(sys._current_frames().get(thread_id), late)
+
+    def report(self, frame: Optional[FrameType], seconds: float) -> None:
+        function = blocking_function(frame)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        self.blocked.append(Blocked(function, seconds, stack))
+        loop_blocked.inc(function=function)
+        logger.warning(
+            "event loop blocked for over %.0fms in %s\n%s",
+            seconds * 1000,
+            function,
+            stack,
+        )
+
+
+loop_monitor = LoopMonitor()
+
+
+def get_loop_monitor() -> LoopMonitor:
+    return loop_monitor
+
+
+def setup_loop_monitor(settings: Settings) -> LoopMonitor:
+    global loop_monitor
+    loop_monitor = LoopMonitor(
+        interval_seconds=settings.loop_monitor_interval_seconds,
+        threshold_seconds=settings.loop_block_threshold_ms / 1000,
+        debug=settings.loop_monitor_debug,
+    )
+    return loop_monitor
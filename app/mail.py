@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import smtplib
+from dataclasses import dataclass
+from email.message import EmailMessage
+
+from app.jobs import JobHandler
+from app.settings import Settings
+
+PASSWORD_RESET_EMAIL = "password_reset_email"
+
+
+@dataclass
+class Mailer:
+    host: str = "localhost"
+    port: int = 25
+    sender: str = "no-reply@iceberg.com.br"
+    timeout: float = 10
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Mailer:
+        return cls(
+            host=settings.smtp_host,
+            port=settings.smtp_port,
+            sender=settings.smtp_sender,
+        )
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+
+        await asyncio.to_thread(self.send_message, message)
+
+    def send_message(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+def mail_handlers(mailer: Mailer) -> dict[str, JobHandler]:
+    async def password_reset_email(payload: dict[str, str]) -> None:
+        await mailer.send(
+            payload["email"],
+            "Recuperação de senha",
+            f"Use o código {payload['token']} para cadastrar uma nova senha.",
+        )
+
+    return {PASSWORD_RESET_EMAIL: password_reset_email}
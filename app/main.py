@@ -1,17 +1,36 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
-
-from fastapi import Depends, FastAPI, HTTPException
-
-from app.authorization import decode_token_jwt
-from app.database import setup_db_main, setup_db_tests
+import asyncio
+import math
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.archive import run_archiver
+from app.authorization import decode_token_jwt, refresh_access_token, require_role
+from app.cache import Cache, setup_cache
+from app.cleanup import run_cleanup
+from app.compression import CompressionMiddleware
+from app.database import (
+    create_engine_main,
+    setup_db_main,
+    setup_db_tests,
+    warm_pool,
+)
+from app.idempotency import IdempotencyStore
+from app.jobs import JobQueue, setup_jobs
+from app.loop_monitor import setup_loop_monitor
+from app.mail import Mailer, mail_handlers
+from app.metrics import render_metrics
 from app.models import (
     ChagedPasswordInput,
     ChagedPasswordOutput,
     CreateProductInput,
     CreateProductOutput,
+    CreateProductsInput,
+    CreateProductsOutput,
     EditOccupationInput,
     EditOccupationOutput,
     EditUserInput,
@@ -24,17 +43,26 @@ from app.models import (
     GetEmployeeLoggedOutput,
     GetEmployeesOutput,
     GetOrderOutputToUser,
+    GetOrdersPageOutput,
     GetProductIdOutput,
     GetProductsActivesOutput,
+    GetSlowQueriesOutput,
     GetUserLoggedOutput,
     InactivateProductInput,
     InactivateProductOutput,
+    InactivateProductsInput,
+    InactivateProductsOutput,
     InputOrderShop,
+    InputOrdersShop,
     LoginEmployeeOutput,
     LoginUser,
     LoginUserOutput,
     OrderInput,
     OrderOutput,
+    OrdersShopOutput,
+    RefreshTokenInput,
+    RefreshTokenOutput,
+    RevokeTokensOutput,
     SearchPasswordInput,
     SearchPasswordOutPut,
     UpdateProductInput,
@@ -50,22 +78,42 @@ from app.order import (
     return_all_orders,
     return_order_by_id,
 )
+from app.passwords import setup_password_hasher
 from app.product import (
     delete_product,
     get_all_products,
     get_product,
     get_products_actives,
     product_create,
+    products_create_bulk,
+    products_create_csv,
+    publish_catalog,
     update_product,
     update_product_status,
+    update_products_status,
 )
+from app.profiling import ProfilingMiddleware, get_profiler, setup_profiler
+from app.public_catalog import (
+    IMMUTABLE,
+    catalog_etag,
+    catalog_version,
+    etag_matches,
+    get_public_catalog,
+    setup_public_catalog,
+)
+from app.rate_limit import RateLimiter
+from app.replicas import SessionRouter, setup_replicas
+from app.revocation import get_revocations, setup_revocations
 from app.settings import Settings
 from app.shop_order import (
     accepted_or_recused_order,
+    apply_orders_transitions,
     cancel_order_accepted,
     finish_order_accepted,
     return_open_orders,
 )
+from app.slow_queries import get_slow_queries, setup_slow_queries
+from app.startup import StartupTimer
 from app.user import (
     change_occupation,
     change_password,
@@ -78,14 +126,27 @@ from app.user import (
     get_all_employees,
     login_employee,
     login_user,
+    revoke_employee_tokens,
 )
 
 app = FastAPI()
+middleware_settings = Settings()
+app.add_middleware(CompressionMiddleware, settings=middleware_settings)
+if middleware_settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
 
 
 @dataclass
 class ServerContext:
     session_maker: Any
+    idempotency: IdempotencyStore = field(default_factory=IdempotencyStore)
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+    cache: Cache = field(default_factory=Cache)
+    tasks: list[asyncio.Task[None]] = field(default_factory=list)
+    startup_phases: dict[str, float] = field(default_factory=dict)
+    settings: Settings = field(default_factory=Settings)
+    jobs: JobQueue = field(default_factory=JobQueue)
+    sessions: SessionRouter = field(default_factory=lambda: SessionRouter(primary=None))
 
 
 context = ServerContext(session_maker=None)
@@ -93,17 +154,119 @@ context = ServerContext(session_maker=None)
 
 @app.on_event("startup")
 async def startup_event(test: bool = False, settings: Settings = Settings()) -> None:
+    timer = StartupTimer()
+
     if test:
-        session = await setup_db_tests(str(settings.db_test))
+        with timer.phase("database"):
+            session = await setup_db_tests(str(settings.db_test))
     else:
-        session = await setup_db_main(str(settings.db_url))
+        with timer.phase("engine"):
+            engine = create_engine_main(settings)
+
+        with timer.phase("schema"):
+            if settings.db_create_schema:
+                # alembic is only needed here, workers started with
+                # DB_CREATE_SCHEMA=false never import it. app.server upgrades
+                # once before starting its workers and turns this off for them.
+                from app.migrate import upgrade_engine
+
+                await upgrade_engine(engine, settings)
+            session = setup_db_main(engine)
+
+        with timer.phase("pool"):
+            await warm_pool(engine, settings.db_pool_warm)
+
+    with timer.phase("slow_queries"):
+        setup_slow_queries(session.kw["bind"], settings)
+
+    with timer.phase("cache"):
+        cache = setup_cache(settings)
+
+    with timer.phase("catalog"):
+        setup_public_catalog(settings)
+        await publish_catalog(session)
+
+    setup_profiler(settings)
+
+    with timer.phase("passwords"):
+        setup_password_hasher(settings, calibrated=not test)
+
+    with timer.phase("revocations"):
+        await setup_revocations(session, settings.revocation_refresh_seconds)
+
+    jobs = setup_jobs(session, settings, mail_handlers(Mailer.from_settings(settings)))
 
     global context
-    context = ServerContext(session_maker=session)
+    context = ServerContext(
+        session_maker=session,
+        idempotency=IdempotencyStore(
+            ttl=settings.idempotency_ttl_seconds,
+            session_maker=session if settings.idempotency_db else None,
+        ),
+        rate_limiter=RateLimiter(
+            capacity=settings.rate_limit_capacity,
+            refill_rate=settings.rate_limit_refill_per_second,
+            enabled=settings.rate_limit_enabled,
+        ),
+        cache=cache,
+        startup_phases=timer.phases,
+        settings=settings,
+        jobs=jobs,
+        sessions=setup_replicas(session, settings),
+    )
+
+    timer.report()
+
+
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    context.tasks.append(
+        asyncio.create_task(setup_loop_monitor(context.settings).run())
+    )
+    context.tasks.append(asyncio.create_task(context.cache.listen()))
+    context.tasks.append(asyncio.create_task(context.jobs.run()))
+    context.tasks.append(asyncio.create_task(get_revocations().run()))
+    context.tasks.append(
+        asyncio.create_task(run_cleanup(context.session_maker, context.settings))
+    )
+
+    if context.sessions.replicas:
+        context.tasks.append(asyncio.create_task(context.sessions.monitor()))
+
+    if context.settings.order_archive_enabled:
+        context.tasks.append(
+            asyncio.create_task(run_archiver(context.session_maker, context.settings))
+        )
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks() -> None:
+    for task in context.tasks:
+        task.cancel()
+
+    await asyncio.gather(*context.tasks, return_exceptions=True)
+    context.tasks.clear()
+
+
+async def limit_requests(request: Request, scope: str, identifier: str) -> None:
+    client = request.client.host if request.client else "unknown"
+
+    retry_after = await context.rate_limiter.check(
+        f"{scope}:ip:{client}", f"{scope}:login:{identifier.strip().lower()}"
+    )
+
+    if retry_after:
+        raise HTTPException(
+            429,
+            "TOO_MANY_REQUESTS",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
 
 
 @app.post("/register/user", status_code=201, response_model=UserOutput)
-async def register_user(user: UserRegister) -> UserOutput:
+async def register_user(user: UserRegister, http_request: Request) -> UserOutput:
+    await limit_requests(http_request, "register", user.email)
+
     response = await create_user(user, context.session_maker)
 
     if isinstance(response, UserOutput):
@@ -125,7 +288,9 @@ async def register_employee(user: EmployeeRegister) -> EmployeeOutput:
 
 
 @app.post("/login/user", status_code=200, response_model=LoginUserOutput)
-async def login(request: LoginUser) -> LoginUserOutput:
+async def login(request: LoginUser, http_request: Request) -> LoginUserOutput:
+    await limit_requests(http_request, "login", request.login)
+
     response = await login_user(request, context.session_maker)
 
     if isinstance(response, LoginUserOutput):
@@ -136,7 +301,11 @@ async def login(request: LoginUser) -> LoginUserOutput:
 
 
 @app.post("/login/employee", status_code=200, response_model=LoginEmployeeOutput)
-async def login_backoffice(request: LoginUser) -> LoginEmployeeOutput:
+async def login_backoffice(
+    request: LoginUser, http_request: Request
+) -> LoginEmployeeOutput:
+    await limit_requests(http_request, "login", request.login)
+
     response = await login_employee(request, context.session_maker)
 
     if isinstance(response, LoginEmployeeOutput):
@@ -146,8 +315,23 @@ async def login_backoffice(request: LoginUser) -> LoginEmployeeOutput:
         raise HTTPException(response.status_code, response.message)
 
 
+@app.post("/token/refresh", status_code=200, response_model=RefreshTokenOutput)
+async def token_refresh(request: RefreshTokenInput) -> RefreshTokenOutput:
+    response = await refresh_access_token(request, context.session_maker)
+
+    if isinstance(response, RefreshTokenOutput):
+        return response
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+
 @app.post("/forgot/password", status_code=201, response_model=SearchPasswordOutPut)
-async def forgot_password(request: SearchPasswordInput) -> SearchPasswordOutPut:
+async def forgot_password(
+    request: SearchPasswordInput, http_request: Request
+) -> SearchPasswordOutPut:
+    await limit_requests(http_request, "forgot", request.email)
+
     response = await forgot_password_verify(request, context.session_maker)
 
     if isinstance(response, SearchPasswordOutPut):
@@ -161,7 +345,12 @@ async def forgot_password(request: SearchPasswordInput) -> SearchPasswordOutPut:
 async def change_password_response(
     request: ChagedPasswordInput, user: UserToken = Depends(decode_token_jwt)
 ) -> ChagedPasswordOutput:
-    response = await change_password(request, user, context.session_maker)
+    response = await change_password(
+        request,
+        user,
+        await context.sessions.writer(user),
+        context.settings.forgot_password_ttl_seconds,
+    )
 
     if isinstance(response, ChagedPasswordOutput):
         return response
@@ -176,9 +365,13 @@ async def edit_user(
 ) -> EditUserOutput:
 
     if user.type == "user":
-        response = await edit_account_user(request, user, context.session_maker)
+        response = await edit_account_user(
+            request, user, await context.sessions.writer(user)
+        )
     else:
-        response = await edit_account_employee(request, user, context.session_maker)
+        response = await edit_account_employee(
+            request, user, await context.sessions.writer(user)
+        )
 
     if isinstance(response, EditUserOutput):
         return response
@@ -195,7 +388,7 @@ async def get_employees(
     if not user.type == "employee":
         raise HTTPException(401, "ACCESS_DENIED")
 
-    response = await get_all_employees(context.session_maker)
+    response = await get_all_employees(await context.sessions.reader(user))
 
     if isinstance(response, GetEmployeesOutput):
         return response
@@ -211,7 +404,9 @@ async def get_employees(
 async def get_user(
     user: UserToken = Depends(decode_token_jwt),
 ) -> GetUserLoggedOutput | GetEmployeeLoggedOutput | Error:
-    response = await get_account_logged(user, context.session_maker)
+    response = await get_account_logged(
+        user, context.session_maker, context.settings.profile_cache_ttl_seconds
+    )
 
     if isinstance(response, GetUserLoggedOutput):
         return response
@@ -223,12 +418,27 @@ async def get_user(
         raise HTTPException(response.status_code, response.message)
 
 
+@app.post("/revoke/employee/{id}", status_code=200, response_model=RevokeTokensOutput)
+async def revoke_employee(
+    id: int, user: UserToken = Depends(require_role("manager"))
+) -> RevokeTokensOutput:
+    response = await revoke_employee_tokens(id, await context.sessions.writer(user))
+
+    if isinstance(response, RevokeTokensOutput):
+        return response
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+
 @app.put("/edit/occupation", status_code=200, response_model=EditOccupationOutput)
 async def edit_occupation(
     request: EditOccupationInput, user: UserToken = Depends(decode_token_jwt)
 ) -> EditOccupationOutput:
 
-    response = await change_occupation(request, user, context.session_maker)
+    response = await change_occupation(
+        request, user, await context.sessions.writer(user)
+    )
 
     if isinstance(response, EditOccupationOutput):
         return response
@@ -243,7 +453,7 @@ async def create_product(
 ) -> CreateProductOutput:
 
     if user.type == "employee":
-        response = await product_create(request, context.session_maker)
+        response = await product_create(request, await context.sessions.writer(user))
     else:
         raise HTTPException(403, "ACCESS_DENIED")
 
@@ -260,7 +470,9 @@ async def update_product_by_id(
 ) -> UpdateProductOutput:
 
     if user.type == "employee":
-        response = await update_product(request, id, context.session_maker)
+        response = await update_product(
+            request, id, await context.sessions.writer(user)
+        )
     else:
         raise HTTPException(403, "ACCESS_DENIED")
 
@@ -277,7 +489,7 @@ async def delete_product_by_id(
 ) -> UpdateProductOutput:
 
     if user.type == "employee":
-        response = await delete_product(id, context.session_maker)
+        response = await delete_product(id, await context.sessions.writer(user))
     else:
         raise HTTPException(403, "ACCESS_DENIED")
 
@@ -294,9 +506,10 @@ async def delete_product_by_id(
 async def change_status_product(
     request: InactivateProductInput, user: UserToken = Depends(decode_token_jwt)
 ) -> InactivateProductOutput:
-    print(request)
     if user.type == "employee":
-        response = await update_product_status(request, context.session_maker)
+        response = await update_product_status(
+            request, await context.sessions.writer(user)
+        )
     else:
         raise HTTPException(403, "ACCESS_DENIED")
 
@@ -307,6 +520,68 @@ async def change_status_product(
         raise HTTPException(response.status_code, response.message)
 
 
+@app.post("/create/products", status_code=201, response_model=CreateProductsOutput)
+async def create_products(
+    request: CreateProductsInput, user: UserToken = Depends(decode_token_jwt)
+) -> CreateProductsOutput:
+
+    if user.type == "employee":
+        response = await products_create_bulk(
+            request, await context.sessions.writer(user)
+        )
+    else:
+        raise HTTPException(403, "ACCESS_DENIED")
+
+    if isinstance(response, CreateProductsOutput):
+        return response
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+
+@app.post("/create/products/csv", status_code=201, response_model=CreateProductsOutput)
+async def create_products_csv(
+    request: Request, user: UserToken = Depends(decode_token_jwt)
+) -> CreateProductsOutput:
+
+    if not user.type == "employee":
+        raise HTTPException(403, "ACCESS_DENIED")
+
+    try:
+        content = (await request.body()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(400, "INVALID_FILE_ENCODING")
+
+    response = await products_create_csv(content, await context.sessions.writer(user))
+
+    if isinstance(response, CreateProductsOutput):
+        return response
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+
+@app.patch(
+    "/inactivate/products", status_code=200, response_model=InactivateProductsOutput
+)
+async def change_status_products(
+    request: InactivateProductsInput, user: UserToken = Depends(decode_token_jwt)
+) -> InactivateProductsOutput:
+
+    if user.type == "employee":
+        response = await update_products_status(
+            request, await context.sessions.writer(user)
+        )
+    else:
+        raise HTTPException(403, "ACCESS_DENIED")
+
+    if isinstance(response, InactivateProductsOutput):
+        return response
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+
 @app.get("/product/{id}", status_code=200, response_model=GetProductIdOutput)
 async def get_product_by_id(
     id: int,
@@ -336,6 +611,69 @@ async def get_all_product_actives(
         raise HTTPException(response.status_code, response.message)
 
 
+@app.get("/public/products", status_code=200, response_class=Response)
+async def get_public_products(
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    response = await get_products_actives(context.session_maker)
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+    catalog = get_public_catalog()
+    body = response.json().encode("utf8")
+    version = catalog_version(body)
+    headers = {
+        "Cache-Control": catalog.cache_control,
+        "ETag": catalog_etag(version),
+        "Content-Location": catalog.url(version),
+    }
+
+    if etag_matches(if_none_match, version):
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/public/products/{version}.json", status_code=200, response_class=Response)
+async def get_public_products_version(version: str) -> Response:
+    catalog = get_public_catalog()
+    artifact = catalog.artifact(version)
+    if artifact:
+        return FileResponse(
+            artifact,
+            media_type="application/json",
+            headers={"Cache-Control": IMMUTABLE},
+        )
+
+    response = await get_products_actives(context.session_maker)
+
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
+
+    body = response.json().encode("utf8")
+    if catalog_version(body) != version:
+        raise HTTPException(404, "CATALOG_VERSION_NOT_FOUND")
+
+    return Response(
+        body, media_type="application/json", headers={"Cache-Control": IMMUTABLE}
+    )
+
+
+@app.get("/public/product/{id}", status_code=200, response_model=GetProductIdOutput)
+async def get_public_product(id: int, response: Response) -> GetProductIdOutput:
+    product = await get_product(id, context.session_maker)
+
+    if isinstance(product, Error):
+        raise HTTPException(product.status_code, product.message)
+
+    if not product.activated:
+        raise HTTPException(404, "PRODUCT_NOT_FOUND")
+
+    response.headers["Cache-Control"] = get_public_catalog().cache_control
+    return product
+
+
 @app.get("/products/all", status_code=200, response_model=GetAllProductsOutput)
 async def get_all_products_createds(
     user: UserToken = Depends(decode_token_jwt),
@@ -352,9 +690,18 @@ async def get_all_products_createds(
 
 @app.post("/order", status_code=201, response_model=CreateProductOutput)
 async def order_by_client(
-    request: OrderInput, user: UserToken = Depends(decode_token_jwt)
+    request: OrderInput,
+    user: UserToken = Depends(decode_token_jwt),
+    idempotency_key: Optional[str] = Header(default=None, max_length=255),
 ) -> OrderOutput:
-    response = await order_create(request, user, context.session_maker)
+    if idempotency_key:
+        response = await context.idempotency.order_create_once(
+            request, user, idempotency_key, await context.sessions.writer(user)
+        )
+    else:
+        response = await order_create(
+            request, user, await context.sessions.writer(user)
+        )
 
     if isinstance(response, OrderOutput):
         return response
@@ -367,7 +714,7 @@ async def order_by_client(
 async def order_cancel(
     id: int, user: UserToken = Depends(decode_token_jwt)
 ) -> OrderOutput:
-    response = await cancel_order(id, context.session_maker)
+    response = await cancel_order(id, await context.sessions.writer(user))
 
     if isinstance(response, OrderOutput):
         return response
@@ -389,13 +736,17 @@ async def get_order_by_id(
         raise HTTPException(response.status_code, response.message)
 
 
-@app.get("/orders", status_code=200, response_model=GetAllOrdersOutput)
+@app.get("/orders", status_code=200, response_model=GetOrdersPageOutput)
 async def get_order_by_user(
+    after: int = 0,
+    limit: int = Query(default=50, ge=1, le=200),
     user: UserToken = Depends(decode_token_jwt),
-) -> GetAllOrdersOutput:
-    response = await return_all_orders(user, context.session_maker)
+) -> GetOrdersPageOutput:
+    response = await return_all_orders(
+        user, await context.sessions.reader(user), after, limit
+    )
 
-    if isinstance(response, GetAllOrdersOutput):
+    if isinstance(response, GetOrdersPageOutput):
         return response
 
     if isinstance(response, Error):
@@ -406,7 +757,7 @@ async def get_order_by_user(
 async def get_order_active(
     user: UserToken = Depends(decode_token_jwt),
 ) -> GetAllOrdersOutput:
-    response = await orders_active(user, context.session_maker)
+    response = await orders_active(user, await context.sessions.reader(user))
 
     if isinstance(response, GetAllOrdersOutput):
         return response
@@ -417,13 +768,9 @@ async def get_order_active(
 
 @app.get("/shop_orders/open", status_code=200, response_model=GetAllOrdersOutput)
 async def shop_orders_opens(
-    user: UserToken = Depends(decode_token_jwt),
+    user: UserToken = Depends(require_role("manager", "attendant")),
 ) -> GetAllOrdersOutput:
-
-    if not user.type == "employee":
-        raise HTTPException(403, "ACCESS_DENIED")
-
-    response = await return_open_orders(context.session_maker)
+    response = await return_open_orders(await context.sessions.reader(user))
 
     if isinstance(response, GetAllOrdersOutput):
         return response
@@ -435,13 +782,11 @@ async def shop_orders_opens(
 @app.put("/shop_orders", status_code=200, response_model=GetOrderOutputToUser)
 async def accepted_or_recused_order_shop(
     request: InputOrderShop,
-    user: UserToken = Depends(decode_token_jwt),
+    user: UserToken = Depends(require_role("manager", "attendant")),
 ) -> GetOrderOutputToUser:
-
-    if not user.type == "employee":
-        raise HTTPException(403, "ACCESS_DENIED")
-
-    response = await accepted_or_recused_order(request, context.session_maker)
+    response = await accepted_or_recused_order(
+        request, await context.sessions.writer(user)
+    )
 
     if isinstance(response, GetOrderOutputToUser):
         return response
@@ -453,13 +798,9 @@ async def accepted_or_recused_order_shop(
 @app.put("/shop_orders/{id}", status_code=200, response_model=GetOrderOutputToUser)
 async def cancel_order_shop(
     id: int,
-    user: UserToken = Depends(decode_token_jwt),
+    user: UserToken = Depends(require_role("manager", "attendant")),
 ) -> GetOrderOutputToUser:
-
-    if not user.type == "employee":
-        raise HTTPException(403, "ACCESS_DENIED")
-
-    response = await cancel_order_accepted(id, context.session_maker)
+    response = await cancel_order_accepted(id, await context.sessions.writer(user))
 
     if isinstance(response, GetOrderOutputToUser):
         return response
@@ -471,16 +812,56 @@ async def cancel_order_shop(
 @app.patch("/shop_orders/{id}", status_code=200, response_model=GetOrderOutputToUser)
 async def order_finished(
     id: int,
-    user: UserToken = Depends(decode_token_jwt),
+    user: UserToken = Depends(require_role("manager", "attendant")),
 ) -> GetOrderOutputToUser:
+    response = await finish_order_accepted(id, await context.sessions.writer(user))
 
-    if not user.type == "employee":
-        raise HTTPException(403, "ACCESS_DENIED")
+    if isinstance(response, GetOrderOutputToUser):
+        return response
 
-    response = await finish_order_accepted(id, context.session_maker)
+    if isinstance(response, Error):
+        raise HTTPException(response.status_code, response.message)
 
-    if isinstance(response, GetOrderOutputToUser):
+
+@app.post("/shop_orders/batch", status_code=200, response_model=OrdersShopOutput)
+async def shop_orders_batch(
+    request: InputOrdersShop,
+    user: UserToken = Depends(require_role("manager", "attendant")),
+) -> OrdersShopOutput:
+    response = await apply_orders_transitions(
+        request, await context.sessions.writer(user)
+    )
+
+    if isinstance(response, OrdersShopOutput):
         return response
 
     if isinstance(response, Error):
         raise HTTPException(response.status_code, response.message)
+
+
+@app.get("/slow_queries", status_code=200, response_model=GetSlowQueriesOutput)
+async def list_slow_queries(
+    limit: int = Query(20, ge=1, le=100),
+    user: UserToken = Depends(require_role("manager", "attendant")),
+) -> GetSlowQueriesOutput:
+    return get_slow_queries().top(limit)
+
+
+@app.get("/profiles/{id}", status_code=200, response_class=PlainTextResponse)
+async def download_profile(
+    id: str, user: UserToken = Depends(require_role("manager", "attendant"))
+) -> PlainTextResponse:
+    profile = get_profiler().get(id)
+
+    if profile is None:
+        raise HTTPException(404, "PROFILE_NOT_FOUND")
+
+    return PlainTextResponse(
+        profile,
+        headers={"Content-Disposition": f'attachment; filename="{id}.folded"'},
+    )
+
+
+@app.get("/metrics", status_code=200, response_class=PlainTextResponse)
+async def metrics() -> str:
+    return render_metrics()
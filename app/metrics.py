@@ -0,0 +1,53 @@
+"""
+Process-local metrics rendered in the Prometheus text format at /metrics.
+Every worker keeps its own values; the scraper sums them.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+LabelValues = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class Metric:
+    name: str
+    help: str
+    type: str = "counter"
+    values: dict[LabelValues, float] = field(default_factory=dict)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[tuple(sorted(labels.items()))] = value
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self.values.items():
+            label_text = ",".join(f'{name}="{label}"' for name, label in labels)
+            name = f"{self.name}{{{label_text}}}" if labels else self.name
+            lines.append(f"{name} {value}")
+        return lines
+
+
+registry: dict[str, Metric] = {}
+
+
+def counter(name: str, help: str) -> Metric:
+    return registry.setdefault(name, Metric(name, help, "counter"))
+
+
+def gauge(name: str, help: str) -> Metric:
+    return registry.setdefault(name, Metric(name, help, "gauge"))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+"""
+Versioned schema migrations, kept in app/migrations/versions.
+
+    python -m app.migrate upgrade [revision]     # defaults to head
+    python -m app.migrate downgrade <revision>   # e.g. -1 or base
+    python -m app.migrate current | history
+    python -m app.migrate stamp <revision>
+    python -m app.migrate revision -m "message" [--autogenerate]
+
+`--sql` prints the upgrade/downgrade statements instead of running them.
+Index revisions use `app.migrations.online`, which builds them with
+`CREATE INDEX CONCURRENTLY` on Postgres so `orders` stays writable.
+
+Run it once per deploy, before starting the workers with
+DB_CREATE_SCHEMA=false, so no worker spends its startup on DDL.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.settings import Settings
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def alembic_config(
+    settings: Settings, connection: Optional[Connection] = None
+) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["settings"] = settings
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+async def upgrade_engine(engine: AsyncEngine, settings: Settings) -> None:
+    def upgrade(connection: Connection) -> None:
+        command.upgrade(alembic_config(settings, connection), "head")
+
+    async with engine.connect() as connection:
+        await connection.run_sync(upgrade)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = commands.add_parser("upgrade")
+    upgrade.add_argument("revision", nargs="?", default="head")
+    upgrade.add_argument("--sql", action="store_true")
+
+    downgrade = commands.add_parser("downgrade")
+    downgrade.add_argument("revision")
+    downgrade.add_argument("--sql", action="store_true")
+
+    stamp = commands.add_parser("stamp")
+    stamp.add_argument("revision")
+
+    commands.add_parser("current")
+    commands.add_parser("history")
+
+    revision = commands.add_parser("revision")
+    revision.add_argument("-m", "--message", required=True)
+    revision.add_argument("--autogenerate", action="store_true")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None, settings: Settings = Settings()) -> None:
+    args = parse_args(argv)
+    config = alembic_config(settings)
+
+    if args.command == "upgrade":
+        command.upgrade(config, args.revision, sql=args.sql)
+    elif args.command == "downgrade":
+        command.downgrade(config, args.revision, sql=args.sql)
+    elif args.command == "stamp":
+        command.stamp(config, args.revision)
+    elif args.command == "current":
+        command.current(config)
+    elif args.command == "history":
+        command.history(config)
+    else:
+        command.revision(config, args.message, autogenerate=args.autogenerate)
+
+
+if __name__ == "__main__":
+    main()
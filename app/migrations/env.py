@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+
+from alembic import context
+from sqlalchemy.engine import Connection
+
+from app.database import Base, create_engine_main
+from app.settings import Settings
+
+config = context.config
+settings: Settings = config.attributes.get("settings") or Settings()
+
+
+def run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        transaction_per_migration=True,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_engine() -> None:
+    engine = create_engine_main(settings)
+    async with engine.connect() as connection:
+        await connection.run_sync(run_migrations)
+    await engine.dispose()
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=settings.db_url,
+        target_metadata=Base.metadata,
+        transaction_per_migration=True,
+        literal_binds=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif "connection" in config.attributes:
+    run_migrations(config.attributes["connection"])
+else:
+    asyncio.run(run_migrations_engine())
@@ -0,0 +1,42 @@
+"""
+Index operations that do not block writes on Postgres.
+
+`CREATE INDEX CONCURRENTLY` cannot run inside a transaction, so the
+operation runs in an autocommit block: everything the revision did before
+it is committed first. Keep such revisions to index changes only. A failed
+concurrent build leaves an INVALID index behind, drop it before retrying.
+Other databases get a plain index.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from alembic import op
+from alembic.runtime.migration import MigrationContext
+
+
+def migration_context() -> MigrationContext:
+    context: MigrationContext = op.get_context()  # type: ignore[no-untyped-call]
+    return context
+
+
+def is_postgresql() -> bool:
+    return bool(migration_context().dialect.name == "postgresql")
+
+
+def create_index_online(name: str, table: str, columns: list[str], **kw: Any) -> None:
+    if not is_postgresql():
+        op.create_index(name, table, columns, **kw)
+        return
+
+    with migration_context().autocommit_block():
+        op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+
+
+def drop_index_online(name: str, table: str) -> None:
+    if not is_postgresql():
+        op.drop_index(name, table_name=table)
+        return
+
+    with migration_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
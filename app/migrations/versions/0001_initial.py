@@ -0,0 +1,94 @@
+"""initial schema
+
+Databases created by `create_all` before migrations existed already have
+these tables: mark them with `python -m app.migrate stamp 0001`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("cpf", sa.String(), nullable=False, unique=True),
+        sa.Column("phone", sa.String(), nullable=False, unique=True),
+        sa.Column("password", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "employee",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        sa.Column("cpf", sa.String(), nullable=False, unique=True),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("manager", sa.Boolean(), nullable=True),
+        sa.Column("attendant", sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        "forgot_password",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("token", sa.String(), nullable=False),
+        sa.Column("user", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("requisition_date", sa.DateTime(), nullable=False),
+        sa.Column("utilized", sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        "product",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("image_url", sa.String(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("activate", sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("requisition_date", sa.Date(), nullable=False),
+        sa.Column("finished", sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        "items_orders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("order", sa.Integer(), sa.ForeignKey("orders.id"), nullable=False),
+        sa.Column("product", sa.Integer(), sa.ForeignKey("product.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+    )
+    op.create_table(
+        "idempotency_key",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("user", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("order", sa.Integer(), sa.ForeignKey("orders.id"), nullable=False),
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("user", "key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("idempotency_key")
+    op.drop_table("items_orders")
+    op.drop_table("orders")
+    op.drop_table("product")
+    op.drop_table("forgot_password")
+    op.drop_table("employee")
+    op.drop_table("user")
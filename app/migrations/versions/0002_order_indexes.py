@@ -0,0 +1,26 @@
+"""indexes for the order listings
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:30:00
+
+"""
+from app.migrations.online import create_index_online, drop_index_online
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_online("ix_orders_user_finished", "orders", ["user", "finished"])
+    create_index_online("ix_orders_status", "orders", ["status"])
+    create_index_online("ix_items_orders_order", "items_orders", ["order"])
+
+
+def downgrade() -> None:
+    drop_index_online("ix_items_orders_order", "items_orders")
+    drop_index_online("ix_orders_status", "orders")
+    drop_index_online("ix_orders_user_finished", "orders")
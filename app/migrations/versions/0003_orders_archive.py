@@ -0,0 +1,46 @@
+"""archive tables for finished orders
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("user", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("requisition_date", sa.Date(), nullable=False),
+        sa.Column("finished", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_orders_archive_user", "orders_archive", ["user"])
+    op.create_table(
+        "items_orders_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column(
+            "order", sa.Integer(), sa.ForeignKey("orders_archive.id"), nullable=False
+        ),
+        sa.Column("product", sa.Integer(), sa.ForeignKey("product.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_items_orders_archive_order", "items_orders_archive", ["order"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_items_orders_archive_order", "items_orders_archive")
+    op.drop_table("items_orders_archive")
+    op.drop_index("ix_orders_archive_user", "orders_archive")
+    op.drop_table("orders_archive")
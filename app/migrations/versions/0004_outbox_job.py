@@ -0,0 +1,37 @@
+"""outbox table for background jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 11:30:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_job",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+    )
+    op.create_index(
+        "ix_outbox_job_status_run_after", "outbox_job", ["status", "run_after"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_job_status_run_after", "outbox_job")
+    op.drop_table("outbox_job")
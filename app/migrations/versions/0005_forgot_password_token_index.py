@@ -0,0 +1,22 @@
+"""index reset tokens by token
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:00:00
+
+"""
+from app.migrations.online import create_index_online, drop_index_online
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_online("ix_forgot_password_token", "forgot_password", ["token"])
+
+
+def downgrade() -> None:
+    drop_index_online("ix_forgot_password_token", "forgot_password")
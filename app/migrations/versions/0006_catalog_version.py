@@ -0,0 +1,39 @@
+"""catalog version and the price version of orders
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 12:30:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+    op.bulk_insert(
+        sa.table("catalog_version", sa.column("id"), sa.column("version")),
+        [{"id": 1, "version": 1}],
+    )
+    op.add_column("orders", sa.Column("price_version", sa.Integer(), nullable=True))
+    op.add_column(
+        "orders_archive", sa.Column("price_version", sa.Integer(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("orders_archive") as batch:
+        batch.drop_column("price_version")
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_column("price_version")
+    op.drop_table("catalog_version")
@@ -0,0 +1,31 @@
+"""revoked tokens
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 13:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_token",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("revoked_at", sa.Float(), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_revoked_token_key", "revoked_token", ["key"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_token_key", "revoked_token")
+    op.drop_table("revoked_token")
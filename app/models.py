@@ -13,6 +13,7 @@ _email_field = Field(
 class UserToken(BaseModel):
     id: int
     type: str
+    roles: list[str] = []
 
 
 class Error(BaseModel):
@@ -57,12 +58,28 @@ class LoginUserOutput(BaseModel):
     login: str
     message: str
     token: str
+    refresh_token: str
 
 
 class LoginEmployeeOutput(BaseModel):
     login: str
     message: str
     token: str
+    refresh_token: str
+
+
+class RevokeTokensOutput(BaseModel):
+    id: int
+    message: str
+
+
+class RefreshTokenInput(BaseModel):
+    refresh_token: str
+
+
+class RefreshTokenOutput(BaseModel):
+    token: str
+    message: str
 
 
 class UpdateEmployeeOutput(BaseModel):
@@ -168,6 +185,29 @@ class InactivateProductInput(BaseModel):
     status: bool
 
 
+class CreateProductsInput(BaseModel):
+    products: list[CreateProductInput] = Field(min_items=1, max_items=500)
+
+
+class BulkProductOutput(BaseModel):
+    index: int
+    id: Optional[int]
+    message: str
+
+
+class CreateProductsOutput(BaseModel):
+    products: list[BulkProductOutput]
+
+
+class InactivateProductsInput(BaseModel):
+    ids: list[int] = Field(min_items=1, max_items=500)
+    status: bool
+
+
+class InactivateProductsOutput(BaseModel):
+    products: list[InactivateProductOutput]
+
+
 class GetProductIdOutput(BaseModel):
     id: int
     name: str
@@ -212,6 +252,45 @@ class GetAllOrdersOutput(BaseModel):
     orders: list[GetOrderOutputToUser]
 
 
+class GetOrdersPageOutput(BaseModel):
+    orders: list[GetOrderOutputToUser]
+    next_cursor: Optional[int]
+
+
 class InputOrderShop(BaseModel):
     id: int
     accepted: bool
+
+
+class OrderShopAction(BaseModel):
+    id: int
+    action: Literal["accept", "refuse", "cancel", "finish"]
+
+
+class InputOrdersShop(BaseModel):
+    orders: list[OrderShopAction] = Field(min_items=1, max_items=200)
+
+
+class OrderShopResult(BaseModel):
+    id: int
+    action: str
+    message: str
+    order: Optional[GetOrderOutputToUser]
+
+
+class OrdersShopOutput(BaseModel):
+    orders: list[OrderShopResult]
+
+
+class SlowQueryOutput(BaseModel):
+    statement: str
+    caller: str
+    parameters: str
+    calls: int
+    total_ms: float
+    max_ms: float
+    plan: Optional[str]
+
+
+class GetSlowQueriesOutput(BaseModel):
+    queries: list[SlowQueryOutput]
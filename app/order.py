@@ -1,27 +1,68 @@
 from __future__ import annotations
 
 from datetime import date
+from typing import Any, Iterable, Optional
 
-from sqlalchemy import update
+from sqlalchemy import union_all, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import func
 
-from app.database import ItemOrder, Order, Product
+from app.cache import get_cache, order_key
+from app.catalog import get_price_cache
+from app.database import (
+    ArchivedItemOrder,
+    ArchivedOrder,
+    IdempotencyKey,
+    ItemOrder,
+    Order,
+)
 from app.models import (
     Error,
     GetAllOrdersOutput,
     GetOrderOutputToUser,
+    GetOrdersPageOutput,
     ItemsOrders,
     OrderInput,
     OrderOutput,
     UserToken,
 )
 
+ORDER_COLUMNS: tuple[Any, ...] = (
+    Order.id,
+    Order.status,
+    Order.price,
+    Order.requisition_date,
+    Order.finished,
+)
+ITEM_COLUMNS: tuple[Any, ...] = (ItemOrder.order, ItemOrder.id, ItemOrder.quantity)
+
+# Hot and archived orders as one selectable, an order lives in only one of them.
+ALL_ORDERS = union_all(
+    select(Order.user, *ORDER_COLUMNS),
+    select(
+        ArchivedOrder.user,
+        ArchivedOrder.id,
+        ArchivedOrder.status,
+        ArchivedOrder.price,
+        ArchivedOrder.requisition_date,
+        ArchivedOrder.finished,
+    ),
+).subquery("all_orders")
+ALL_ITEMS = union_all(
+    select(*ITEM_COLUMNS),
+    select(ArchivedItemOrder.order, ArchivedItemOrder.id, ArchivedItemOrder.quantity),
+).subquery("all_items")
+ALL_ORDER_COLUMNS = tuple(ALL_ORDERS.c[column.key] for column in ORDER_COLUMNS)
+ALL_ITEM_COLUMNS = tuple(ALL_ITEMS.c[column.key] for column in ITEM_COLUMNS)
+
 
 async def order_create(
-    request: OrderInput, user: UserToken, session_maker: sessionmaker[AsyncSession]
+    request: OrderInput,
+    user: UserToken,
+    session_maker: sessionmaker[AsyncSession],
+    idempotency_key: Optional[IdempotencyKey] = None,
 ) -> OrderOutput | Error:
     """
     status ->:
@@ -30,54 +71,55 @@ async def order_create(
     OK - Order accepted
     OC - Order canceled
     OF - Order finished
+
+    `idempotency_key` is inserted in the same transaction as the order, so
+    only one order is created per key; the loser's IntegrityError is raised.
     """
     try:
-        order_create = Order(user=user.id, status="WS", requisition_date=date.today())
-
         async with session_maker() as session:
-            session.add(order_create)
-            await session.commit()
+            version, prices = await get_price_cache().resolve(
+                session, {item.id for item in request.items}
+            )
 
-        for order in request.items:
-            async with session_maker() as session:
-                product_select = await session.execute(
-                    select(Product).where(Product.id == order.id)
-                )
-                product = product_select.scalar()
-
-                if not product:
-                    return Error(
-                        reason="NOT_FOUND", message="PRODUCT_NOT_FOUND", status_code=404
-                    )
-
-                item_order = ItemOrder(
-                    order=order_create.id,
-                    product=order.id,
-                    quantity=order.quantity,
-                    price=(product.price * order.quantity),
+            if any(item.id not in prices for item in request.items):
+                return Error(
+                    reason="NOT_FOUND", message="PRODUCT_NOT_FOUND", status_code=404
                 )
 
-                session.add(item_order)
-                await session.commit()
-
-        async with session_maker() as session:
-            items_orders = await session.execute(
-                select(func.sum(ItemOrder.price)).where(
-                    ItemOrder.order == order_create.id
+            items_orders = [
+                ItemOrder(
+                    product=item.id,
+                    quantity=item.quantity,
+                    price=(prices[item.id] * item.quantity),
                 )
+                for item in request.items
+            ]
+            order_create = Order(
+                user=user.id,
+                status="WS",
+                requisition_date=date.today(),
+                price=sum(prices[item.id] * item.quantity for item in request.items),
+                price_version=version,
             )
-            price_general = items_orders.scalar()
 
-            await (
-                session.execute(
-                    update(Order)
-                    .where(Order.id == order_create.id)
-                    .values(price=price_general)
-                )
-            )
+            session.add(order_create)
+            await session.flush()
+
+            for item_order in items_orders:
+                item_order.order = order_create.id
+            session.add_all(items_orders)
+
+            if idempotency_key is not None:
+                idempotency_key.order = order_create.id
+                session.add(idempotency_key)
+
             await session.commit()
 
         return OrderOutput(id=order_create.id, message="ORDER_CREATED_WITH_SUCCESS")
+    except IntegrityError as exc:
+        if idempotency_key is not None:
+            raise
+        return Error(reason="UNKNOWN", message=str(exc), status_code=500)
     except Exception as exc:
         return Error(reason="UNKNOWN", message=str(exc), status_code=500)
 
@@ -88,9 +130,11 @@ async def cancel_order(
     try:
         async with session_maker() as session:
             order_select = await session.execute(
-                select(Order).where(Order.id == id, Order.status == "WS")
+                select(Order.id, Order.finished).where(
+                    Order.id == id, Order.status == "WS"
+                )
             )
-            order = order_select.scalar()
+            order = order_select.first()
 
             if not order:
                 return Error(
@@ -109,7 +153,9 @@ async def cancel_order(
             )
             await session.commit()
 
-            return OrderOutput(id=order.id, message="ORDER_CANCELED_WITH_SUCCESS")
+        await get_cache().invalidate(order_key(id))
+
+        return OrderOutput(id=order.id, message="ORDER_CANCELED_WITH_SUCCESS")
     except Exception as exc:
         return Error(reason="UNKNOWN", message=str(exc), status_code=500)
 
@@ -126,38 +172,29 @@ async def return_order_by_id(
     OF - Order finished
     """
     try:
-        async with session_maker() as session:
-            order_select = await session.execute(select(Order).where(Order.id == id))
-            order = order_select.scalar()
+        cached = await get_cache().get(order_key(id))
+        if cached:
+            return GetOrderOutputToUser.parse_raw(cached)
 
-            items_select = await session.execute(
-                select(ItemOrder).where(ItemOrder.order == id)
-            )
-            items = items_select.scalars()
+        orders = await select_orders(session_maker, ALL_ORDERS.c.id == id, archive=True)
 
-        if not order:
+        if not orders:
             return Error(reason="NOT_FOUND", message="ORDER_NOT_FOUND", status_code=404)
 
-        list_products = []
-        for item in items:
-            list_products.append(ItemsOrders(id=item.id, quantity=item.quantity))
-
-        return GetOrderOutputToUser(
-            id=order.id,
-            status=order.status,
-            price=order.price,
-            requisition_date=order.requisition_date,
-            finished=order.finished,
-            products=list_products,
-        )
+        await get_cache().set(order_key(id), orders[0].json().encode("utf8"))
+
+        return orders[0]
 
     except Exception as exc:
         return Error(reason="UNKNOWN", message=str(exc), status_code=500)
 
 
 async def return_all_orders(
-    user: UserToken, session_maker: sessionmaker[AsyncSession]
-) -> GetAllOrdersOutput | Error:
+    user: UserToken,
+    session_maker: sessionmaker[AsyncSession],
+    after: int = 0,
+    limit: int = 50,
+) -> GetOrdersPageOutput | Error:
     """
     status ->:
     WS - waiting store
@@ -165,40 +202,23 @@ async def return_all_orders(
     OK - Order accepted
     OC - Order canceled
     OF - Order finished
+
+    Pages through the hot and archived orders of the user by id; pass the
+    returned `next_cursor` as `after` to get the next page.
     """
     try:
-        async with session_maker() as session:
-            orders_select = await session.execute(
-                select(Order).where(Order.user == user.id)
-            )
-            orders = orders_select.scalars()
-
-        list_orders = []
-
-        for order in orders:
-
-            async with session_maker() as session:
-                items_select = await session.execute(
-                    select(ItemOrder).where(ItemOrder.order == order.id)
-                )
-                items = items_select.scalars()
-
-            for iten in items:
-                list_products = []
-                list_products.append(ItemsOrders(id=iten.id, quantity=iten.quantity))
-
-            list_orders.append(
-                GetOrderOutputToUser(
-                    id=order.id,
-                    status=order.status,
-                    price=order.price,
-                    requisition_date=order.requisition_date,
-                    finished=order.finished,
-                    products=list_products,
-                )
-            )
+        orders = await select_orders(
+            session_maker,
+            ALL_ORDERS.c.user == user.id,
+            ALL_ORDERS.c.id > after,
+            archive=True,
+            limit=limit + 1,
+        )
 
-        return GetAllOrdersOutput(orders=list_orders)
+        return GetOrdersPageOutput(
+            orders=orders[:limit],
+            next_cursor=orders[limit - 1].id if len(orders) > limit else None,
+        )
 
     except Exception as exc:
         return Error(reason="UNKNOWN", message=str(exc), status_code=500)
@@ -208,38 +228,60 @@ async def orders_active(
     user: UserToken, session_maker: sessionmaker[AsyncSession]
 ) -> GetAllOrdersOutput | Error:
     try:
-        async with session_maker() as session:
-            orders_select = await session.execute(
-                select(Order).where(Order.user == user.id, Order.finished.is_(False))
-            )
-            orders = orders_select.scalars()
+        orders = await select_orders(
+            session_maker, Order.user == user.id, Order.finished.is_(False)
+        )
 
-        list_orders = []
+        return GetAllOrdersOutput(orders=orders)
 
-        for order in orders:
+    except Exception as exc:
+        return Error(reason="UNKNOWN", message=str(exc), status_code=500)
 
-            async with session_maker() as session:
-                items_select = await session.execute(
-                    select(ItemOrder).where(ItemOrder.order == order.id)
-                )
-                items = items_select.scalars()
-
-            for iten in items:
-                list_products = []
-                list_products.append(ItemsOrders(id=iten.id, quantity=iten.quantity))
-
-            list_orders.append(
-                GetOrderOutputToUser(
-                    id=order.id,
-                    status=order.status,
-                    price=order.price,
-                    requisition_date=order.requisition_date,
-                    finished=order.finished,
-                    products=list_products,
+
+async def select_orders(
+    session_maker: sessionmaker[AsyncSession],
+    *where: Any,
+    archive: bool = False,
+    limit: Optional[int] = None,
+) -> list[GetOrderOutputToUser]:
+    """
+    Loads the orders matching `where` and all of their items with two queries,
+    selecting only the columns GetOrderOutputToUser needs. With `archive` the
+    archived orders are included and `where` must filter ALL_ORDERS columns.
+    """
+    order_columns: tuple[Any, ...]
+    item_columns: tuple[Any, ...]
+    order_columns, item_columns = (
+        (ALL_ORDER_COLUMNS, ALL_ITEM_COLUMNS)
+        if archive
+        else (ORDER_COLUMNS, ITEM_COLUMNS)
+    )
+
+    async with session_maker() as session:
+        orders_select = await session.execute(
+            select(*order_columns).where(*where).order_by(order_columns[0]).limit(limit)
+        )
+        orders = orders_select.all()
+
+        items: dict[int, list[Any]] = {}
+        if orders:
+            items_select = await session.execute(
+                select(*item_columns).where(
+                    item_columns[0].in_([order.id for order in orders])
                 )
             )
+            for iten in items_select:
+                items.setdefault(iten.order, []).append(iten)
 
-        return GetAllOrdersOutput(orders=list_orders)
+    return [build_order_output(order, items.get(order.id, [])) for order in orders]
 
-    except Exception as exc:
-        return Error(reason="UNKNOWN", message=str(exc), status_code=500)
+
+def build_order_output(order: Any, items: Iterable[Any]) -> GetOrderOutputToUser:
+    return GetOrderOutputToUser(
+        id=order.id,
+        status=order.status,
+        price=order.price,
+        requisition_date=order.requisition_date,
+        finished=order.finished,
+        products=[ItemsOrders(id=iten.id, quantity=iten.quantity) for iten in items],
+    )
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+import bcrypt
+
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ROUNDS = 31
+
+
+def hash_rounds(hashed: str) -> int:
+    """
+    bcrypt keeps the cost in the hash itself: "$2b$<rounds>$<salt+hash>".
+    """
+    return int(hashed.split("$")[2])
+
+
+def time_hash(rounds: int, repeat: int = 3) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(
+    target_ms: float, min_rounds: int = 8, max_rounds: int = 14, base_rounds: int = 6
+) -> int:
+    """
+    Highest cost whose hash takes at most `target_ms` on this CPU, kept within
+    `min_rounds` and `max_rounds`. Each extra round doubles the time, so only
+    one cheap cost is measured.
+    """
+    elapsed_ms = time_hash(base_rounds) * 1000
+    rounds = base_rounds + math.floor(math.log2(target_ms / elapsed_ms))
+    return max(min_rounds, min(max_rounds, MAX_ROUNDS, rounds))
+
+
+@dataclass
+class PasswordHasher:
+    rounds: int = 8
+
+    async def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(self.rounds)
+        hashed = await asyncio.to_thread(bcrypt.hashpw, password.encode("utf8"), salt)
+        return hashed.decode()
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await asyncio.to_thread(
+            bcrypt.checkpw, password.encode("utf8"), hashed.encode("utf8")
+        )
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """
+        Only ever raises the cost. Each worker calibrates on its own CPU, so
+        rehashing to a lower cost would let workers undo each other's work.
+        """
+        return hash_rounds(hashed) < self.rounds
+
+
+password_hasher = PasswordHasher()
+
+
+def get_password_hasher() -> PasswordHasher:
+    return password_hasher
+
+
+def setup_password_hasher(
+    settings: Settings, calibrated: bool = True
+) -> PasswordHasher:
+    """
+    Without calibration the hasher uses `password_hash_min_rounds`, as the
+    test suite does.
+    """
+    global password_hasher
+    rounds = settings.password_hash_min_rounds
+    if calibrated:
+        rounds = calibrate(
+            settings.password_hash_target_ms,
+            settings.password_hash_min_rounds,
+            settings.password_hash_max_rounds,
+        )
+        logger.info("password hashing with bcrypt cost %s", rounds)
+
+    password_hasher = PasswordHasher(rounds=rounds)
+    return password_hasher
@@ -1,45 +1,63 @@
 from __future__ import annotations
 
+import csv
+import io
+
+from pydantic import ValidationError
 from sqlalchemy import delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import sessionmaker
 
-from app.database import Product
+from app.cache import ACTIVE_PRODUCTS_KEY, ALL_PRODUCTS_KEY, get_cache, product_key
+from app.catalog import bump_catalog_version
+from app.database import Product, affected_rows
 from app.models import (
+    BulkProductOutput,
     CreateProductInput,
     CreateProductOutput,
+    CreateProductsInput,
+    CreateProductsOutput,
     Error,
     GetAllProductsOutput,
     GetProductIdOutput,
     GetProductsActivesOutput,
     InactivateProductInput,
     InactivateProductOutput,
+    InactivateProductsInput,
+    InactivateProductsOutput,
     UpdateProductInput,
     UpdateProductOutput,
 )
+from app.public_catalog import get_public_catalog
+
+PRODUCT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.image_url,
+    Product.activate,
+)
 
 
 async def product_create(
     request: CreateProductInput, session_maker: sessionmaker[AsyncSession]
 ) -> CreateProductOutput | Error:
     try:
-        if "," in request.price:
-            price = float(request.price.replace(".", "").replace(",", "."))
-        else:
-            price = float(request.price)
-
         product_add = Product(
             name=request.name,
             description=request.description,
             image_url=request.image_url,
-            price=price,
+            price=parse_price(request.price),
             activate=request.activate,
         )
         async with session_maker() as session:
             session.add(product_add)
             await session.commit()
 
+        await invalidate_catalog(session_maker)
+
         return CreateProductOutput(id=product_add.id, message="CREATE_PRODUCT_SUCCESS")
 
     except Exception as exc:
@@ -71,16 +89,16 @@ async def update_product(
                 )
 
             if request.price:
-                if "," in request.price:
-                    price = float(request.price.replace(".", "").replace(",", "."))
-                else:
-                    price = float(request.price)
-
                 await session.execute(
-                    update(Product).where(Product.id == id).values(price=price)
+                    update(Product)
+                    .where(Product.id == id)
+                    .values(price=parse_price(request.price))
                 )
+                await bump_catalog_version(session)
 
-                await session.commit()
+            await session.commit()
+
+        await invalidate_catalog(session_maker, id)
 
         return UpdateProductOutput(id=id, message="UPDATE_PRODUCT_SUCCESS")
 
@@ -93,18 +111,18 @@ async def delete_product(
 ) -> UpdateProductOutput | Error:
     try:
         async with session_maker() as session:
-            product_select = await session.execute(
-                select(Product.id).where(Product.id == id)
+            product_delete = await session.execute(
+                delete(Product).where(Product.id == id)
             )
-            product = product_select.scalar()
+            await bump_catalog_version(session)
+            await session.commit()
 
-            if not product:
-                return Error(
-                    reason="NOT_FOUND", message="PRODUCT_NOT_FOUND", status_code=404
-                )
+        if not affected_rows(product_delete):
+            return Error(
+                reason="NOT_FOUND", message="PRODUCT_NOT_FOUND", status_code=404
+            )
 
-            await session.execute(delete(Product).where(Product.id == id))
-            await session.commit()
+        await invalidate_catalog(session_maker, id)
 
         return UpdateProductOutput(id=id, message="DELETE_PRODUCT_SUCCESS")
 
@@ -117,19 +135,15 @@ async def update_product_status(
 ) -> InactivateProductOutput | Error:
     try:
         async with session_maker() as session:
-            product_select = await session.execute(
-                select(Product).where(Product.id == request.id)
+            product_update = await session.execute(
+                update(Product)
+                .where(Product.id == request.id)
+                .values(activate=request.status)
             )
-            product = product_select.scalar()
+            await session.commit()
 
-        if product:
-            async with session_maker() as session:
-                await session.execute(
-                    update(Product)
-                    .where(Product.id == request.id)
-                    .values(activate=request.status)
-                )
-                await session.commit()
+        if affected_rows(product_update):
+            await invalidate_catalog(session_maker, request.id)
 
             if request.status:
                 return InactivateProductOutput(
@@ -153,14 +167,18 @@ async def get_product(
     id: int, session_maker: sessionmaker[AsyncSession]
 ) -> GetProductIdOutput | Error:
     try:
+        cached = await get_cache().get(product_key(id))
+        if cached:
+            return GetProductIdOutput.parse_raw(cached)
+
         async with session_maker() as session:
             product_select = await session.execute(
-                select(Product).where(Product.id == id)
+                select(*PRODUCT_COLUMNS).where(Product.id == id)
             )
-            product = product_select.scalar()
+            product = product_select.first()
 
         if product:
-            return GetProductIdOutput(
+            output = GetProductIdOutput(
                 id=product.id,
                 name=product.name,
                 price=str(product.price).replace(".", ","),
@@ -168,6 +186,9 @@ async def get_product(
                 image_url=product.image_url,
                 activated=product.activate,
             )
+            await get_cache().set(product_key(id), output.json().encode("utf8"))
+
+            return output
 
         else:
             return Error(
@@ -182,11 +203,15 @@ async def get_products_actives(
     session_maker: sessionmaker[AsyncSession],
 ) -> GetProductsActivesOutput | Error:
     try:
+        cached = await get_cache().get(ACTIVE_PRODUCTS_KEY)
+        if cached:
+            return GetProductsActivesOutput.parse_raw(cached)
+
         async with session_maker() as session:
             product_select = await session.execute(
-                select(Product).where(Product.activate)
+                select(*PRODUCT_COLUMNS).where(Product.activate)
             )
-            products = product_select.scalars()
+            products = product_select.all()
 
         list_products = []
         for iten in products:
@@ -201,7 +226,10 @@ async def get_products_actives(
 
             list_products.append(product_json)
 
-        return GetProductsActivesOutput(products=list_products)
+        output = GetProductsActivesOutput(products=list_products)
+        await get_cache().set(ACTIVE_PRODUCTS_KEY, output.json().encode("utf8"))
+
+        return output
 
     except Exception as exc:
         return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
@@ -211,9 +239,13 @@ async def get_all_products(
     session_maker: sessionmaker[AsyncSession],
 ) -> GetAllProductsOutput | Error:
     try:
+        cached = await get_cache().get(ALL_PRODUCTS_KEY)
+        if cached:
+            return GetAllProductsOutput.parse_raw(cached)
+
         async with session_maker() as session:
-            product_select = await session.execute(select(Product).where())
-            products = product_select.scalars()
+            product_select = await session.execute(select(*PRODUCT_COLUMNS))
+            products = product_select.all()
 
         list_products = []
         for iten in products:
@@ -228,7 +260,172 @@ async def get_all_products(
 
             list_products.append(product_json)
 
-        return GetAllProductsOutput(products=list_products)
+        output = GetAllProductsOutput(products=list_products)
+        await get_cache().set(ALL_PRODUCTS_KEY, output.json().encode("utf8"))
+
+        return output
 
     except Exception as exc:
         return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
+
+
+async def products_create_bulk(
+    request: CreateProductsInput, session_maker: sessionmaker[AsyncSession]
+) -> CreateProductsOutput | Error:
+    rows = list(enumerate(request.products))
+    return await insert_products(rows, [], session_maker)
+
+
+async def products_create_csv(
+    content: str, session_maker: sessionmaker[AsyncSession]
+) -> CreateProductsOutput | Error:
+    rows: list[tuple[int, CreateProductInput]] = []
+    invalid_rows: list[BulkProductOutput] = []
+
+    reader = csv.DictReader(io.StringIO(content))
+    for index, line in enumerate(reader):
+        try:
+            rows.append(
+                (
+                    index,
+                    CreateProductInput.parse_obj(
+                        {
+                            "name": line.get("name"),
+                            "description": line.get("description") or None,
+                            "image_url": line.get("image_url") or None,
+                            "price": line.get("price"),
+                            "activate": (line.get("activate") or "").strip().lower()
+                            in ("1", "true", "yes", "sim"),
+                        }
+                    ),
+                )
+            )
+        except ValidationError:
+            invalid_rows.append(
+                BulkProductOutput(index=index, id=None, message="INVALID_PRODUCT_ROW")
+            )
+
+    if not rows and not invalid_rows:
+        return Error(
+            reason="BAD_REQUEST", message="EMPTY_PRODUCT_FILE", status_code=400
+        )
+
+    return await insert_products(rows, invalid_rows, session_maker)
+
+
+async def insert_products(
+    rows: list[tuple[int, CreateProductInput]],
+    results: list[BulkProductOutput],
+    session_maker: sessionmaker[AsyncSession],
+) -> CreateProductsOutput | Error:
+    products_add: list[tuple[int, Product]] = []
+
+    for index, request in rows:
+        try:
+            price = parse_price(request.price)
+        except ValueError:
+            results.append(
+                BulkProductOutput(index=index, id=None, message="INVALID_PRICE")
+            )
+            continue
+
+        products_add.append(
+            (
+                index,
+                Product(
+                    name=request.name,
+                    description=request.description,
+                    image_url=request.image_url,
+                    price=price,
+                    activate=request.activate,
+                ),
+            )
+        )
+
+    try:
+        if products_add:
+            async with session_maker() as session:
+                session.add_all([product for _, product in products_add])
+                await session.commit()
+
+            await invalidate_catalog(session_maker)
+
+        for index, product in products_add:
+            results.append(
+                BulkProductOutput(
+                    index=index, id=product.id, message="CREATE_PRODUCT_SUCCESS"
+                )
+            )
+
+        results.sort(key=lambda result: result.index)
+        return CreateProductsOutput(products=results)
+
+    except Exception as exc:
+        return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
+
+
+async def update_products_status(
+    request: InactivateProductsInput, session_maker: sessionmaker[AsyncSession]
+) -> InactivateProductsOutput | Error:
+    try:
+        async with session_maker() as session:
+            products_select = await session.execute(
+                select(Product.id).where(Product.id.in_(request.ids))
+            )
+            products_found = set(products_select.scalars())
+
+            if products_found:
+                await session.execute(
+                    update(Product)
+                    .where(Product.id.in_(products_found))
+                    .values(activate=request.status)
+                )
+                await session.commit()
+
+            await invalidate_catalog(session_maker, *products_found)
+
+        message = (
+            "ACTIVATE_PRODUCT_SUCCESS"
+            if request.status
+            else "INACTIVATE_PRODUCT_SUCCESS"
+        )
+
+        list_products = []
+        for id in request.ids:
+            if id in products_found:
+                list_products.append(InactivateProductOutput(id=id, message=message))
+            else:
+                list_products.append(
+                    InactivateProductOutput(id=id, message="PRODUCT_NOT_FOUND")
+                )
+
+        return InactivateProductsOutput(products=list_products)
+
+    except Exception as exc:
+        return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
+
+
+async def invalidate_catalog(
+    session_maker: sessionmaker[AsyncSession], *ids: int
+) -> None:
+    await get_cache().invalidate(
+        ACTIVE_PRODUCTS_KEY, ALL_PRODUCTS_KEY, *[product_key(id) for id in ids]
+    )
+    await publish_catalog(session_maker)
+
+
+async def publish_catalog(session_maker: sessionmaker[AsyncSession]) -> None:
+    # Without PUBLIC_CATALOG_DIR there is nothing to write, skip the query.
+    if get_public_catalog().directory is None:
+        return
+
+    output = await get_products_actives(session_maker)
+    if isinstance(output, GetProductsActivesOutput):
+        await get_public_catalog().publish(output.json().encode("utf8"))
+
+
+def parse_price(price: str) -> float:
+    if "," in price:
+        return float(price.replace(".", "").replace(",", "."))
+
+    return float(price)
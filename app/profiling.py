@@ -0,0 +1,188 @@
+"""
+On-demand profiling of single requests.
+
+An employee request sent with `X-Profile: 1` runs under a sampling profiler
+and its response carries `X-Profile-Id`. The profile, in the collapsed
+stack format read by flamegraph.pl, inferno and speedscope, is downloaded
+from GET /profiles/<id>. Requests without the header only pay for the
+header lookup.
+"""
+from __future__ import annotations
+
+import asyncio
+import secrets
+import sys
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.authorization import decode_token_jwt
+from app.settings import Settings
+
+PROFILE_HEADER = b"x-profile"
+
+
+def header_value(scope: Scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return bytes(value)
+    return None
+
+
+def fold(frame: Optional[FrameType]) -> str:
+    names = []
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}.{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+@dataclass
+class Sampler:
+    """
+    Samples the stack of `thread_id` every `interval_seconds`, counting only
+    samples taken while `task` runs on `loop`, so other requests served in
+    the meantime stay out of the profile.
+    """
+
+    loop: asyncio.AbstractEventLoop
+    task: Optional[asyncio.Task[object]]
+    thread_id: int
+    interval_seconds: float = 0.002
+    stacks: Counter[str] = field(default_factory=Counter)
+
+    @contextmanager
+    def running(self) -> Iterator[None]:
+        stop = threading.Event()
+        thread = threading.Thread(target=self.sample, args=(stop,), daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def sample(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval_seconds):
+            if asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold(frame)] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+@dataclass
+class Profiler:
+    """
+    Keeps the last `max_entries` profiles in memory and, with `directory`,
+    also as the last `max_entries` <id>.folded files there, so any worker can
+    serve them.
+    """
+
+    interval_seconds: float = 0.002
+    directory: Optional[Path] = None
+    max_entries: int = 20
+    profiles: OrderedDict[str, str] = field(default_factory=OrderedDict)
+
+    async def save(self, id: str, profile: str) -> None:
+        self.profiles[id] = profile
+        while len(self.profiles) > self.max_entries:
+            self.profiles.popitem(last=False)
+
+        if self.directory:
+            await asyncio.to_thread(self.write, self.directory, id, profile)
+
+    def write(self, directory: Path, id: str, profile: str) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{id}.folded").write_text(profile)
+
+        stored = sorted(
+            directory.glob("*.folded"), key=lambda path: path.stat().st_mtime
+        )
+        for path in stored[: -self.max_entries]:
+            path.unlink(missing_ok=True)
+
+    def get(self, id: str) -> Optional[str]:
+        if id in self.profiles:
+            return self.profiles[id]
+
+        if self.directory and id.isalnum():
+            path = self.directory / f"{id}.folded"
+            if path.is_file():
+                return path.read_text()
+
+        return None
+
+
+profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    return profiler
+
+
+def setup_profiler(settings: Settings) -> Profiler:
+    global profiler
+    profiler = Profiler(
+        interval_seconds=settings.profile_sample_interval_ms / 1000,
+        directory=Path(settings.profile_dir) if settings.profile_dir else None,
+        max_entries=settings.profile_max_entries,
+    )
+    return profiler
+
+
+async def is_employee(scope: Scope) -> bool:
+    authorization = header_value(scope, b"authorization")
+    if authorization is None:
+        return False
+
+    try:
+        user = await decode_token_jwt(authorization.decode("latin-1"))
+    except HTTPException:
+        return False
+
+    return user.type == "employee"
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or header_value(scope, PROFILE_HEADER) is None
+            or not await is_employee(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        id = secrets.token_hex(8)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = id
+            await send(message)
+
+        sampler = Sampler(
+            loop=asyncio.get_running_loop(),
+            task=asyncio.current_task(),
+            thread_id=threading.get_ident(),
+            interval_seconds=get_profiler().interval_seconds,
+        )
+        with sampler.running():
+            await self.app(scope, receive, send_with_id)
+
+        await get_profiler().save(id, sampler.collapsed())
@@ -0,0 +1,119 @@
+"""
+Public menu, served without a token so shared caches and CDNs can keep it.
+
+    /public/products                  latest active catalog, short max-age
+    /public/products/<version>.json   one catalog version, immutable
+    /public/product/<id>              one active product, short max-age
+
+Versions are digests of the catalog body. With PUBLIC_CATALOG_DIR set, each
+product write also stores the catalog there with the same layout as the
+URLs (products.json and products/<version>.json), so a reverse proxy can
+serve the directory itself under /public.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.settings import Settings
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def catalog_version(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def catalog_etag(version: str) -> str:
+    """
+    Weak, as the body may be compressed on the way out and compressed
+    representations are not byte-identical.
+    """
+    return f'W/"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], version: str) -> bool:
+    """
+    Weak comparison of If-None-Match, the only one allowed for it.
+    """
+    if if_none_match is None:
+        return False
+
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or f'"{version}"' in tags
+
+
+def write_atomic(path: Path, body: bytes) -> None:
+    temporary = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary.write_bytes(body)
+    os.replace(temporary, path)
+
+
+@dataclass
+class PublicCatalog:
+    directory: Optional[Path] = None
+    max_age: int = 60
+    stale_seconds: int = 300
+    keep: int = 20
+
+    @property
+    def cache_control(self) -> str:
+        return (
+            f"public, max-age={self.max_age}, "
+            f"stale-while-revalidate={self.stale_seconds}"
+        )
+
+    def url(self, version: str) -> str:
+        return f"/public/products/{version}.json"
+
+    def artifact(self, version: str) -> Optional[Path]:
+        if not self.directory:
+            return None
+
+        path = self.directory / "products" / f"{version}.json"
+        return path if path.is_file() else None
+
+    async def publish(self, body: bytes) -> str:
+        """
+        Stores `body` as its version and as the latest catalog, dropping all
+        but the `keep` newest versions. Returns the version.
+        """
+        version = catalog_version(body)
+        if self.directory:
+            await asyncio.to_thread(self.write, self.directory, version, body)
+        return version
+
+    def write(self, directory: Path, version: str, body: bytes) -> None:
+        versions = directory / "products"
+        versions.mkdir(parents=True, exist_ok=True)
+
+        write_atomic(versions / f"{version}.json", body)
+        write_atomic(directory / "products.json", body)
+
+        stored = sorted(versions.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in stored[: -self.keep]:
+            path.unlink(missing_ok=True)
+
+
+public_catalog = PublicCatalog()
+
+
+def get_public_catalog() -> PublicCatalog:
+    return public_catalog
+
+
+def setup_public_catalog(settings: Settings) -> PublicCatalog:
+    global public_catalog
+    public_catalog = PublicCatalog(
+        directory=Path(settings.public_catalog_dir)
+        if settings.public_catalog_dir
+        else None,
+        max_age=settings.public_catalog_max_age_seconds,
+        stale_seconds=settings.public_catalog_stale_seconds,
+        keep=settings.public_catalog_keep,
+    )
+    return public_catalog
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Protocol
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, capacity: int, refill_rate: float) -> float:
+        """
+        Takes one token from the bucket of `key`. Returns 0 when the token was
+        taken, otherwise how many seconds until the bucket has a token again.
+        """
+
+
+@dataclass
+class MemoryRateLimitBackend:
+    """
+    Token buckets kept in this process. Each worker limits on its own, so a
+    shared backend must be plugged in to enforce one limit across workers.
+    Past `max_buckets`, the least recently used bucket is dropped, the one
+    most likely to be full again anyway.
+    """
+
+    max_buckets: int = 100_000
+    buckets: OrderedDict[str, tuple[float, float]] = field(default_factory=OrderedDict)
+
+    async def take(self, key: str, capacity: int, refill_rate: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_rate)
+
+        self.buckets[key] = (tokens if tokens < 1 else tokens - 1, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_buckets:
+            self.buckets.popitem(last=False)
+
+        if tokens < 1:
+            return (1 - tokens) / refill_rate
+        return 0
+
+
+@dataclass
+class RateLimiter:
+    capacity: int = 10
+    refill_rate: float = 0.2
+    enabled: bool = True
+    backend: RateLimitBackend = field(default_factory=MemoryRateLimitBackend)
+
+    async def check(self, *keys: str) -> Optional[float]:
+        """
+        Returns None when every bucket had a token, otherwise the seconds the
+        client must wait before retrying.
+        """
+        if not self.enabled:
+            return None
+
+        for key in keys:
+            retry_after = await self.backend.take(key, self.capacity, self.refill_rate)
+            if retry_after:
+                return retry_after
+
+        return None
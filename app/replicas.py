@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.cache import CACHE_ERRORS, CacheBackend, get_cache, sticky_key
+from app.database import create_engine_main, setup_db_main
+from app.models import UserToken
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    session_maker: Any
+    healthy: bool = True
+
+
+@dataclass
+class SessionRouter:
+    """
+    Hands out the primary session maker for writes and a replica one for
+    reads. Replicas are taken round-robin among those whose last health check
+    passed, falling back to the primary when none did. Whoever wrote in the
+    last `sticky_seconds` reads from the primary, so replication lag never
+    hides their own writes. The window is kept in the `shared` cache, so it
+    holds whichever worker serves the next read; without one, or while it is
+    down, it is tracked per worker only.
+    """
+
+    primary: Any
+    replicas: list[Replica] = field(default_factory=list)
+    sticky_seconds: float = 5
+    check_seconds: float = 10
+    shared: Optional[CacheBackend] = None
+    last_writes: dict[tuple[str, int], float] = field(default_factory=dict)
+    turn: int = 0
+
+    async def writer(self, user: UserToken) -> Any:
+        if self.replicas:
+            await self.remember_write(user)
+        return self.primary
+
+    async def reader(self, user: UserToken) -> Any:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy or await self.wrote_recently(user):
+            return self.primary
+
+        self.turn += 1
+        return healthy[self.turn % len(healthy)].session_maker
+
+    async def remember_write(self, user: UserToken) -> None:
+        self.last_writes[(user.type, user.id)] = time.monotonic()
+        if not self.shared or self.sticky_seconds <= 0:
+            return
+
+        try:
+            await self.shared.set(
+                sticky_key(user.type, user.id), b"1", self.sticky_seconds
+            )
+        except CACHE_ERRORS as exc:
+            logger.warning("sticky set %s:%s failed: %r", user.type, user.id, exc)
+
+    async def wrote_recently(self, user: UserToken) -> bool:
+        wrote_at = self.last_writes.get((user.type, user.id))
+        if wrote_at is not None and time.monotonic() - wrote_at < self.sticky_seconds:
+            return True
+        if not self.shared:
+            return False
+
+        try:
+            return await self.shared.get(sticky_key(user.type, user.id)) is not None
+        except CACHE_ERRORS as exc:
+            logger.warning("sticky get %s:%s failed: %r", user.type, user.id, exc)
+            return False
+
+    async def check(self, timeout: float = 5) -> None:
+        await asyncio.gather(
+            *[self.check_replica(replica, timeout) for replica in self.replicas]
+        )
+
+        expired_at = time.monotonic() - self.sticky_seconds
+        for key, wrote_at in list(self.last_writes.items()):
+            if wrote_at < expired_at:
+                del self.last_writes[key]
+
+    async def check_replica(self, replica: Replica, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(ping(replica.engine), timeout)
+            healthy = True
+        except (OSError, SQLAlchemyError, asyncio.TimeoutError) as exc:
+            logger.warning(
+                "replica %s failed health check: %r", replica.engine.url, exc
+            )
+            healthy = False
+
+        if healthy and not replica.healthy:
+            logger.info("replica %s is back", replica.engine.url)
+        replica.healthy = healthy
+
+    async def monitor(self) -> None:
+        while True:
+            await self.check(timeout=self.check_seconds)
+            await asyncio.sleep(self.check_seconds)
+
+
+async def ping(engine: AsyncEngine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+def setup_replicas(primary: Any, settings: Settings) -> SessionRouter:
+    replicas = []
+    for url in settings.db_replica_urls:
+        engine = create_engine_main(settings, url)
+        replicas.append(Replica(engine=engine, session_maker=setup_db_main(engine)))
+
+    return SessionRouter(
+        primary=primary,
+        replicas=replicas,
+        sticky_seconds=settings.db_replica_sticky_seconds,
+        check_seconds=settings.db_replica_check_seconds,
+        shared=get_cache().shared,
+    )
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.database import RevokedToken
+from app.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+# Keys a filter holds before it is rebuilt, whatever the database holds.
+MIN_BLOOM_CAPACITY = 1024
+
+# Longest lifetime of any token plus leeway, a revocation is useless after it.
+REVOCATION_LIFETIME_SECONDS = 30 * 24 * 3600 + 30
+
+revocation_lookups = counter(
+    "token_revocation_lookups_total",
+    "Bloom filter hits checked against the revoked keys.",
+)
+
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives, sized for
+    `capacity` keys at `error_rate`.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(key)
+        )
+
+
+def subject_key(type: str, id: int) -> str:
+    return f"sub:{type}:{id}"
+
+
+def access_key(type: str, id: int) -> str:
+    """
+    Revokes access tokens only, refresh tokens keep working, e.g. so a role
+    change reaches the next access token without logging in again.
+    """
+    return f"access:{type}:{id}"
+
+
+def token_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def revoke(
+    session: AsyncSession,
+    key: str,
+    lifetime_seconds: float = REVOCATION_LIFETIME_SECONDS,
+) -> None:
+    """
+    Revokes every token of `key` issued until now, in the caller's
+    transaction. Call `get_revocations().remember(key)` after the commit.
+    The revocation is kept for `lifetime_seconds`, the longest the tokens of
+    `key` stay valid, so it stops costing lookups once they have expired.
+    """
+    now = time.time()
+    session.add(
+        RevokedToken(key=key, revoked_at=now, expires_at=now + lifetime_seconds)
+    )
+
+
+@dataclass
+class RevocationList:
+    """
+    Revoked token keys and when they were last revoked, mirrored from the
+    database, so checking a token never costs a query. The Bloom filter in
+    front answers for tokens nobody revoked. Other workers see a revocation
+    on their next refresh, every `refresh_seconds`.
+    """
+
+    session_maker: Any = None
+    refresh_seconds: float = 30
+    revoked: dict[str, float] = field(default_factory=dict)
+    bloom: BloomFilter = field(default_factory=lambda: BloomFilter(MIN_BLOOM_CAPACITY))
+
+    def remember(self, key: str) -> None:
+        # Called after the commit, so never earlier than the stored revoked_at.
+        self.revoked[key] = time.time()
+        if len(self.revoked) > self.bloom.capacity:
+            self.rebuild()
+        else:
+            self.bloom.add(key)
+
+    def rebuild(self) -> None:
+        """
+        Sizes the filter for twice the keys revoked so far, so revocations
+        made until the next refresh keep the error rate.
+        """
+        bloom = BloomFilter(max(len(self.revoked) * 2, MIN_BLOOM_CAPACITY))
+        for key in self.revoked:
+            bloom.add(key)
+        self.bloom = bloom
+
+    async def is_revoked(self, claims: dict[str, Any]) -> bool:
+        keys = [subject_key(claims["type"], claims["id"])]
+        if claims.get("use", "access") == "access":
+            keys.append(access_key(claims["type"], claims["id"]))
+        if "jti" in claims:
+            keys.append(token_key(claims["jti"]))
+
+        keys = [key for key in keys if key in self.bloom]
+        if not keys:
+            return False
+
+        revocation_lookups.inc()
+        revoked_at = max(
+            (self.revoked[key] for key in keys if key in self.revoked), default=None
+        )
+
+        # Tokens issued before "iat" existed count as issued at the epoch.
+        return revoked_at is not None and claims.get("iat", 0) <= revoked_at
+
+    async def refresh(self) -> None:
+        async with self.session_maker() as session:
+            await session.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at < time.time())
+            )
+            await session.commit()
+
+            revoked_select = await session.execute(
+                select(RevokedToken.key, func.max(RevokedToken.revoked_at)).group_by(
+                    RevokedToken.key
+                )
+            )
+            self.revoked = {key: revoked_at for key, revoked_at in revoked_select}
+
+        self.rebuild()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except SQLAlchemyError as exc:
+                logger.warning("revocation list refresh failed: %r", exc)
+
+
+revocations = RevocationList()
+
+
+def get_revocations() -> RevocationList:
+    return revocations
+
+
+async def setup_revocations(
+    session_maker: Any, refresh_seconds: float
+) -> RevocationList:
+    global revocations
+    revocations = RevocationList(
+        session_maker=session_maker, refresh_seconds=refresh_seconds
+    )
+    await revocations.refresh()
+    return revocations
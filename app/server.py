@@ -0,0 +1,95 @@
+"""
+Production entry point: `python -m app.server`.
+
+Every worker is a separate process that imports app.main and runs
+startup_event, so each one builds its own engine, pool and caches.
+"""
+from __future__ import annotations
+
+import copy
+import importlib.util
+import os
+import tempfile
+from typing import Any
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from app.settings import Settings
+
+
+def server_options(settings: Settings) -> dict[str, Any]:
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "workers": settings.workers or os.cpu_count() or 1,
+        "loop": "uvloop" if is_installed("uvloop") else "asyncio",
+        "http": "httptools" if is_installed("httptools") else "h11",
+        "backlog": settings.backlog,
+        "timeout_keep_alive": settings.keep_alive_seconds,
+        "limit_concurrency": settings.limit_concurrency,
+        "limit_max_requests": settings.limit_max_requests,
+        "access_log": settings.access_log,
+        "log_config": log_config(settings),
+        "proxy_headers": True,
+        "forwarded_allow_ips": settings.forwarded_allow_ips,
+    }
+
+
+def log_config(settings: Settings) -> dict[str, Any]:
+    """
+    uvicorn's logging plus the app's loggers at LOG_LEVEL, which would
+    otherwise stay at the root's WARNING and drop the startup report.
+    """
+    config: dict[str, Any] = copy.deepcopy(LOGGING_CONFIG)
+    config["formatters"]["app"] = {
+        "()": "uvicorn.logging.DefaultFormatter",
+        "fmt": "%(levelprefix)s %(name)s %(message)s",
+    }
+    config["handlers"]["app"] = {
+        "formatter": "app",
+        "class": "logging.StreamHandler",
+        "stream": "ext://sys.stderr",
+    }
+    config["loggers"]["app"] = {
+        "handlers": ["app"],
+        "level": settings.log_level.upper(),
+        "propagate": False,
+    }
+    return config
+
+
+def is_installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def shared_environment(settings: Settings, workers: int) -> dict[str, str]:
+    """
+    Settings every worker must agree on. The schema is upgraded once by
+    `main` before the workers start, so they skip it. A profile is downloaded
+    from whichever worker gets the request, so with several workers and no
+    PROFILE_DIR, profiles go to a directory they share.
+    """
+    environment = {}
+    if settings.db_create_schema:
+        environment["DB_CREATE_SCHEMA"] = "false"
+    if workers > 1 and settings.profiling_enabled and not settings.profile_dir:
+        environment["PROFILE_DIR"] = tempfile.mkdtemp(prefix="iceberg-profiles-")
+    return environment
+
+
+def main() -> None:
+    settings = Settings()
+    options = server_options(settings)
+    if settings.db_create_schema:
+        # Imported here like in startup_event, alembic is only needed for this.
+        from app.migrate import main as migrate
+
+        migrate(["upgrade"], settings)
+
+    os.environ.update(shared_environment(settings, options["workers"]))
+    uvicorn.run("app.main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
+from typing import Any
+
 from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import sessionmaker
 
+from app.cache import get_cache, order_key
 from app.database import ItemOrder, Order
 from app.models import (
     Error,
     GetAllOrdersOutput,
     GetOrderOutputToUser,
     InputOrderShop,
+    InputOrdersShop,
     ItemsOrders,
+    OrderShopResult,
+    OrdersShopOutput,
 )
+from app.order import build_order_output, select_orders
 
 """
 status ->:
@@ -23,43 +30,21 @@ OC - Order canceled
 OF - Order finished
 """
 
+ORDER_TRANSITIONS: dict[str, tuple[str, dict[str, Any], str]] = {
+    "accept": ("WS", {"status": "OK"}, "ORDER_ACCEPTED"),
+    "refuse": ("WS", {"status": "OR", "finished": True}, "ORDER_REFUSED"),
+    "cancel": ("OK", {"status": "OC", "finished": True}, "ORDER_CANCELED"),
+    "finish": ("OK", {"status": "OF", "finished": True}, "ORDER_FINISHED"),
+}
+
 
 async def return_open_orders(
     session_maker: sessionmaker[AsyncSession],
 ) -> GetAllOrdersOutput | Error:
     try:
-        async with session_maker() as session:
-            orders_select = await session.execute(
-                select(Order).where(Order.status == "WS")
-            )
-            orders = orders_select.scalars()
-
-        list_orders = []
-
-        for order in orders:
-
-            async with session_maker() as session:
-                items_select = await session.execute(
-                    select(ItemOrder).where(ItemOrder.order == order.id)
-                )
-                items = items_select.scalars()
-
-            for iten in items:
-                list_products = []
-                list_products.append(ItemsOrders(id=iten.id, quantity=iten.quantity))
+        orders = await select_orders(session_maker, Order.status == "WS")
 
-            list_orders.append(
-                GetOrderOutputToUser(
-                    id=order.id,
-                    status=order.status,
-                    price=order.price,
-                    requisition_date=order.requisition_date,
-                    finished=order.finished,
-                    products=list_products,
-                )
-            )
-
-        return GetAllOrdersOutput(orders=list_orders)
+        return GetAllOrdersOutput(orders=orders)
 
     except Exception:
         return Error(reason="UNKNOWN", message="UNKNOWN_ERROR", status_code=500)
@@ -84,6 +69,7 @@ async def accepted_or_recused_order(
                 )
 
             await session.commit()
+            await get_cache().invalidate(order_key(order_input.id))
 
             order_select = await session.execute(
                 select(Order).where(Order.id == order_input.id)
@@ -126,6 +112,7 @@ async def cancel_order_accepted(
                 .values(status="OC", finished=True)
             )
             await session.commit()
+            await get_cache().invalidate(order_key(order_id))
 
             order_select = await session.execute(
                 select(Order).where(Order.id == order_id)
@@ -168,6 +155,7 @@ async def finish_order_accepted(
                 .values(status="OF", finished=True)
             )
             await session.commit()
+            await get_cache().invalidate(order_key(order_id))
 
             order_select = await session.execute(
                 select(Order).where(Order.id == order_id)
@@ -197,3 +185,95 @@ async def finish_order_accepted(
 
     except Exception:
         return Error(reason="UNKNOWN", message="UNKNOWN_ERROR", status_code=500)
+
+
+async def apply_orders_transitions(
+    request: InputOrdersShop, session_maker: sessionmaker[AsyncSession]
+) -> OrdersShopOutput | Error:
+    ids = [request_order.id for request_order in request.orders]
+
+    try:
+        async with session_maker() as session:
+            status_select = await session.execute(
+                select(Order.id, Order.status).where(Order.id.in_(ids))
+            )
+            status_before = {id: status for id, status in status_select}
+            planned = plan_orders_transitions(request, status_before)
+
+            for action, (status_from, values, _) in ORDER_TRANSITIONS.items():
+                action_ids = [id for id, value in planned.items() if value == action]
+                if action_ids:
+                    await session.execute(
+                        update(Order)
+                        .where(Order.id.in_(action_ids), Order.status == status_from)
+                        .values(**values)
+                    )
+
+            await session.commit()
+            await get_cache().invalidate(*[order_key(id) for id in planned])
+
+            orders_select = await session.execute(
+                select(Order).where(Order.id.in_(ids))
+            )
+            orders = {order.id: order for order in orders_select.scalars()}
+
+            items_select = await session.execute(
+                select(ItemOrder).where(ItemOrder.order.in_(ids))
+            )
+            items: dict[int, list[Any]] = {}
+            for iten in items_select.scalars():
+                items.setdefault(iten.order, []).append(iten)
+
+        list_orders = []
+        reported: set[int] = set()
+        for request_order in request.orders:
+            order = orders.get(request_order.id)
+            _, values, message = ORDER_TRANSITIONS[request_order.action]
+
+            if not order:
+                message = "ORDER_NOT_FOUND"
+            elif (
+                order.id in reported
+                or planned.get(order.id) != request_order.action
+                or order.status != values["status"]
+            ):
+                message = "INVALID_ORDER_STATUS"
+            reported.add(request_order.id)
+
+            list_orders.append(
+                OrderShopResult(
+                    id=request_order.id,
+                    action=request_order.action,
+                    message=message,
+                    order=build_order_output(order, items.get(order.id, []))
+                    if order
+                    else None,
+                )
+            )
+
+        return OrdersShopOutput(orders=list_orders)
+
+    except Exception:
+        return Error(reason="UNKNOWN", message="UNKNOWN_ERROR", status_code=500)
+
+
+def plan_orders_transitions(
+    request: InputOrdersShop, status_before: dict[int, str]
+) -> dict[int, str]:
+    """
+    Only the first action sent for each order is applied, and only when the
+    order is in the status the action starts from.
+    """
+    planned: dict[int, str] = {}
+    seen: set[int] = set()
+
+    for request_order in request.orders:
+        status_from = ORDER_TRANSITIONS[request_order.action][0]
+        if request_order.id in seen:
+            continue
+
+        seen.add(request_order.id)
+        if status_before.get(request_order.id) == status_from:
+            planned[request_order.id] = request_order.action
+
+    return planned
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models import GetSlowQueriesOutput, SlowQueryOutput
+from app.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+IGNORED_MODULES = ("app.database", "app.slow_queries")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+STARTED_KEY = "slow_query_started"
+
+
+def calling_function(frame: Optional[FrameType]) -> str:
+    """
+    App functions on the stack below the route handler, outermost first.
+    Under the async engine statements run in a greenlet whose stack ends in
+    SQLAlchemy, so the search starts from the frame the awaiting coroutine
+    was suspended in.
+    """
+    parent = greenlet.getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        frame = parent.gr_frame
+
+    callers: list[str] = []
+    while frame is not None:
+        module = str(frame.f_globals.get("__name__", ""))
+        if module == "app.main":
+            break
+        if module.startswith("app.") and module not in IGNORED_MODULES:
+            callers.insert(0, f"{module}.{frame.f_code.co_name}")
+        frame = frame.f_back
+
+    return " > ".join(callers) or "unknown"
+
+
+def redact(parameters: Any) -> str:
+    """
+    Parameter types only, values may be passwords, emails or tokens.
+    """
+    if isinstance(parameters, dict):
+        return ", ".join(
+            f"{name}=<{type(value).__name__}>" for name, value in parameters.items()
+        )
+    if isinstance(parameters, (list, tuple)):
+        return ", ".join(f"<{type(value).__name__}>" for value in parameters)
+    return ""
+
+
+def explain_prefix(dialect: str) -> str:
+    if dialect == "postgresql":
+        return "EXPLAIN (ANALYZE off) "
+    if dialect == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return "EXPLAIN "
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    caller: str
+    parameters: str
+    calls: int = 0
+    total_seconds: float = 0
+    max_seconds: float = 0
+    plan: Optional[str] = None
+
+    def output(self) -> SlowQueryOutput:
+        return SlowQueryOutput(
+            statement=self.statement,
+            caller=self.caller,
+            parameters=self.parameters,
+            calls=self.calls,
+            total_ms=round(self.total_seconds * 1000, 3),
+            max_ms=round(self.max_seconds * 1000, 3),
+            plan=self.plan,
+        )
+
+
+@dataclass
+class SlowQueryLog:
+    """
+    Statements slower than `threshold_seconds`, grouped by statement and
+    calling function. With `explain`, the plan of each one is captured once,
+    on another connection, after the statement is first seen.
+    """
+
+    engine: Optional[AsyncEngine] = None
+    threshold_seconds: float = 0.2
+    explain: bool = False
+    max_statements: int = 200
+    queries: dict[tuple[str, str], SlowQuery] = field(default_factory=dict)
+    tasks: set[asyncio.Task[None]] = field(default_factory=set)
+
+    def listen(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self.before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self.after_execute)
+
+    def before_execute(self, conn: Connection, *args: Any) -> None:
+        conn.info.setdefault(STARTED_KEY, []).append(time.perf_counter())
+
+    def after_execute(
+        self, conn: Connection, cursor: Any, statement: str, parameters: Any, *args: Any
+    ) -> None:
+        started = conn.info.get(STARTED_KEY)
+        if not started:
+            return
+
+        elapsed = time.perf_counter() - started.pop()
+        if elapsed < self.threshold_seconds:
+            return
+        if statement.lstrip().upper().startswith("EXPLAIN"):
+            return
+
+        caller = calling_function(sys._getframe(1))
+        logger.warning(
+            "slow query %.1fms in %s: %s [%s]",
+            elapsed * 1000,
+            caller,
+            statement,
+            redact(parameters),
+        )
+        self.record(statement, caller, parameters, elapsed)
+
+    def record(
+        self, statement: str, caller: str, parameters: Any, elapsed: float
+    ) -> None:
+        query = self.queries.get((statement, caller))
+        if query is None:
+            if len(self.queries) >= self.max_statements:
+                cheapest = min(self.queries.values(), key=lambda q: q.total_seconds)
+                del self.queries[(cheapest.statement, cheapest.caller)]
+
+            query = SlowQuery(statement, caller, redact(parameters))
+            self.queries[(statement, caller)] = query
+            if self.explain:
+                self.explain_later(query, parameters)
+
+        query.calls += 1
+        query.total_seconds += elapsed
+        query.max_seconds = max(query.max_seconds, elapsed)
+
+    def explain_later(self, query: SlowQuery, parameters: Any) -> None:
+        if not query.statement.lstrip().upper().startswith(EXPLAINABLE):
+            return
+
+        task = asyncio.get_running_loop().create_task(
+            self.explain_query(query, parameters)
+        )
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def explain_query(self, query: SlowQuery, parameters: Any) -> None:
+        if not self.engine:
+            return
+
+        prefix = explain_prefix(self.engine.dialect.name)
+        try:
+            async with self.engine.connect() as connection:
+                result = await connection.exec_driver_sql(
+                    prefix + query.statement, parameters
+                )
+                query.plan = "\n".join(str(row[-1]) for row in result.all())
+        except Exception as exc:
+            logger.warning("explain of slow query failed: %r", exc)
+
+    def top(self, limit: int) -> GetSlowQueriesOutput:
+        queries = sorted(
+            self.queries.values(), key=lambda q: q.total_seconds, reverse=True
+        )
+        return GetSlowQueriesOutput(queries=[q.output() for q in queries[:limit]])
+
+
+slow_queries = SlowQueryLog()
+
+
+def get_slow_queries() -> SlowQueryLog:
+    return slow_queries
+
+
+def setup_slow_queries(engine: AsyncEngine, settings: Settings) -> SlowQueryLog:
+    """
+    Without SLOW_QUERY_THRESHOLD_MS nothing is recorded.
+    """
+    global slow_queries
+    threshold = settings.slow_query_threshold_ms
+    slow_queries = SlowQueryLog(
+        threshold_seconds=(threshold or 0) / 1000,
+        explain=settings.slow_query_explain,
+        max_statements=settings.slow_query_max_statements,
+    )
+    if threshold is not None:
+        slow_queries.listen(engine)
+    return slow_queries
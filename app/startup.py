@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StartupTimer:
+    phases: dict[str, float] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def report(self) -> None:
+        self.phases["total"] = time.perf_counter() - self.started_at
+        logger.info(
+            "startup finished %s",
+            " ".join(
+                f"{name}={seconds * 1000:.1f}ms"
+                for name, seconds in self.phases.items()
+            ),
+        )
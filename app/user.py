@@ -2,16 +2,26 @@ from __future__ import annotations
 
 import datetime
 import secrets
-from typing import Any, List
+from typing import Any
 
-import bcrypt
-from sqlalchemy import update
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import sessionmaker
 
-from app.authorization import encode_token_jwt
+from app.authorization import (
+    ACCESS_REVOCATION_SECONDS,
+    employee_roles,
+    encode_refresh_token_jwt,
+    encode_token_jwt,
+    has_role,
+)
+from app.cache import get_cache, profile_key
 from app.database import Employee, ForgotPassword, User
+from app.jobs import add_job, get_jobs
+from app.mail import PASSWORD_RESET_EMAIL
+from app.metrics import counter, gauge
 from app.models import (
     ChagedPasswordInput,
     ChagedPasswordOutput,
@@ -28,20 +38,29 @@ from app.models import (
     LoginEmployeeOutput,
     LoginUser,
     LoginUserOutput,
+    RevokeTokensOutput,
     SearchPasswordInput,
     SearchPasswordOutPut,
     UserOutput,
     UserRegister,
     UserToken,
 )
+from app.passwords import get_password_hasher
+from app.revocation import access_key, get_revocations, revoke, subject_key
+
+UNIQUE_COLUMNS = ("email", "cpf", "phone")
+
+profile_lookups = counter(
+    "profile_cache_lookups_total", "Profile lookups by cache result (hit or miss)."
+)
+profile_hit_ratio = gauge(
+    "profile_cache_hit_ratio", "Share of profile lookups served from the cache."
+)
 
 
 async def create_user(
     user: UserRegister, session_maker: sessionmaker[AsyncSession]
 ) -> UserOutput | Error:
-    if await verify_email_already_exists(user.email, session_maker):
-        return Error(reason="CONFLICT", message="EMAIL_ALREADY_EXISTS", status_code=409)
-
     try:
         user_add = User(
             name=user.name,
@@ -56,6 +75,9 @@ async def create_user(
 
             return UserOutput(id=user_add.id, email=user_add.email)
 
+    except IntegrityError:
+        return await unique_violation_error(User, user.dict(), session_maker)
+
     except Exception as exc:
         return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
 
@@ -63,9 +85,6 @@ async def create_user(
 async def create_employee(
     user: EmployeeRegister, session_maker: sessionmaker[AsyncSession]
 ) -> EmployeeOutput | Error:
-    if await verify_email_alread_exists_to_employee(user.email, session_maker):
-        return Error(reason="CONFLICT", message="EMAIL_ALREADY_EXISTS", status_code=409)
-
     if user.manager and user.attendant:
         return Error(
             reason="BAD_REQUEST",
@@ -91,6 +110,9 @@ async def create_employee(
 
             return EmployeeOutput(id=employee_add.id, email=employee_add.email)
 
+    except IntegrityError:
+        return await unique_violation_error(Employee, user.dict(), session_maker)
+
     except Exception as exc:
         return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
 
@@ -100,31 +122,23 @@ async def login_user(
 ) -> LoginUserOutput | Error:
     login = request.login
     password = str(request.password)
-    password_input = password.encode("utf8")
 
     async with session_maker() as session:
-        user_email = await session.execute(select(User).where(User.email == login))
-        user_cpf = await session.execute(select(User).where(User.cpf == login))
-        user_phone = await session.execute(select(User).where(User.phone == login))
-
-        print(type(user_phone))
-
-        passwords: List[Any] = []
-        passwords.append(user_email.scalar())
-        passwords.append(user_cpf.scalar())
-        passwords.append(user_phone.scalar())
+        users_select = await session.execute(
+            select(User.id, User.password).where(
+                or_(User.email == login, User.cpf == login, User.phone == login)
+            )
+        )
 
-        for iten in passwords:
+        for iten in users_select.all():
             try:
-                password_db = iten.password
-                if isinstance(password_db, str):
-                    password_db = password_db.encode("utf-8")
-                    if bcrypt.checkpw(password_input, password_db):
-                        token = await encode_token_jwt(iten.id, "user")
-                        print(token)
-                        return LoginUserOutput(
-                            login=login, message="LOGIN_SUCCESSFUL", token=token
-                        )
+                if await check_password(session, User, iten, password):
+                    return LoginUserOutput(
+                        login=login,
+                        message="LOGIN_SUCCESSFUL",
+                        token=await encode_token_jwt(iten.id, "user"),
+                        refresh_token=await encode_refresh_token_jwt(iten.id, "user"),
+                    )
             except Exception:
                 continue
 
@@ -139,32 +153,30 @@ async def login_employee(
 
     login = request.login
     password = str(request.password)
-    password_input = password.encode("utf8")
 
     async with session_maker() as session:
-        employee_email = await (
-            session.execute(select(Employee).where(Employee.email == login))
+        employees_select = await session.execute(
+            select(
+                Employee.id, Employee.password, Employee.manager, Employee.attendant
+            ).where(or_(Employee.email == login, Employee.cpf == login))
         )
-        employee_cpf = await (
-            session.execute(select(Employee).where(Employee.cpf == login))
-        )
-
-        passwords: List[Any] = []
-        passwords.append(employee_email.scalar())
-        passwords.append(employee_cpf.scalar())
 
-        for iten in passwords:
+        for iten in employees_select.all():
             try:
-                password_db = iten.password
-                if isinstance(password_db, str):
-                    password_db = password_db.encode("utf-8")
-                    if bcrypt.checkpw(password_input, password_db):
-                        token = await encode_token_jwt(iten.id, "employee")
-                        return LoginEmployeeOutput(
-                            login=login, message="LOGIN_SUCCESSFUL", token=token
-                        )
-            except Exception as exc:
-                print("exc ", exc)
+                if await check_password(session, Employee, iten, password):
+                    return LoginEmployeeOutput(
+                        login=login,
+                        message="LOGIN_SUCCESSFUL",
+                        token=await encode_token_jwt(
+                            iten.id,
+                            "employee",
+                            employee_roles(iten.manager, iten.attendant),
+                        ),
+                        refresh_token=await encode_refresh_token_jwt(
+                            iten.id, "employee"
+                        ),
+                    )
+            except Exception:
                 continue
 
         return Error(
@@ -186,11 +198,13 @@ async def forgot_password_verify(
     async with session_maker() as session:
         user_forgot = await (
             session.execute(
-                select(User).where(User.email == request.email, User.cpf == request.cpf)
+                select(User.id, User.cpf).where(
+                    User.email == request.email, User.cpf == request.cpf
+                )
             )
         )
 
-    user = user_forgot.scalar()
+    user = user_forgot.first()
 
     if user:
         forgot_add = ForgotPassword(
@@ -199,9 +213,14 @@ async def forgot_password_verify(
 
         async with session_maker() as session:
             session.add(forgot_add)
+            add_job(
+                session,
+                PASSWORD_RESET_EMAIL,
+                {"email": request.email, "token": token_email},
+            )
             await session.commit()
 
-        # Envia e-mail para usuario.
+        get_jobs().wake()
 
         token_jwt = await encode_token_jwt(user.id, "user")
 
@@ -214,17 +233,25 @@ async def change_password(
     request: ChagedPasswordInput,
     user_request: UserToken,
     session_maker: sessionmaker[AsyncSession],
+    ttl_seconds: int = 3600,
 ) -> ChagedPasswordOutput | Error:
     try:
         new_password = request.password
         new_password = await encrypt_password(new_password)
+        oldest = datetime.datetime.now() - datetime.timedelta(seconds=ttl_seconds)
 
         async with session_maker() as session:
-            token_valid = await (
+            token_select = await (
                 session.execute(
-                    select(ForgotPassword).where(ForgotPassword.token == request.token)
+                    select(ForgotPassword.id).where(
+                        ForgotPassword.token == request.token,
+                        ForgotPassword.user == user_request.id,
+                        ForgotPassword.utilized.is_not(True),
+                        ForgotPassword.requisition_date >= oldest,
+                    )
                 )
             )
+            token_valid = token_select.scalar()
 
         if token_valid:
             async with session_maker() as session:
@@ -238,12 +265,16 @@ async def change_password(
 
                 await session.execute(
                     update(ForgotPassword)
-                    .where(ForgotPassword.token == request.token)
+                    .where(ForgotPassword.id == token_valid)
                     .values(utilized=True)
                 )
 
+                revoke(session, subject_key("user", user_request.id))
                 await session.commit()
 
+            get_revocations().remember(subject_key("user", user_request.id))
+            await get_cache().invalidate(profile_key("user", user_request.id))
+
             return ChagedPasswordOutput(
                 id=user_request.id, message="SUCCESS_CHANGE_PASSWORD"
             )
@@ -289,6 +320,7 @@ async def edit_account_user(
                         .values(password=await encrypt_password(request.password))
                     )
                 )
+                revoke(session, subject_key("user", user_request.id))
             if request.phone:
                 await (
                     session.execute(
@@ -300,8 +332,17 @@ async def edit_account_user(
 
             await session.commit()
 
+        if request.password:
+            get_revocations().remember(subject_key("user", user_request.id))
+        await get_cache().invalidate(profile_key("user", user_request.id))
+
         return EditUserOutput(id=user_request.id, message="SUCCESS_UPDATE_ACCOUNT")
 
+    except IntegrityError:
+        return await unique_violation_error(
+            User, request.dict(), session_maker, user_request.id
+        )
+
     except Exception as exc:
         return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
 
@@ -338,10 +379,20 @@ async def edit_account_employee(
                         .values(password=await encrypt_password(request.password))
                     )
                 )
+                revoke(session, subject_key("employee", user_request.id))
 
             await session.commit()
 
-            return EditUserOutput(id=user_request.id, message="SUCCESS_UPDATE_ACCOUNT")
+        if request.password:
+            get_revocations().remember(subject_key("employee", user_request.id))
+        await get_cache().invalidate(profile_key("employee", user_request.id))
+
+        return EditUserOutput(id=user_request.id, message="SUCCESS_UPDATE_ACCOUNT")
+
+    except IntegrityError:
+        return await unique_violation_error(
+            Employee, request.dict(), session_maker, user_request.id
+        )
 
     except Exception as exc:
         return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
@@ -351,9 +402,11 @@ async def get_all_employees(
     session_maker: sessionmaker[AsyncSession],
 ) -> GetEmployeesOutput | Error:
     async with session_maker() as session:
-        employees_select = await session.execute(select(Employee))
+        employees_select = await session.execute(
+            select(Employee.name, Employee.manager, Employee.attendant)
+        )
 
-    employees = employees_select.scalars()
+    employees = employees_select.all()
 
     try:
         list_employees = []
@@ -374,15 +427,52 @@ async def get_all_employees(
 
 
 async def get_account_logged(
+    user: UserToken,
+    session_maker: sessionmaker[AsyncSession],
+    ttl_seconds: float = 300,
+) -> GetUserLoggedOutput | GetEmployeeLoggedOutput | Error:
+    """
+    Profile of the logged account, cached for `ttl_seconds` and dropped by
+    every write to it.
+    """
+    model: type[GetUserLoggedOutput | GetEmployeeLoggedOutput] = GetEmployeeLoggedOutput
+    if user.type == "user":
+        model = GetUserLoggedOutput
+    key = profile_key(user.type, user.id)
+
+    cached = await get_cache().get(key)
+    record_profile_lookup(cached is not None)
+    if cached:
+        return model.parse_raw(cached)
+
+    generation = get_cache().generation
+    response = await load_account_logged(user, session_maker)
+    if not isinstance(response, Error):
+        await get_cache().set(
+            key, response.json().encode("utf8"), ttl_seconds, generation
+        )
+
+    return response
+
+
+def record_profile_lookup(hit: bool) -> None:
+    profile_lookups.inc(result="hit" if hit else "miss")
+    hits = profile_lookups.get(result="hit")
+    profile_hit_ratio.set(hits / (hits + profile_lookups.get(result="miss")))
+
+
+async def load_account_logged(
     user: UserToken, session_maker: sessionmaker[AsyncSession]
 ) -> GetUserLoggedOutput | GetEmployeeLoggedOutput | Error:
     try:
         if user.type == "user":
             async with session_maker() as session:
                 account_select = await session.execute(
-                    select(User).where(User.id == user.id)
+                    select(User.name, User.email, User.cpf, User.phone).where(
+                        User.id == user.id
+                    )
                 )
-                account = account_select.scalar()
+                account = account_select.first()
 
             if account:
                 return GetUserLoggedOutput(
@@ -394,9 +484,11 @@ async def get_account_logged(
         elif user.type == "employee":
             async with session_maker() as session:
                 account_select = await session.execute(
-                    select(Employee).where(Employee.id == user.id)
+                    select(
+                        Employee.name, Employee.email, Employee.cpf, Employee.manager
+                    ).where(Employee.id == user.id)
                 )
-                account = account_select.scalar()
+                account = account_select.first()
 
             if account:
                 if account.manager:
@@ -433,46 +525,38 @@ async def change_occupation(
                 status_code=400,
             )
 
-        async with session_maker() as session:
-            account_select = await session.execute(
-                select(Employee).where(Employee.id == user.id, Employee.manager)
-            )
-            account = account_select.scalar()
-
-        if account:
+        if has_role(user, "manager"):
             async with session_maker() as session:
-                if request.manager:
-                    await (
-                        session.execute(
-                            update(Employee)
-                            .where(Employee.cpf == request.cpf)
-                            .values(manager=True, attendant=False)
-                        )
+                await (
+                    session.execute(
+                        update(Employee)
+                        .where(Employee.cpf == request.cpf)
+                        .values(manager=request.manager, attendant=not request.manager)
                     )
+                )
+                ids_select = await session.execute(
+                    select(Employee.id).where(Employee.cpf == request.cpf)
+                )
+                ids = ids_select.scalars().all()
 
-                    await session.commit()
-
-                    return EditOccupationOutput(
-                        cpf=request.cpf,
-                        old_occupation="Attendant",
-                        new_occupation="Manager",
-                    )
-                else:
-                    await (
-                        session.execute(
-                            update(Employee)
-                            .where(Employee.cpf == request.cpf)
-                            .values(manager=False, attendant=True)
-                        )
+                # Access tokens carry the roles, the next refresh picks up the new ones.
+                for id in ids:
+                    revoke(
+                        session, access_key("employee", id), ACCESS_REVOCATION_SECONDS
                     )
 
-                    await session.commit()
+                await session.commit()
 
-                    return EditOccupationOutput(
-                        cpf=request.cpf,
-                        old_occupation="Manager",
-                        new_occupation="Attendant",
-                    )
+            for id in ids:
+                get_revocations().remember(access_key("employee", id))
+
+            await get_cache().invalidate(*[profile_key("employee", id) for id in ids])
+
+            return EditOccupationOutput(
+                cpf=request.cpf,
+                old_occupation="Attendant" if request.manager else "Manager",
+                new_occupation="Manager" if request.manager else "Attendant",
+            )
 
         else:
             return Error(
@@ -487,27 +571,95 @@ async def create_token_email() -> str:
     return secrets.token_hex(6)
 
 
-async def verify_email_already_exists(
-    email_user: str, session_maker: sessionmaker[AsyncSession]
-) -> bool:
-    async with session_maker() as session:
-        user = await session.execute(select(User).where(User.email == email_user))
-        return bool(user.scalar())
-
+async def unique_violation_error(
+    account: Any,
+    values: dict[str, Any],
+    session_maker: sessionmaker[AsyncSession],
+    account_id: int | None = None,
+) -> Error:
+    """
+    Runs only after the database rejected a write, to find which unique column
+    is taken. Email is reported first when more than one column conflicts.
+    """
+    columns = [
+        column
+        for column in UNIQUE_COLUMNS
+        if values.get(column) and hasattr(account, column)
+    ]
 
-async def verify_email_alread_exists_to_employee(
-    email_user: str, session_maker: sessionmaker[AsyncSession]
-) -> bool:
     async with session_maker() as session:
-        employee = await session.execute(
-            select(Employee).where(Employee.email == email_user)
+        conflict_select = await session.execute(
+            select(*[getattr(account, column) for column in columns]).where(
+                or_(
+                    *[getattr(account, column) == values[column] for column in columns]
+                ),
+                account.id != account_id,
+            )
         )
-        return bool(employee.scalar())
+        rows = conflict_select.all()
+
+    for column in columns:
+        if any(getattr(row, column) == values[column] for row in rows):
+            return Error(
+                reason="CONFLICT",
+                message=f"{column.upper()}_ALREADY_EXISTS",
+                status_code=409,
+            )
+
+    return Error(reason="CONFLICT", message="ACCOUNT_ALREADY_EXISTS", status_code=409)
 
 
 async def encrypt_password(raw_password: str) -> str:
-    return bcrypt.hashpw(raw_password.encode("utf8"), bcrypt.gensalt(8)).decode()
+    return await get_password_hasher().hash(raw_password)
+
+
+async def check_password(
+    session: AsyncSession, table: Any, account: Any, password: str
+) -> bool:
+    """
+    Verifies `password` against the stored hash of `account` and, when that
+    hash was made with another bcrypt cost than the current one, stores a new
+    hash of it.
+    """
+    hasher = get_password_hasher()
+    if not await hasher.verify(password, account.password):
+        return False
+
+    if hasher.needs_rehash(account.password):
+        await session.execute(
+            update(table)
+            .where(table.id == account.id)
+            .values(password=await hasher.hash(password))
+        )
+        await session.commit()
+
+    return True
 
 
 def return_token_tests() -> dict[str, str]:
     return token_email_test
+
+
+async def revoke_employee_tokens(
+    id: int, session_maker: sessionmaker[AsyncSession]
+) -> RevokeTokensOutput | Error:
+    try:
+        async with session_maker() as session:
+            employee_select = await session.execute(
+                select(Employee.id).where(Employee.id == id)
+            )
+
+            if not employee_select.scalar():
+                return Error(
+                    reason="NOT_FOUND", message="EMPLOYEE_NOT_FOUND", status_code=404
+                )
+
+            revoke(session, subject_key("employee", id))
+            await session.commit()
+
+        get_revocations().remember(subject_key("employee", id))
+
+        return RevokeTokensOutput(id=id, message="TOKENS_REVOKED")
+
+    except Exception as exc:
+        return Error(reason="UNKNOWN", message=repr(exc), status_code=500)
@@ -0,0 +1,61 @@
+"""
+Reports bcrypt hashes per second per core for each cost, and the cost
+`PASSWORD_HASH_TARGET_MS` calibrates to on this machine.
+
+    python -m benchmarks.bench_passwords --rounds 8 12 --seconds 2
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from app.passwords import calibrate
+from app.settings import Settings
+
+
+def hashes_for(rounds: int, seconds: float) -> int:
+    salt = bcrypt.gensalt(rounds)
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        bcrypt.hashpw(b"benchmark", salt)
+        count += 1
+    return count
+
+
+def main(first: int, last: int, seconds: float) -> None:
+    cores = os.cpu_count() or 1
+    settings = Settings()
+
+    with ProcessPoolExecutor(cores) as pool:
+        for rounds in range(first, last + 1):
+            single = hashes_for(rounds, seconds) / seconds
+            counts = pool.map(hashes_for, [rounds] * cores, [seconds] * cores)
+            parallel = sum(counts) / seconds
+
+            print(
+                f"cost={rounds:<3} latency={1000 / single:.1f}ms "
+                f"single={single:.1f}/s "
+                f"per_core={parallel / cores:.1f}/s "
+                f"cores={cores}"
+            )
+
+    rounds = calibrate(
+        settings.password_hash_target_ms,
+        settings.password_hash_min_rounds,
+        settings.password_hash_max_rounds,
+    )
+    print(f"calibrated cost={rounds} target={settings.password_hash_target_ms}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, nargs=2, default=(8, 12))
+    parser.add_argument("--seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    main(*args.rounds, args.seconds)
@@ -0,0 +1,92 @@
+"""
+Compares loading full ORM entities with the column-projected queries used by
+the read paths in app/product.py and app/order.py.
+
+    python -m benchmarks.bench_read_paths --rows 20000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.future import select
+
+from app.database import ItemOrder, Order, Product, User, setup_db_tests
+from app.order import ORDER_COLUMNS
+from app.product import PRODUCT_COLUMNS
+
+
+async def seed(session_maker: Any, rows: int) -> None:
+    async with session_maker() as session:
+        session.add(
+            User(name="Bench", email="b@b.com", cpf="1", phone="1", password="x")
+        )
+        session.add_all(
+            Product(
+                name=f"Açai {index}",
+                description="Açai",
+                image_url="http://www.google.com",
+                price=10.0,
+                activate=True,
+            )
+            for index in range(rows)
+        )
+        session.add_all(
+            Order(user=1, price=10.0, status="WS", requisition_date=date.today())
+            for _ in range(rows)
+        )
+        session.add_all(
+            ItemOrder(order=index + 1, product=1, quantity=1, price=10.0)
+            for index in range(rows)
+        )
+        await session.commit()
+
+
+async def timed(function: Callable[[], Awaitable[int]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(rows: int, repeat: int) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    session_maker = await setup_db_tests(f"sqlite+aiosqlite:///{path}")
+    await seed(session_maker, rows)
+
+    async def load(statement: Any, scalars: bool) -> int:
+        async with session_maker() as session:
+            result = await session.execute(statement)
+            return len(result.scalars().all() if scalars else result.all())
+
+    cases = {
+        "products": (select(Product), select(*PRODUCT_COLUMNS)),
+        "orders": (select(Order), select(*ORDER_COLUMNS)),
+    }
+
+    for name, (entity, projected) in cases.items():
+        entity_time = await timed(lambda: load(entity, True), repeat)
+        projected_time = await timed(lambda: load(projected, False), repeat)
+
+        print(
+            f"{name:<9} rows={rows} "
+            f"entity={entity_time / rows * 1e6:.2f}us/row "
+            f"projected={projected_time / rows * 1e6:.2f}us/row "
+            f"saving={(entity_time - projected_time) / rows * 1e6:.2f}us/row"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.repeat))
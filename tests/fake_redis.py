@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from app.cache import encode_command, read_reply
+
+
+class FakeRedisServer:
+    """
+    Local stand-in speaking enough of the Redis protocol for app.cache:
+    PING, GET, SET (PX), DEL, PUBLISH and SUBSCRIBE.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.subscribers = {}
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        for writers in self.subscribers.values():
+            for writer in writers:
+                writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                command = await read_reply(reader)
+                await self.execute(command, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def execute(self, command, writer):
+        name = command[0].decode().upper()
+        args = command[1:]
+
+        if name == "PING":
+            writer.write(b"+PONG\r\n")
+        elif name == "GET":
+            writer.write(self.bulk(self.get(args[0])))
+        elif name == "SET":
+            expires_at = None
+            if len(args) == 4 and args[2].upper() == b"PX":
+                expires_at = time.monotonic() + int(args[3]) / 1000
+            self.values[args[0]] = (args[1], expires_at)
+            writer.write(b"+OK\r\n")
+        elif name == "DEL":
+            deleted = sum(self.values.pop(key, None) is not None for key in args)
+            writer.write(f":{deleted}\r\n".encode())
+        elif name == "PUBLISH":
+            subscribers = self.subscribers.get(args[0], [])
+            for subscriber in subscribers:
+                subscriber.write(encode_command("message", args[0], args[1]))
+            writer.write(f":{len(subscribers)}\r\n".encode())
+        elif name == "SUBSCRIBE":
+            self.subscribers.setdefault(args[0], []).append(writer)
+            writer.write(encode_command("subscribe", args[0]))
+        else:
+            writer.write(f"-ERR unknown command '{name}'\r\n".encode())
+
+        await writer.drain()
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def bulk(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        return f"${len(value)}\r\n".encode() + value + b"\r\n"
@@ -0,0 +1,52 @@
+import asyncio
+from email import message_from_bytes, policy
+
+
+class FakeSMTPServer:
+    """
+    Local stand-in speaking enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT,
+    DATA, RSET, NOOP and QUIT. Received messages are kept in `messages`.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        await self.reply(writer, b"220 fake smtp")
+        try:
+            while line := await reader.readline():
+                command = line.split(b" ", 1)[0].strip().upper()
+
+                if command in (b"EHLO", b"HELO"):
+                    await self.reply(writer, b"250 fake smtp")
+                elif command in (b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                    await self.reply(writer, b"250 OK")
+                elif command == b"DATA":
+                    await self.reply(writer, b"354 end with <CRLF>.<CRLF>")
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    self.messages.append(
+                        message_from_bytes(data[:-5], policy=policy.default)
+                    )
+                    await self.reply(writer, b"250 OK")
+                elif command == b"QUIT":
+                    await self.reply(writer, b"221 bye")
+                    break
+                else:
+                    await self.reply(writer, b"502 not implemented")
+        finally:
+            writer.close()
+
+    async def reply(self, writer, line):
+        writer.write(line + b"\r\n")
+        await writer.drain()
@@ -1,11 +1,18 @@
 import asyncio
+import time
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.future import select
 
-from app.main import app, startup_event
+import app.main
+from app.authorization import decode_token_jwt
+from app.database import RevokedToken
+from app.main import app as api
+from app.main import startup_event
+from app.revocation import BloomFilter, RevocationList, access_key, subject_key
 
-client = TestClient(app)
+client = TestClient(api)
 
 
 @pytest.fixture
@@ -109,3 +116,225 @@ I6MTY1NTkzMTE1MywiZXhwIjoxNjU2NTM1OTUzfQ.xCbYI_aEhEVYagoeuL5peUuU4k2c32sNivkYIJf
 
     assert response.status_code == 401
     assert response.json() == {"detail": "INVALID_SIGNATURE"}
+
+
+def login_tokens() -> dict[str, str]:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    body = {"login": "email@email.com", "password": "12345678"}
+    return client.post("/login/user", json=body).json()
+
+
+def test_refresh_token_should_issue_access_token(drop_database):
+    tokens = login_tokens()
+
+    response = client.post(
+        "/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "TOKEN_REFRESHED"
+
+    token = response.json()["token"]
+    response = client.get("/account/logged", headers={"Authorization": token})
+
+    assert response.status_code == 200
+
+
+def test_refresh_token_should_not_be_accepted_as_access_token(drop_database):
+    tokens = login_tokens()
+
+    response = client.get(
+        "/account/logged", headers={"Authorization": tokens["refresh_token"]}
+    )
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_INVALID"}
+
+
+def test_access_token_should_not_refresh(drop_database):
+    tokens = login_tokens()
+
+    response = client.post("/token/refresh", json={"refresh_token": tokens["token"]})
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_INVALID"}
+
+
+def login_employee(cpf: str, email: str, **roles: bool) -> dict[str, str]:
+    body = {
+        "name": "Christian Lopes",
+        "email": email,
+        "cpf": cpf,
+        "password": "12345678",
+        **roles,
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": cpf, "password": "12345678"}
+    return client.post("/login/employee", json=body).json()
+
+
+def token_roles(token: str) -> list[str]:
+    return asyncio.run(decode_token_jwt(token)).roles
+
+
+def test_login_employee_should_carry_roles(drop_database):
+    manager = login_employee("12345678901", "email2@email.com", manager=True)
+    attendant = login_employee("17410599090", "email@email.com")
+
+    assert token_roles(manager["token"]) == ["manager"]
+    assert token_roles(attendant["token"]) == ["attendant"]
+
+
+def test_refresh_token_should_carry_new_roles(drop_database):
+    manager = login_employee("12345678901", "email2@email.com", manager=True)
+    attendant = login_employee("17410599090", "email@email.com")
+
+    client.put(
+        "/edit/occupation",
+        json={"cpf": "17410599090", "manager": True},
+        headers={"Authorization": manager["token"]},
+    )
+    response = client.post(
+        "/token/refresh", json={"refresh_token": attendant["refresh_token"]}
+    )
+
+    assert token_roles(response.json()["token"]) == ["manager"]
+
+
+def test_change_occupation_should_revoke_previous_access_tokens(drop_database):
+    manager = login_employee("12345678901", "email2@email.com", manager=True)
+    demoted = login_employee("17410599090", "email@email.com", manager=True)
+
+    client.put(
+        "/edit/occupation",
+        json={"cpf": "17410599090", "attendant": True},
+        headers={"Authorization": manager["token"]},
+    )
+
+    response = client.post(
+        "/revoke/employee/1", headers={"Authorization": demoted["token"]}
+    )
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_REVOKED"}
+
+    response = client.post(
+        "/token/refresh", json={"refresh_token": demoted["refresh_token"]}
+    )
+    token = response.json()["token"]
+    assert token_roles(token) == ["attendant"]
+
+    response = client.post("/revoke/employee/1", headers={"Authorization": token})
+    assert response.status_code == 403
+
+
+def test_change_occupation_with_user_token_should_unauthorized(drop_database):
+    login_employee("12345678901", "email2@email.com", manager=True)
+    tokens = login_tokens()
+
+    response = client.put(
+        "/edit/occupation",
+        json={"cpf": "12345678901", "attendant": True},
+        headers={"Authorization": tokens["token"]},
+    )
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "UNAUTHORIZED_ACCESS"}
+
+
+def test_revoke_employee_should_reject_previous_tokens(drop_database):
+    manager = login_employee("12345678901", "email2@email.com", manager=True)
+    attendant = login_employee("17410599090", "email@email.com")
+
+    response = client.post(
+        "/revoke/employee/2", headers={"Authorization": manager["token"]}
+    )
+    assert response.json() == {"id": 2, "message": "TOKENS_REVOKED"}
+
+    response = client.get(
+        "/shop_orders/open", headers={"Authorization": attendant["token"]}
+    )
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_REVOKED"}
+
+    response = client.post(
+        "/token/refresh", json={"refresh_token": attendant["refresh_token"]}
+    )
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_REVOKED"}
+
+    body = {"login": "17410599090", "password": "12345678"}
+    token = client.post("/login/employee", json=body).json()["token"]
+    response = client.get("/shop_orders/open", headers={"Authorization": token})
+    assert response.status_code == 200
+
+
+def test_revoke_employee_not_found(drop_database):
+    manager = login_employee("12345678901", "email2@email.com", manager=True)
+
+    response = client.post(
+        "/revoke/employee/9", headers={"Authorization": manager["token"]}
+    )
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "EMPLOYEE_NOT_FOUND"}
+
+
+def test_revocation_list_should_check_tokens_without_queries(drop_database):
+    manager = login_employee("12345678901", "email2@email.com", manager=True)
+    login_employee("17410599090", "email@email.com", manager=True)
+    client.put(
+        "/edit/occupation",
+        json={"cpf": "17410599090", "attendant": True},
+        headers={"Authorization": manager["token"]},
+    )
+    session_maker = app.main.context.session_maker
+
+    async def expires_in():
+        async with session_maker() as session:
+            expires_at = await session.execute(select(RevokedToken.expires_at))
+            return expires_at.scalar() - time.time()
+
+    assert 0 < asyncio.run(expires_in()) <= 15 * 60 + 30
+
+    revocations = RevocationList(session_maker=session_maker)
+    asyncio.run(revocations.refresh())
+    revocations.session_maker = None
+    claims = {"id": 2, "type": "employee", "use": "access"}
+
+    assert list(revocations.revoked) == [access_key("employee", 2)]
+    assert asyncio.run(revocations.is_revoked({**claims, "iat": 0}))
+    assert not asyncio.run(revocations.is_revoked({**claims, "iat": time.time()}))
+    assert not asyncio.run(
+        revocations.is_revoked({**claims, "use": "refresh", "iat": 0})
+    )
+
+
+def test_bloom_filter_should_contain_every_added_key():
+    bloom = BloomFilter(1000)
+    keys = [subject_key("user", id) for id in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert sum(subject_key("employee", id) in bloom for id in range(1000)) < 50
+
+
+def test_revocation_list_should_grow_filter_with_remembered_keys():
+    revocations = RevocationList()
+    keys = [subject_key("user", id) for id in range(5000)]
+    for key in keys:
+        revocations.remember(key)
+
+    assert revocations.bloom.capacity >= len(keys)
+    assert (
+        sum(subject_key("employee", id) in revocations.bloom for id in range(1000)) < 50
+    )
@@ -0,0 +1,243 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import Cache, MemoryCache, RedisCache
+from app.main import app, startup_event
+from app.user import profile_lookups
+from tests.fake_redis import FakeRedisServer
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+def test_memory_cache_should_evict_least_recently_used():
+    async def scenario():
+        cache = MemoryCache(max_entries=2)
+        await cache.set("a", b"1", 60)
+        await cache.set("b", b"2", 60)
+        await cache.get("a")
+        await cache.set("c", b"3", 60)
+
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [b"1", None, b"3"]
+
+
+def test_memory_cache_should_expire_entries():
+    async def scenario():
+        cache = MemoryCache()
+        await cache.set("a", b"1", 0.01)
+        await asyncio.sleep(0.02)
+
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_cache_should_not_set_value_loaded_before_invalidation():
+    async def scenario():
+        cache = Cache()
+        generation = cache.generation
+        await cache.invalidate("profile:user:1")
+        await cache.set("profile:user:1", b"old", generation=generation)
+        stale = await cache.get("profile:user:1")
+
+        await cache.set("profile:user:1", b"new", generation=cache.generation)
+        return stale, await cache.get("profile:user:1")
+
+    assert asyncio.run(scenario()) == (None, b"new")
+
+
+def test_redis_cache_should_get_set_and_delete():
+    async def scenario():
+        server = await FakeRedisServer().start()
+        cache = RedisCache("127.0.0.1", server.port)
+
+        await cache.set("a", b"1", 60)
+        first = await cache.get("a")
+        await cache.delete("a")
+        second = await cache.get("a")
+
+        await cache.close()
+        await server.stop()
+        return first, second
+
+    assert asyncio.run(scenario()) == (b"1", None)
+
+
+def test_cache_should_invalidate_other_workers():
+    async def scenario():
+        server = await FakeRedisServer().start()
+        url = f"redis://127.0.0.1:{server.port}/0"
+        worker_a = Cache(shared=RedisCache.from_url(url))
+        worker_b = Cache(shared=RedisCache.from_url(url))
+
+        listener = asyncio.create_task(worker_b.listen())
+        await asyncio.sleep(0.05)
+
+        await worker_a.set("products:actives", b"old")
+        cached = await worker_b.get("products:actives")
+        await worker_a.invalidate("products:actives")
+        await asyncio.sleep(0.05)
+
+        local = await worker_b.local.get("products:actives")
+        shared = await worker_b.get("products:actives")
+
+        listener.cancel()
+        await worker_a.shared.close()
+        await worker_b.shared.close()
+        await server.stop()
+        return cached, local, shared
+
+    assert asyncio.run(scenario()) == (b"old", None, None)
+
+
+def test_cache_should_miss_when_shared_backend_is_down():
+    async def scenario():
+        cache = Cache(shared=RedisCache("127.0.0.1", 1))
+        await cache.set("a", b"1")
+        await cache.local.delete("a")
+
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_cache_should_miss_when_shared_backend_hangs():
+    async def scenario():
+        async def never_reply(reader, writer):
+            await reader.read()
+
+        server = await asyncio.start_server(never_reply, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        cache = Cache(shared=RedisCache("127.0.0.1", port, timeout=0.1))
+
+        start = time.monotonic()
+        values = await asyncio.gather(*[cache.get(f"{key}") for key in range(10)])
+        concurrent = time.monotonic() - start
+
+        start = time.monotonic()
+        value = await cache.get("a")
+        skipped = time.monotonic() - start
+        connected = cache.shared.writer is not None
+
+        server.close()
+        return values + [value], concurrent, skipped, connected
+
+    values, concurrent, skipped, connected = asyncio.run(scenario())
+
+    assert values == [None] * 11
+    assert concurrent < 0.3
+    assert skipped < 0.05
+    assert not connected
+
+
+def test_get_products_actives_should_refresh_after_write(drop_database):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    response = client.post("/login/employee", json=body)
+    header = {"Authorization": response.json()["token"]}
+
+    response = client.get("/products/actives", headers=header)
+    assert response.json() == {"products": []}
+
+    body = {
+        "name": "Açai 200ml",
+        "description": "Açai 200ml",
+        "image_url": "http://www.google.com",
+        "price": "10,00",
+        "activate": True,
+    }
+    client.post("/create/product", json=body, headers=header)
+
+    response = client.get("/products/actives", headers=header)
+    assert len(response.json()["products"]) == 1
+
+    body = {"id": 1, "status": False}
+    client.patch("/inactivate/product", json=body, headers=header)
+
+    response = client.get("/products/actives", headers=header)
+    assert response.json() == {"products": []}
+
+
+def test_get_account_logged_should_cache_until_edit(drop_database):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    body = {"login": "email@email.com", "password": "12345678"}
+    response = client.post("/login/user", json=body)
+    header = {"Authorization": response.json()["token"]}
+
+    hits = profile_lookups.get(result="hit")
+    misses = profile_lookups.get(result="miss")
+
+    client.get("/account/logged", headers=header)
+    response = client.get("/account/logged", headers=header)
+
+    assert response.json()["name"] == "Christian Lopes"
+    assert profile_lookups.get(result="hit") == hits + 1
+    assert profile_lookups.get(result="miss") == misses + 1
+    assert "profile_cache_hit_ratio" in client.get("/metrics").text
+
+    client.put("/edit/account", json={"name": "Christian"}, headers=header)
+    response = client.get("/account/logged", headers=header)
+
+    assert response.json()["name"] == "Christian"
+
+
+def test_change_occupation_should_refresh_cached_profile(drop_database):
+    for cpf, email, manager in (
+        ("12345678901", "email2@email.com", True),
+        ("17410599090", "email@email.com", False),
+    ):
+        body = {
+            "email": email,
+            "name": "Christian Lopes",
+            "cpf": cpf,
+            "password": "12345678",
+            "manager": manager,
+        }
+        client.post("/register/employee", json=body)
+
+    headers = [
+        {
+            "Authorization": client.post(
+                "/login/employee", json={"login": cpf, "password": "12345678"}
+            ).json()["token"]
+        }
+        for cpf in ("12345678901", "17410599090")
+    ]
+
+    response = client.get("/account/logged", headers=headers[1])
+    assert response.json()["occupation"] == "Attendant"
+
+    client.put(
+        "/edit/occupation",
+        json={"cpf": "17410599090", "manager": True},
+        headers=headers[0],
+    )
+    body = {"login": "17410599090", "password": "12345678"}
+    token = client.post("/login/employee", json=body).json()["token"]
+    response = client.get("/account/logged", headers={"Authorization": token})
+
+    assert response.json()["occupation"] == "Manager"
@@ -0,0 +1,103 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.main
+from app.cleanup import purge_forgot_passwords, purge_outbox_jobs, purged_rows
+from app.database import ForgotPassword, OutboxJob, User
+from app.main import app as api
+from app.main import startup_event
+
+client = TestClient(api)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+async def add_tokens(session_maker):
+    now = datetime.datetime.now()
+    async with session_maker() as session:
+        session.add(
+            User(name="Christian", email="a@a.com", cpf="1", phone="2", password="x")
+        )
+        await session.flush()
+        session.add_all(
+            [
+                ForgotPassword(token="fresh", user=1, requisition_date=now),
+                ForgotPassword(
+                    token="used", user=1, requisition_date=now, utilized=True
+                ),
+                ForgotPassword(
+                    token="expired",
+                    user=1,
+                    requisition_date=now - datetime.timedelta(hours=2),
+                ),
+            ]
+        )
+        await session.commit()
+
+
+async def tokens(session_maker):
+    async with session_maker() as session:
+        return (await session.execute(select(ForgotPassword.token))).scalars().all()
+
+
+def test_purge_forgot_passwords_should_delete_used_and_expired(drop_database):
+    session_maker = app.main.context.session_maker
+    asyncio.run(add_tokens(session_maker))
+
+    first = asyncio.run(purge_forgot_passwords(session_maker, 3600, limit=1))
+    second = asyncio.run(purge_forgot_passwords(session_maker, 3600))
+
+    assert (first, second) == (1, 1)
+    assert asyncio.run(tokens(session_maker)) == ["fresh"]
+
+
+def test_purge_outbox_jobs_should_delete_done_and_old_failed(drop_database):
+    session_maker = app.main.context.session_maker
+    now = datetime.datetime.now()
+    week_ago = now - datetime.timedelta(days=7)
+
+    async def scenario():
+        async with session_maker() as session:
+            session.add_all(
+                [
+                    OutboxJob(
+                        kind=kind,
+                        payload="{}",
+                        status=status,
+                        attempts=1,
+                        run_after=created_at,
+                        created_at=created_at,
+                    )
+                    for kind, status, created_at in (
+                        ("pending", "pending", week_ago),
+                        ("done", "done", now),
+                        ("failed", "failed", now),
+                        ("old_failed", "failed", week_ago),
+                    )
+                ]
+            )
+            await session.commit()
+
+        purged = await purge_outbox_jobs(session_maker, 3600)
+        async with session_maker() as session:
+            kinds = await session.execute(select(OutboxJob.kind))
+            return purged, kinds.scalars().all()
+
+    assert asyncio.run(scenario()) == (2, ["pending", "failed"])
+
+
+def test_metrics_should_report_purged_rows():
+    purged_rows.inc(3)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "# TYPE forgot_password_purged_rows_total counter" in response.text
+    assert f"forgot_password_purged_rows_total {purged_rows.get()}" in response.text
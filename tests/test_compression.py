@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache import get_cache
+from app.compression import accepted_encodings, choose_encoding
+from app.main import app, startup_event
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+def create_products(amount: int) -> dict[str, str]:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    header = {
+        "Authorization": client.post("/login/employee", json=body).json()["token"]
+    }
+
+    body = {
+        "products": [
+            {
+                "name": f"Açai {index}",
+                "description": "Açai com granola",
+                "image_url": "http://www.google.com",
+                "price": "10,00",
+                "activate": True,
+            }
+            for index in range(amount)
+        ]
+    }
+    client.post("/create/products", json=body, headers=header)
+    return header
+
+
+def test_accepted_encodings_should_parse_quality():
+    assert accepted_encodings("gzip;q=0.5, br;q=0, identity") == {
+        "gzip": 0.5,
+        "br": 0,
+        "identity": 1.0,
+    }
+
+
+def test_choose_encoding_should_skip_refused_encodings():
+    assert choose_encoding("br;q=0, gzip", ("br", "gzip")) == "gzip"
+    assert choose_encoding("*", ("br", "gzip")) == "br"
+    assert choose_encoding("identity", ("br", "gzip")) is None
+
+
+def test_large_list_should_be_compressed(drop_database):
+    header = create_products(30)
+
+    response = client.get(
+        "/products/all", headers={**header, "Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()["products"]) == 30
+
+
+def test_response_should_not_be_compressed_without_accept_encoding(drop_database):
+    header = create_products(30)
+
+    response = client.get(
+        "/products/all", headers={**header, "Accept-Encoding": "identity"}
+    )
+
+    assert "content-encoding" not in response.headers
+    assert len(response.json()["products"]) == 30
+
+
+def test_small_response_should_not_be_compressed(drop_database):
+    header = create_products(1)
+
+    response = client.get(
+        "/products/all", headers={**header, "Accept-Encoding": "gzip"}
+    )
+
+    assert "content-encoding" not in response.headers
+
+
+def test_catalog_should_be_compressed_once(drop_database):
+    header = create_products(30)
+    header = {**header, "Accept-Encoding": "gzip"}
+
+    first = client.get("/products/all", headers=header)
+    second = client.get("/products/all", headers=header)
+
+    compressed = [
+        key for key in get_cache().local.entries if key.startswith("compressed:gzip:")
+    ]
+    assert len(compressed) == 1
+    assert first.content == second.content
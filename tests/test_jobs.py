@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.main
+from app.database import OutboxJob
+from app.jobs import JobQueue, add_job
+from app.mail import Mailer, mail_handlers
+from app.main import app as api
+from app.main import startup_event
+from tests.fake_smtp import FakeSMTPServer
+
+client = TestClient(api)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+def register_user():
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+
+async def outbox(session_maker):
+    async with session_maker() as session:
+        jobs = await session.execute(
+            select(OutboxJob.kind, OutboxJob.status, OutboxJob.attempts)
+        )
+        return jobs.all()
+
+
+def test_forgot_password_should_send_email_in_background(drop_database):
+    register_user()
+    session_maker = app.main.context.session_maker
+
+    body = {"email": "email@email.com", "cpf": "17410599090"}
+    response = client.post("/forgot/password", json=body)
+
+    assert response.status_code == 201
+    assert asyncio.run(outbox(session_maker)) == [
+        ("password_reset_email", "pending", 0)
+    ]
+
+    async def scenario():
+        server = await FakeSMTPServer().start()
+        mailer = Mailer(host="127.0.0.1", port=server.port)
+        queue = JobQueue(session_maker=session_maker, handlers=mail_handlers(mailer))
+
+        handled = await queue.run_pending()
+
+        await server.stop()
+        return handled, server.messages
+
+    handled, messages = asyncio.run(scenario())
+
+    assert handled == 1
+    assert messages[0]["To"] == "email@email.com"
+    assert "Use o código" in messages[0].get_content()
+    assert asyncio.run(outbox(session_maker)) == [("password_reset_email", "done", 1)]
+
+    async def payloads():
+        async with session_maker() as session:
+            return (await session.execute(select(OutboxJob.payload))).scalars().all()
+
+    assert asyncio.run(payloads()) == ["{}"]
+
+
+def test_job_queue_should_retry_and_give_up(drop_database):
+    session_maker = app.main.context.session_maker
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload)
+        raise ConnectionError("smtp down")
+
+    async def scenario():
+        async with session_maker() as session:
+            add_job(session, "flaky", {"id": 1})
+            await session.commit()
+
+        queue = JobQueue(
+            session_maker=session_maker,
+            handlers={"flaky": flaky},
+            max_attempts=2,
+            retry_seconds=0,
+        )
+        await queue.run_pending()
+
+    asyncio.run(scenario())
+
+    assert calls == [{"id": 1}, {"id": 1}]
+    assert asyncio.run(outbox(session_maker)) == [("flaky", "failed", 2)]
+
+
+def test_job_queue_should_not_run_leased_jobs_twice(drop_database):
+    session_maker = app.main.context.session_maker
+
+    async def scenario():
+        async with session_maker() as session:
+            add_job(session, "noop", {})
+            await session.commit()
+
+        first, second = JobQueue(session_maker=session_maker), JobQueue(
+            session_maker=session_maker
+        )
+        return await first.claim(10), await second.claim(10)
+
+    first, second = asyncio.run(scenario())
+
+    assert len(first) == 1
+    assert second == []
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from app.loop_monitor import LoopMonitor, loop_blocked, loop_lag_max
+
+
+def block_loop(seconds):
+    time.sleep(seconds)
+
+
+def test_loop_monitor_should_measure_lag():
+    async def scenario():
+        monitor = LoopMonitor(interval_seconds=0.01)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+
+        block_loop(0.1)
+        await asyncio.sleep(0.02)
+
+        task.cancel()
+        return loop_lag_max.get()
+
+    assert asyncio.run(scenario()) >= 0.05
+
+
+def test_loop_monitor_should_name_blocking_function():
+    async def scenario():
+        monitor = LoopMonitor(interval_seconds=0.5, threshold_seconds=0.05, debug=True)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+
+        block_loop(0.3)
+        await asyncio.sleep(0.05)
+
+        task.cancel()
+        return list(monitor.blocked)
+
+    blocked = asyncio.run(scenario())
+    function = "tests.test_loop_monitor.block_loop"
+
+    assert [entry.function for entry in blocked] == [function]
+    assert "block_loop" in blocked[0].stack
+    assert loop_blocked.get(function=function) >= 1
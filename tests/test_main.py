@@ -4,6 +4,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app, startup_event
+from app.settings import Settings
 from app.user import return_token_tests
 
 client = TestClient(app)
@@ -47,6 +48,43 @@ def test_create_user__should_conflict(drop_database):
     assert response.json() == {"detail": "EMAIL_ALREADY_EXISTS"}
 
 
+def test_create_user_cpf_should_conflict(drop_database):
+
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    response = client.post("/register/user", json=body)
+
+    body["email"] = "email2@email.com"
+    response = client.post("/register/user", json=body)
+
+    assert response.status_code == 409
+    assert response.json() == {"detail": "CPF_ALREADY_EXISTS"}
+
+
+def test_create_user_phone_should_conflict(drop_database):
+
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    response = client.post("/register/user", json=body)
+
+    body["email"] = "email2@email.com"
+    body["cpf"] = "12345678901"
+    response = client.post("/register/user", json=body)
+
+    assert response.status_code == 409
+    assert response.json() == {"detail": "PHONE_ALREADY_EXISTS"}
+
+
 def test_create_employee_should_success(drop_database):
 
     body = {
@@ -137,6 +175,7 @@ def test_login_user_should_success(drop_database):
         "login": "email@email.com",
         "message": "LOGIN_SUCCESSFUL",
         "token": obj_json["token"],
+        "refresh_token": obj_json["refresh_token"],
     }
 
 
@@ -164,6 +203,7 @@ def test_login_user_with_phone_should_success(drop_database):
         "login": "21999999999",
         "message": "LOGIN_SUCCESSFUL",
         "token": obj_json["token"],
+        "refresh_token": obj_json["refresh_token"],
     }
 
 
@@ -191,6 +231,7 @@ def test_login_user_with_cpf_should_success(drop_database):
         "login": "17410599090",
         "message": "LOGIN_SUCCESSFUL",
         "token": obj_json["token"],
+        "refresh_token": obj_json["refresh_token"],
     }
 
 
@@ -237,6 +278,7 @@ def test_login_employee_should_success(drop_database):
         "login": "email@email.com",
         "message": "LOGIN_SUCCESSFUL",
         "token": obj_json["token"],
+        "refresh_token": obj_json["refresh_token"],
     }
 
 
@@ -263,6 +305,7 @@ def test_login_employee_with_cpf_should_success(drop_database):
         "login": "17410599090",
         "message": "LOGIN_SUCCESSFUL",
         "token": obj_json["token"],
+        "refresh_token": obj_json["refresh_token"],
     }
 
 
@@ -358,7 +401,87 @@ def test_change_password_should_success(drop_database):
         "login": "17410599090",
         "message": "LOGIN_SUCCESSFUL",
         "token": response.json()["token"],
+        "refresh_token": response.json()["refresh_token"],
+    }
+
+
+def request_password_reset() -> tuple[dict[str, str], str]:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    body = {"cpf": "17410599090", "email": "email@email.com"}
+    response = client.post("/forgot/password", json=body)
+
+    return {"Authorization": response.json()["token"]}, return_token_tests()["token"]
+
+
+def test_change_password_used_token_should_error(drop_database):
+    header, token = request_password_reset()
+
+    body = {"password": "123456789", "token": token}
+    client.patch("/change/password", json=body, headers=header)
+
+    body = {"login": "17410599090", "password": "123456789"}
+    header = {"Authorization": client.post("/login/user", json=body).json()["token"]}
+
+    body = {"password": "1234567890", "token": token}
+    response = client.patch("/change/password", json=body, headers=header)
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "INVALID_TOKEN_TO_CHANGE_PASSWORD"}
+
+
+def test_change_password_should_revoke_previous_tokens(drop_database):
+    header, token = request_password_reset()
+
+    body = {"password": "123456789", "token": token}
+    client.patch("/change/password", json=body, headers=header)
+    response = client.get("/account/logged", headers=header)
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_REVOKED"}
+
+
+def test_change_password_expired_token_should_error(drop_database):
+    asyncio.run(startup_event(True, Settings(forgot_password_ttl_seconds=0)))
+    header, token = request_password_reset()
+
+    body = {"password": "123456789", "token": token}
+    response = client.patch("/change/password", json=body, headers=header)
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "INVALID_TOKEN_TO_CHANGE_PASSWORD"}
+
+
+def test_edit_account_password_should_revoke_previous_tokens(drop_database):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
     }
+    client.post("/register/user", json=body)
+    body = {"login": "17410599090", "password": "12345678"}
+    header = {"Authorization": client.post("/login/user", json=body).json()["token"]}
+
+    client.put("/edit/account", json={"password": "123456789"}, headers=header)
+    response = client.get("/account/logged", headers=header)
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "TOKEN_REVOKED"}
+
+    body = {"login": "17410599090", "password": "123456789"}
+    header = {"Authorization": client.post("/login/user", json=body).json()["token"]}
+    response = client.get("/account/logged", headers=header)
+
+    assert response.status_code == 200
 
 
 def test_edit_user_account_should_success(drop_database):
@@ -392,6 +515,41 @@ def test_edit_user_account_should_success(drop_database):
     assert response.status_code == 200
 
 
+def test_edit_user_account_email_should_conflict(drop_database):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    response = client.post("/register/user", json=body)
+
+    body = {
+        "email": "email2@email.com",
+        "name": "Christian Lopes",
+        "cpf": "12345678901",
+        "phone": "21888888888",
+        "password": "12345678",
+    }
+    response = client.post("/register/user", json=body)
+
+    body = {"login": "email@email.com", "password": "12345678"}
+    response = client.post("/login/user", json=body)
+    token = response.json()["token"]
+
+    header = {
+        "Authorization": token,
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    body = {"email": "email2@email.com", "phone": "21999999999"}
+    response = client.put("/edit/account", json=body, headers=header)
+
+    assert response.status_code == 409
+    assert response.json() == {"detail": "EMAIL_ALREADY_EXISTS"}
+
+
 def test_edit_employee_account_should_success(drop_database):
     body = {
         "email": "email@email.com",
@@ -422,6 +580,39 @@ def test_edit_employee_account_should_success(drop_database):
     assert response.status_code == 200
 
 
+def test_edit_employee_account_email_should_conflict(drop_database):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    response = client.post("/register/employee", json=body)
+
+    body = {
+        "email": "email2@email.com",
+        "name": "Christian Lopes",
+        "cpf": "12345678901",
+        "password": "12345678",
+    }
+    response = client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    response = client.post("/login/employee", json=body)
+    token = response.json()["token"]
+
+    header = {
+        "Authorization": token,
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    body = {"email": "email2@email.com", "phone": "21999999999"}
+    response = client.put("/edit/account", json=body, headers=header)
+
+    assert response.status_code == 409
+    assert response.json() == {"detail": "EMAIL_ALREADY_EXISTS"}
+
+
 def test_get_all_employees(drop_database):
     body = {
         "email": "email@email.com",
@@ -0,0 +1,266 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import app.main
+from app.archive import archive_orders
+from app.catalog import get_price_cache
+from app.database import Order
+from app.idempotency import IdempotencyStore
+from app.main import app as api
+from app.main import startup_event
+from app.models import OrderInput, OrderOutput, UserToken
+from app.settings import Settings
+
+client = TestClient(api)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+@pytest.fixture
+def drop_database_idempotency_db():
+    asyncio.run(startup_event(True, Settings(idempotency_db=True)))
+
+
+def login_user() -> str:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    body = {"login": "email@email.com", "password": "12345678"}
+    response = client.post("/login/user", json=body)
+    return response.json()["token"]
+
+
+def create_product() -> None:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    response = client.post("/login/employee", json=body)
+    header = {"Authorization": response.json()["token"]}
+
+    body = {"name": "Açai 200ml", "price": "10,00", "activate": True}
+    client.post("/create/product", json=body, headers=header)
+
+
+def test_create_order_with_idempotency_key_should_replay(drop_database):
+    create_product()
+    header = {"Authorization": login_user(), "Idempotency-Key": "order-1"}
+
+    body = {"items": [{"id": 1, "quantity": 2}]}
+    first = client.post("/order", json=body, headers=header)
+    second = client.post("/order", json=body, headers=header)
+
+    assert first.status_code == 201
+    assert second.status_code == 201
+    assert (
+        first.json()
+        == second.json()
+        == {
+            "id": 1,
+            "message": "ORDER_CREATED_WITH_SUCCESS",
+        }
+    )
+
+    response = client.get("/orders", headers=header)
+
+    assert len(response.json()["orders"]) == 1
+
+
+def test_create_order_with_idempotency_key_reused_should_error(drop_database):
+    create_product()
+    header = {"Authorization": login_user(), "Idempotency-Key": "order-1"}
+
+    body = {"items": [{"id": 1, "quantity": 2}]}
+    client.post("/order", json=body, headers=header)
+
+    body = {"items": [{"id": 1, "quantity": 3}]}
+    response = client.post("/order", json=body, headers=header)
+
+    assert response.status_code == 422
+    assert response.json() == {"detail": "IDEMPOTENCY_KEY_REUSED"}
+
+
+def test_create_order_with_idempotency_key_should_replay_from_db(
+    drop_database_idempotency_db,
+):
+    create_product()
+    header = {"Authorization": login_user(), "Idempotency-Key": "order-1"}
+
+    body = {"items": [{"id": 1, "quantity": 2}]}
+    first = client.post("/order", json=body, headers=header)
+
+    app.main.context.idempotency.entries.clear()
+    second = client.post("/order", json=body, headers=header)
+
+    assert first.json() == second.json()
+
+    response = client.get("/orders", headers=header)
+
+    assert len(response.json()["orders"]) == 1
+
+
+def test_create_order_with_idempotency_key_should_replay_across_workers(
+    drop_database_idempotency_db,
+):
+    create_product()
+    login_user()
+    session_maker = app.main.context.session_maker
+    workers = [IdempotencyStore(session_maker=session_maker) for _ in range(2)]
+    request = OrderInput(items=[{"id": 1, "quantity": 2}])
+    user = UserToken(id=1, type="user")
+
+    async def retries():
+        return await asyncio.gather(
+            *[
+                worker.order_create_once(request, user, "order-1", session_maker)
+                for worker in workers
+            ]
+        )
+
+    first, second = asyncio.run(retries())
+
+    assert first == second == OrderOutput(id=1, message="ORDER_CREATED_WITH_SUCCESS")
+
+    async def count_orders():
+        async with session_maker() as session:
+            return len((await session.execute(select(Order.id))).all())
+
+    assert asyncio.run(count_orders()) == 1
+
+
+def test_create_order_without_idempotency_key_should_duplicate(drop_database):
+    create_product()
+    header = {"Authorization": login_user()}
+
+    body = {"items": [{"id": 1, "quantity": 2}]}
+    client.post("/order", json=body, headers=header)
+    response = client.post("/order", json=body, headers=header)
+
+    assert response.json() == {"id": 2, "message": "ORDER_CREATED_WITH_SUCCESS"}
+
+
+def test_get_orders_should_list_every_item(drop_database):
+    create_product()
+    header = {"Authorization": login_user()}
+
+    body = {"items": [{"id": 1, "quantity": 2}, {"id": 1, "quantity": 1}]}
+    client.post("/order", json=body, headers=header)
+
+    response = client.get("/orders", headers=header)
+
+    assert response.status_code == 200
+    assert response.json()["orders"][0]["price"] == 30.0
+    assert response.json()["orders"][0]["products"] == [
+        {"id": 1, "quantity": 2},
+        {"id": 2, "quantity": 1},
+    ]
+
+    response = client.get("/order/1", headers=header)
+
+    assert response.json()["products"] == [
+        {"id": 1, "quantity": 2},
+        {"id": 2, "quantity": 1},
+    ]
+
+
+def test_archived_orders_should_be_listed_with_pagination(drop_database):
+    create_product()
+    header = {"Authorization": login_user()}
+    body = {"items": [{"id": 1, "quantity": 1}]}
+    for _ in range(3):
+        client.post("/order", json=body, headers=header)
+    client.put("/order/1", headers=header)
+    client.put("/order/2", headers=header)
+
+    archived = asyncio.run(
+        archive_orders(app.main.context.session_maker, date.today() + timedelta(days=1))
+    )
+
+    assert archived == 2
+
+    first = client.get("/orders?limit=2", headers=header).json()
+    assert [order["id"] for order in first["orders"]] == [1, 2]
+    assert first["orders"][0]["status"] == "OC"
+    assert first["orders"][0]["products"] == [{"id": 1, "quantity": 1}]
+    assert first["next_cursor"] == 2
+
+    second = client.get("/orders?limit=2&after=2", headers=header).json()
+    assert [order["id"] for order in second["orders"]] == [3]
+    assert second["next_cursor"] is None
+
+    response = client.get("/order/1", headers=header)
+    assert response.status_code == 200
+    assert response.json()["status"] == "OC"
+
+
+def test_archive_orders_should_keep_open_and_recent_orders(drop_database):
+    create_product()
+    header = {"Authorization": login_user()}
+    body = {"items": [{"id": 1, "quantity": 1}]}
+    client.post("/order", json=body, headers=header)
+    client.post("/order", json=body, headers=header)
+    client.put("/order/2", headers=header)
+
+    archived = asyncio.run(archive_orders(app.main.context.session_maker, date.today()))
+
+    assert archived == 0
+    assert len(client.get("/orders", headers=header).json()["orders"]) == 2
+
+
+def order_prices():
+    async def select_prices():
+        async with app.main.context.session_maker() as session:
+            orders = await session.execute(
+                select(Order.price, Order.price_version).order_by(Order.id)
+            )
+            return orders.all()
+
+    return asyncio.run(select_prices())
+
+
+def test_create_order_should_use_prices_of_current_catalog_version(drop_database):
+    create_product()
+    header = {"Authorization": login_user()}
+    body = {"items": [{"id": 1, "quantity": 2}]}
+    client.post("/order", json=body, headers=header)
+
+    response = client.post(
+        "/login/employee", json={"login": "17410599090", "password": "12345678"}
+    )
+    employee = {"Authorization": response.json()["token"]}
+    client.put("/update/product/1", json={"price": "12,00"}, headers=employee)
+
+    client.post("/order", json=body, headers=header)
+
+    assert order_prices() == [(20.0, 1), (24.0, 2)]
+    assert get_price_cache().prices == {1: 12.0}
+
+
+def test_create_order_with_unknown_product_should_not_create_order(drop_database):
+    create_product()
+    header = {"Authorization": login_user()}
+
+    body = {"items": [{"id": 1, "quantity": 1}, {"id": 9, "quantity": 1}]}
+    response = client.post("/order", json=body, headers=header)
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "PRODUCT_NOT_FOUND"}
+    assert order_prices() == []
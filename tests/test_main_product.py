@@ -521,3 +521,106 @@ def test_get_products_all_should_success(drop_database):
             },
         ]
     }
+
+
+def test_create_products_bulk_should_success(drop_database):
+    register_employee()
+    token = login_employee()
+
+    header = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": token,
+    }
+    body = {
+        "products": [
+            {"name": "Açai 200ml", "price": "10,00", "activate": True},
+            {"name": "Açai 300ml", "price": "dez reais"},
+            {"name": "Açai 500ml", "price": "18.50"},
+        ]
+    }
+    response = client.post("/create/products", json=body, headers=header)
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "products": [
+            {"index": 0, "id": 1, "message": "CREATE_PRODUCT_SUCCESS"},
+            {"index": 1, "id": None, "message": "INVALID_PRICE"},
+            {"index": 2, "id": 2, "message": "CREATE_PRODUCT_SUCCESS"},
+        ]
+    }
+
+
+def test_create_products_csv_should_success(drop_database):
+    register_employee()
+    token = login_employee()
+
+    header = {"Content-Type": "text/csv", "Authorization": token}
+    content = (
+        "name,description,image_url,price,activate\n"
+        'Açai 200ml,Açai 200ml,http://www.google.com,"10,00",true\n'
+        "Açai 1L\n"
+        "Açai 500ml,,,18.50,false\n"
+    )
+    response = client.post(
+        "/create/products/csv", data=content.encode("utf-8"), headers=header
+    )
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "products": [
+            {"index": 0, "id": 1, "message": "CREATE_PRODUCT_SUCCESS"},
+            {"index": 1, "id": None, "message": "INVALID_PRODUCT_ROW"},
+            {"index": 2, "id": 2, "message": "CREATE_PRODUCT_SUCCESS"},
+        ]
+    }
+
+    response = client.get("/products/actives", headers=header)
+
+    assert [product["name"] for product in response.json()["products"]] == [
+        "Açai 200ml"
+    ]
+
+
+def test_change_status_products_bulk_should_success(drop_database):
+    register_employee()
+    token = login_employee()
+    create_product(token)
+    create_product(token)
+
+    header = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": token,
+    }
+    body = {"ids": [1, 2, 3], "status": True}
+    response = client.patch("/inactivate/products", headers=header, json=body)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "products": [
+            {"id": 1, "message": "ACTIVATE_PRODUCT_SUCCESS"},
+            {"id": 2, "message": "ACTIVATE_PRODUCT_SUCCESS"},
+            {"id": 3, "message": "PRODUCT_NOT_FOUND"},
+        ]
+    }
+
+    response = client.get("/products/actives", headers=header)
+
+    assert len(response.json()["products"]) == 2
+
+
+def test_create_products_bulk_should_access_denied(drop_database):
+    register_user()
+    token = login_user()
+
+    header = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Authorization": token,
+    }
+    body = {"products": [{"name": "Açai 200ml", "price": "10,00"}]}
+    response = client.post("/create/products", json=body, headers=header)
+
+    assert response.status_code == 403
+    assert response.json() == {"detail": "ACCESS_DENIED"}
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app, startup_event
+from app.profiling import Profiler, Sampler
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+def login(path: str, body: dict[str, str]) -> dict[str, str]:
+    client.post(f"/register/{path}", json=body)
+
+    body = {"login": body["cpf"], "password": body["password"]}
+    response = client.post(f"/login/{path}", json=body)
+    return {"Authorization": response.json()["token"]}
+
+
+def login_employee() -> dict[str, str]:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    return login("employee", body)
+
+
+def burn_cpu(seconds):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    while loop.time() < deadline:
+        pass
+
+
+def test_sampler_should_fold_stacks_of_profiled_task():
+    async def scenario():
+        sampler = Sampler(
+            loop=asyncio.get_running_loop(),
+            task=asyncio.current_task(),
+            thread_id=threading.get_ident(),
+            interval_seconds=0.001,
+        )
+        with sampler.running():
+            burn_cpu(0.1)
+        return sampler.collapsed()
+
+    stacks = dict(line.rsplit(" ", 1) for line in asyncio.run(scenario()).splitlines())
+    burning = [
+        int(count)
+        for stack, count in stacks.items()
+        if "tests.test_profiling.scenario;tests.test_profiling.burn_cpu" in stack
+    ]
+
+    assert sum(burning) >= 1
+
+
+def test_profile_header_should_store_profile_for_employee(drop_database):
+    header = login_employee()
+
+    response = client.get("/shop_orders/open", headers={**header, "X-Profile": "1"})
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    response = client.get(f"/profiles/{profile_id}", headers=header)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert f"{profile_id}.folded" in response.headers["content-disposition"]
+
+
+def test_request_without_profile_header_should_not_profile(drop_database):
+    header = login_employee()
+
+    response = client.get("/shop_orders/open", headers=header)
+
+    assert "x-profile-id" not in response.headers
+
+
+def test_profile_header_from_user_should_not_profile(drop_database):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    header = login("user", body)
+
+    response = client.get("/orders", headers={**header, "X-Profile": "1"})
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_unknown_profile_should_not_found(drop_database):
+    header = login_employee()
+
+    response = client.get("/profiles/0123456789abcdef", headers=header)
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "PROFILE_NOT_FOUND"}
+
+
+def test_profiler_should_keep_last_profiles_in_directory(tmp_path):
+    profiler = Profiler(directory=tmp_path, max_entries=2)
+
+    async def save_all():
+        for id in ("a1", "b2", "c3"):
+            await profiler.save(id, f"{id} 1\n")
+            await asyncio.sleep(0.01)
+
+    asyncio.run(save_all())
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "b2.folded",
+        "c3.folded",
+    ]
+    assert Profiler(directory=tmp_path).get("c3") == "c3 1\n"
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app, startup_event
+from app.settings import Settings
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    asyncio.run(startup_event(True, Settings(public_catalog_dir=str(tmp_path))))
+    return tmp_path
+
+
+def create_products() -> dict[str, str]:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    response = client.post("/login/employee", json=body)
+    header = {"Authorization": response.json()["token"]}
+
+    body = {
+        "products": [
+            {
+                "name": name,
+                "description": name,
+                "image_url": "http://www.google.com",
+                "price": "10,00",
+                "activate": activate,
+            }
+            for name, activate in (("Açai 200ml", True), ("Açai 500ml", False))
+        ]
+    }
+    client.post("/create/products", json=body, headers=header)
+    return header
+
+
+def test_public_products_should_be_cacheable_without_token(catalog_dir):
+    create_products()
+
+    response = client.get("/public/products")
+
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()["products"]] == [
+        "Açai 200ml"
+    ]
+    assert response.headers["cache-control"] == (
+        "public, max-age=60, stale-while-revalidate=300"
+    )
+
+    etag = response.headers["etag"]
+
+    assert etag.startswith('W/"')
+
+    response = client.get("/public/products", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+    strong = etag.removeprefix("W/")
+    response = client.get(
+        "/public/products", headers={"If-None-Match": f'"other", {strong}'}
+    )
+
+    assert response.status_code == 304
+
+
+def test_product_write_should_publish_artifact(catalog_dir):
+    header = create_products()
+    first = client.get("/public/products")
+
+    assert json.loads((catalog_dir / "products.json").read_bytes()) == first.json()
+
+    client.patch("/inactivate/product", json={"id": 2, "status": True}, headers=header)
+    second = client.get("/public/products")
+
+    assert len(second.json()["products"]) == 2
+    assert second.headers["etag"] != first.headers["etag"]
+    assert json.loads((catalog_dir / "products.json").read_bytes()) == second.json()
+
+    response = client.get(first.headers["content-location"])
+
+    assert response.status_code == 200
+    assert response.json() == first.json()
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+
+def test_public_products_unknown_version_should_not_found(catalog_dir):
+    response = client.get("/public/products/0123456789abcdef.json")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "CATALOG_VERSION_NOT_FOUND"}
+
+
+def test_public_product_should_hide_inactive_products(catalog_dir):
+    create_products()
+
+    response = client.get("/public/product/1")
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Açai 200ml"
+    assert response.headers["cache-control"].startswith("public, max-age=60")
+
+    response = client.get("/public/product/2")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "PRODUCT_NOT_FOUND"}
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app, startup_event
+from app.rate_limit import MemoryRateLimitBackend, RateLimiter
+from app.settings import Settings
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True, Settings(rate_limit_capacity=2)))
+
+
+def test_login_user_should_too_many_requests(drop_database):
+    body = {"login": "email@email.com", "password": "12345678"}
+    client.post("/login/user", json=body)
+    client.post("/login/user", json=body)
+    response = client.post("/login/user", json=body)
+
+    assert response.status_code == 429
+    assert response.json() == {"detail": "TOO_MANY_REQUESTS"}
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_forgot_password_should_too_many_requests_by_ip(drop_database):
+    body = {"cpf": "17410599090", "email": "email1@email.com"}
+    client.post("/forgot/password", json=body)
+    body = {"cpf": "17410599090", "email": "email2@email.com"}
+    client.post("/forgot/password", json=body)
+    body = {"cpf": "17410599090", "email": "email3@email.com"}
+    response = client.post("/forgot/password", json=body)
+
+    assert response.status_code == 429
+
+
+def test_rate_limiter_should_refill_tokens():
+    limiter = RateLimiter(capacity=1, refill_rate=1000)
+
+    assert asyncio.run(limiter.check("ip:1")) is None
+    assert asyncio.run(limiter.check("ip:1")) > 0
+
+    asyncio.run(asyncio.sleep(0.01))
+
+    assert asyncio.run(limiter.check("ip:1")) is None
+
+
+def test_memory_rate_limit_backend_should_drop_least_recently_used():
+    backend = MemoryRateLimitBackend(max_buckets=2)
+
+    for key in ("ip:1", "ip:2", "ip:1", "ip:3"):
+        asyncio.run(backend.take(key, 1, 0.001))
+
+    assert list(backend.buckets) == ["ip:1", "ip:3"]
+    assert asyncio.run(backend.take("ip:1", 1, 0.001)) > 0
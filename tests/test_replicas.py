@@ -0,0 +1,112 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.cache import RedisCache
+from app.database import Product, setup_db_tests
+from app.models import UserToken
+from app.replicas import setup_replicas
+from app.settings import Settings
+from tests.fake_redis import FakeRedisServer
+
+USER = UserToken(id=1, type="user")
+
+
+def replica_urls(tmp_path):
+    return [f"sqlite+aiosqlite:///{tmp_path / name}" for name in ("r1.db", "r2.db")]
+
+
+def setup_router(tmp_path, urls, **settings):
+    primary = asyncio.run(setup_db_tests(f"sqlite+aiosqlite:///{tmp_path / 'p.db'}"))
+    for url in urls:
+        asyncio.run(setup_db_tests(url))
+
+    return setup_replicas(primary, Settings(db_replica_urls=urls, **settings))
+
+
+async def product_names(session_maker):
+    async with session_maker() as session:
+        return (await session.execute(select(Product.name))).scalars().all()
+
+
+def test_reader_should_round_robin_between_replicas(tmp_path):
+    router = setup_router(tmp_path, replica_urls(tmp_path))
+
+    async def readers():
+        return [await router.reader(USER) for _ in range(4)]
+
+    readers = asyncio.run(readers())
+
+    assert readers[0] is readers[2]
+    assert readers[1] is readers[3]
+    assert readers[0] is not readers[1]
+    assert router.primary not in readers
+
+
+def test_reader_should_read_own_writes_from_primary(tmp_path):
+    router = setup_router(tmp_path, replica_urls(tmp_path))
+
+    async def write_then_read():
+        async with (await router.writer(USER))() as session:
+            session.add(Product(name="Sorvete", price=10))
+            await session.commit()
+        return await product_names(await router.reader(USER))
+
+    assert asyncio.run(write_then_read()) == ["Sorvete"]
+    assert asyncio.run(router.reader(UserToken(id=2, type="user"))) is not (
+        router.primary
+    )
+
+
+def test_reader_should_leave_primary_after_sticky_window(tmp_path):
+    router = setup_router(tmp_path, replica_urls(tmp_path), db_replica_sticky_seconds=0)
+
+    asyncio.run(router.writer(USER))
+
+    assert asyncio.run(router.reader(USER)) is not router.primary
+
+
+def test_reader_should_read_own_writes_from_primary_on_any_worker(tmp_path):
+    worker_a = setup_router(tmp_path, replica_urls(tmp_path))
+    worker_b = setup_replicas(worker_a.primary, Settings(db_replica_urls=[]))
+    worker_b.replicas = worker_a.replicas
+
+    async def write_then_read():
+        server = await FakeRedisServer().start()
+        url = f"redis://127.0.0.1:{server.port}"
+        worker_a.shared = RedisCache.from_url(url)
+        worker_b.shared = RedisCache.from_url(url)
+
+        await worker_a.writer(USER)
+        readers = [
+            await worker_b.reader(USER),
+            await worker_b.reader(UserToken(id=2, type="user")),
+        ]
+
+        await worker_a.shared.close()
+        await worker_b.shared.close()
+        await server.stop()
+        return readers
+
+    own, other = asyncio.run(write_then_read())
+
+    assert own is worker_a.primary
+    assert other is not worker_a.primary
+
+
+def test_reader_should_skip_unhealthy_replicas(tmp_path):
+    broken = f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'r.db'}"
+    router = setup_router(tmp_path, replica_urls(tmp_path)[:1])
+    router.replicas += setup_replicas(None, Settings(db_replica_urls=[broken])).replicas
+
+    asyncio.run(router.check())
+
+    assert [replica.healthy for replica in router.replicas] == [True, False]
+    assert asyncio.run(router.reader(USER)) is router.replicas[0].session_maker
+    assert asyncio.run(router.reader(USER)) is router.replicas[0].session_maker
+
+
+def test_reader_should_fallback_to_primary_without_healthy_replicas(tmp_path):
+    router = setup_router(tmp_path, [])
+
+    assert asyncio.run(router.reader(USER)) is router.primary
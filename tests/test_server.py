@@ -0,0 +1,70 @@
+import os
+
+from app.server import main, server_options, shared_environment
+from app.settings import Settings
+from tests.test_startup import table_names
+
+
+def test_server_options_should_use_settings():
+    options = server_options(
+        Settings(workers=3, port=9000, backlog=512, keep_alive_seconds=30)
+    )
+
+    assert options["workers"] == 3
+    assert options["port"] == 9000
+    assert options["backlog"] == 512
+    assert options["timeout_keep_alive"] == 30
+
+
+def test_server_options_should_fallback_without_uvloop_and_httptools(monkeypatch):
+    monkeypatch.setattr("app.server.is_installed", lambda module: False)
+
+    options = server_options(Settings())
+
+    assert options["loop"] == "asyncio"
+    assert options["http"] == "h11"
+    assert options["workers"] >= 1
+
+
+def test_server_options_should_prefer_uvloop_and_httptools(monkeypatch):
+    monkeypatch.setattr("app.server.is_installed", lambda module: True)
+
+    options = server_options(Settings())
+
+    assert options["loop"] == "uvloop"
+    assert options["http"] == "httptools"
+
+
+def test_shared_environment_should_share_profiles_between_workers():
+    settings = Settings(db_create_schema=False)
+    environment = shared_environment(settings, workers=2)
+
+    assert os.path.isdir(environment["PROFILE_DIR"])
+    os.rmdir(environment["PROFILE_DIR"])
+    assert shared_environment(settings, workers=1) == {}
+    assert shared_environment(settings.copy(update={"profile_dir": "/p"}), 2) == {}
+
+
+def test_main_should_upgrade_schema_once_before_workers(tmp_path, monkeypatch):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'server.db'}"
+    monkeypatch.setenv("DB_URL", url)
+    monkeypatch.setenv("DB_CREATE_SCHEMA", "true")
+    monkeypatch.setenv("WORKERS", "1")
+    started = []
+    monkeypatch.setattr(
+        "app.server.uvicorn.run", lambda app, **options: started.append(app)
+    )
+
+    main()
+
+    assert started == ["app.main:app"]
+    assert os.environ["DB_CREATE_SCHEMA"] == "false"
+    assert "alembic_version" in table_names(url)
+
+
+def test_log_config_should_log_app_at_log_level():
+    config = server_options(Settings(log_level="debug"))["log_config"]
+
+    assert config["loggers"]["app"]["level"] == "DEBUG"
+    assert config["loggers"]["app"]["handlers"] == ["app"]
+    assert "uvicorn" in config["loggers"]
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app, startup_event
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def drop_database():
+    asyncio.run(startup_event(True))
+
+
+def login_user() -> str:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    body = {"login": "email@email.com", "password": "12345678"}
+    response = client.post("/login/user", json=body)
+    return response.json()["token"]
+
+
+def login_employee() -> str:
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    response = client.post("/login/employee", json=body)
+    return response.json()["token"]
+
+
+def create_orders(amount: int) -> None:
+    employee_header = {"Authorization": login_employee()}
+    body = {"name": "Açai 200ml", "price": "10,00", "activate": True}
+    client.post("/create/product", json=body, headers=employee_header)
+
+    user_header = {"Authorization": login_user()}
+    for _ in range(amount):
+        body = {"items": [{"id": 1, "quantity": 2}]}
+        client.post("/order", json=body, headers=user_header)
+
+
+def test_shop_orders_batch_should_success(drop_database):
+    create_orders(3)
+    header = {"Authorization": login_employee()}
+
+    body = {
+        "orders": [
+            {"id": 1, "action": "accept"},
+            {"id": 2, "action": "refuse"},
+            {"id": 3, "action": "finish"},
+            {"id": 4, "action": "accept"},
+        ]
+    }
+    response = client.post("/shop_orders/batch", json=body, headers=header)
+
+    assert response.status_code == 200
+
+    orders = response.json()["orders"]
+    assert [order["message"] for order in orders] == [
+        "ORDER_ACCEPTED",
+        "ORDER_REFUSED",
+        "INVALID_ORDER_STATUS",
+        "ORDER_NOT_FOUND",
+    ]
+    assert [order["order"] and order["order"]["status"] for order in orders] == [
+        "OK",
+        "OR",
+        "WS",
+        None,
+    ]
+    assert orders[0]["order"]["price"] == 20.0
+    assert orders[0]["order"]["products"] == [{"id": 1, "quantity": 2}]
+
+    body = {
+        "orders": [
+            {"id": 1, "action": "finish"},
+            {"id": 1, "action": "cancel"},
+        ]
+    }
+    response = client.post("/shop_orders/batch", json=body, headers=header)
+
+    orders = response.json()["orders"]
+    assert [order["message"] for order in orders] == [
+        "ORDER_FINISHED",
+        "INVALID_ORDER_STATUS",
+    ]
+    assert orders[1]["order"]["status"] == "OF"
+    assert orders[1]["order"]["finished"] is True
+
+
+def test_shop_orders_batch_should_apply_only_first_action_per_order(drop_database):
+    create_orders(2)
+    header = {"Authorization": login_employee()}
+
+    body = {
+        "orders": [
+            {"id": 1, "action": "finish"},
+            {"id": 1, "action": "accept"},
+            {"id": 2, "action": "accept"},
+            {"id": 2, "action": "accept"},
+        ]
+    }
+    response = client.post("/shop_orders/batch", json=body, headers=header)
+
+    orders = response.json()["orders"]
+    assert [order["message"] for order in orders] == [
+        "INVALID_ORDER_STATUS",
+        "INVALID_ORDER_STATUS",
+        "ORDER_ACCEPTED",
+        "INVALID_ORDER_STATUS",
+    ]
+    assert [order["order"]["status"] for order in orders] == ["WS", "WS", "OK", "OK"]
+
+
+def test_shop_orders_batch_should_access_denied(drop_database):
+    header = {"Authorization": login_user()}
+
+    body = {"orders": [{"id": 1, "action": "accept"}]}
+    response = client.post("/shop_orders/batch", json=body, headers=header)
+
+    assert response.status_code == 403
+    assert response.json() == {"detail": "ACCESS_DENIED"}
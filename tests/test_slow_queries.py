@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import setup_db_tests
+from app.main import app, startup_event
+from app.settings import Settings
+from app.shop_order import return_open_orders
+from app.slow_queries import setup_slow_queries
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def record_all_queries():
+    asyncio.run(startup_event(True, Settings(slow_query_threshold_ms=0)))
+
+
+def test_slow_query_log_should_record_caller_and_plan(tmp_path):
+    async def scenario():
+        session_maker = await setup_db_tests(
+            f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}"
+        )
+        log = setup_slow_queries(
+            session_maker.kw["bind"],
+            Settings(slow_query_threshold_ms=0, slow_query_explain=True),
+        )
+        await return_open_orders(session_maker)
+        await return_open_orders(session_maker)
+        await asyncio.gather(*log.tasks)
+        return log.top(10).queries
+
+    [query] = asyncio.run(scenario())
+
+    assert query.caller == "app.shop_order.return_open_orders > app.order.select_orders"
+    assert query.calls == 2
+    assert query.parameters == "<str>"
+    assert "orders" in query.plan
+
+
+def test_slow_queries_should_list_top_offenders(record_all_queries):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "password": "12345678",
+    }
+    client.post("/register/employee", json=body)
+
+    body = {"login": "17410599090", "password": "12345678"}
+    response = client.post("/login/employee", json=body)
+    header = {"Authorization": response.json()["token"]}
+
+    response = client.get("/slow_queries", headers=header, params={"limit": 100})
+
+    assert response.status_code == 200
+    queries = response.json()["queries"]
+    assert "app.user.create_employee" in {query["caller"] for query in queries}
+    assert [query["total_ms"] for query in queries] == sorted(
+        (query["total_ms"] for query in queries), reverse=True
+    )
+    assert "$2b$" not in response.text
+
+    response = client.get("/slow_queries", headers=header, params={"limit": 2})
+
+    assert len(response.json()["queries"]) == 2
+
+
+def test_slow_queries_with_user_token_should_be_denied(record_all_queries):
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    body = {"login": "email@email.com", "password": "12345678"}
+    response = client.post("/login/user", json=body)
+    header = {"Authorization": response.json()["token"]}
+
+    response = client.get("/slow_queries", headers=header)
+
+    assert response.status_code == 403
+    assert response.json() == {"detail": "ACCESS_DENIED"}
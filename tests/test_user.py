@@ -1,8 +1,13 @@
 import asyncio
 
 from fastapi.testclient import TestClient
+from sqlalchemy.future import select
 
-from app.main import app
+from app import main
+from app.database import User
+from app.main import app, startup_event
+from app.passwords import calibrate, hash_rounds, setup_password_hasher
+from app.settings import Settings
 from app.user import create_token_email, encrypt_password
 
 client = TestClient(app)
@@ -20,3 +25,41 @@ def test_verify_encrypt_password_should_success():
 
     assert password is not None
     assert isinstance(password, str)
+
+
+def test_calibrate_should_stay_within_bounds():
+    assert calibrate(0.001, min_rounds=5, max_rounds=7) == 5
+    assert calibrate(10**9, min_rounds=5, max_rounds=7) == 7
+
+
+def test_login_should_rehash_password_with_higher_cost_only():
+    asyncio.run(startup_event(True))
+    setup_password_hasher(Settings(password_hash_min_rounds=5), calibrated=False)
+    body = {
+        "email": "email@email.com",
+        "name": "Christian Lopes",
+        "cpf": "17410599090",
+        "phone": "21999999999",
+        "password": "12345678",
+    }
+    client.post("/register/user", json=body)
+
+    async def stored_rounds():
+        async with main.context.session_maker() as session:
+            password = await session.execute(select(User.password))
+            return hash_rounds(password.scalar())
+
+    assert asyncio.run(stored_rounds()) == 5
+
+    setup_password_hasher(Settings(password_hash_min_rounds=6), calibrated=False)
+    body = {"login": "email@email.com", "password": "12345678"}
+    response = client.post("/login/user", json=body)
+
+    assert response.status_code == 200
+    assert asyncio.run(stored_rounds()) == 6
+
+    setup_password_hasher(Settings(password_hash_min_rounds=5), calibrated=False)
+    response = client.post("/login/user", json=body)
+
+    assert response.status_code == 200
+    assert asyncio.run(stored_rounds()) == 6